@@ -0,0 +1,96 @@
+"""
+Cost of the change_sequence row lock: concurrent writers with and without
+a change row per transaction, in a scratch database.
+
+    cd backend
+    python -m bench.bench_changes --database jirao_bench --threads 16 --transactions 4000
+
+Every writer updates its own spaces, so without the change log they never
+wait on each other. changes.record_many() takes its ids from the single
+change_sequence row and holds that row until COMMIT, so with the change log
+the writers queue there for their commit (and its log flush). --rows sets
+how many spaces one transaction writes (a bulk import chunk writes up to 500).
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import mysql.connector
+
+import changes
+import db
+from migrate import migrate
+
+from bench.dataset import create_database, populate
+
+
+def writer(config, space_ids, transactions, log_changes, latencies):
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor()
+    placeholders = ", ".join(["%s"] * len(space_ids))
+    try:
+        for i in range(transactions):
+            start = time.perf_counter()
+            cursor.execute(f"UPDATE spaces SET rate_per_hour = %s WHERE id IN ({placeholders})",
+                           (100 + i % 50, *space_ids))
+            if log_changes:
+                changes.record_many(cursor, [
+                    ("space", space_id, "update", {"rate_per_hour": 100 + i % 50}, None, None)
+                    for space_id in space_ids
+                ])
+            connection.commit()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def run(config, groups, transactions, log_changes):
+    latencies = []
+    per_thread = transactions // len(groups)
+    threads = [
+        threading.Thread(target=writer, args=(config, space_ids, per_thread, log_changes, latencies))
+        for space_ids in groups
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="jirao_bench")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--transactions", type=int, default=4000, help="in total, over all threads")
+    parser.add_argument("--rows", type=int, default=1, help="spaces written per transaction")
+    args = parser.parse_args()
+
+    connection = create_database(args.database)
+    populate(connection, users=200, spaces=args.threads * args.rows, interests=0, reports=0,
+             pending_hosts=0, host_share=0.2)
+    migrate(connection)
+    cursor = connection.cursor()
+    cursor.execute("SELECT id FROM spaces ORDER BY id")
+    ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    connection.close()
+    groups = [ids[i * args.rows:(i + 1) * args.rows] for i in range(args.threads)]
+    config = {**db.DB_CONFIG, "database": args.database}
+
+    print(f"{args.threads} writers, {args.transactions} transactions of {args.rows} row(s)")
+    print(f"{'':24} {'tx/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    baseline = None
+    for label, log_changes in (("without change log", False), ("with change log", True)):
+        elapsed, latencies = run(config, groups, args.transactions, log_changes)
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        rate = len(latencies) / elapsed
+        baseline = baseline or rate
+        print(f"{label:24} {rate:8.0f} {cuts[49] * 1000:8.2f} {cuts[98] * 1000:8.2f}  {rate / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+EXPLAIN plans and timings for main.py's hot queries before and after the
+schema migrations, on a synthetic dataset in a scratch database.
+
+    cd backend
+    python -m bench.bench_indexes --database jirao_bench --users 50000 --spaces 100000
+
+The scratch database is dropped and recreated; it must differ from DB_NAME.
+"""
+import argparse
+import statistics
+import time
+
+from migrate import migrate
+
+from bench.dataset import create_database, populate
+
+# (label, query, params) in the shape main.py sends them
+QUERIES = [
+    ("login (email)",
+     "SELECT id, username, email, role, status, password FROM users WHERE email = %s",
+     ("user4242@example.com",)),
+    ("admin_login (username)",
+     "SELECT id, username, password FROM users WHERE username = %s AND role = 'admin'",
+     ("admin",)),
+    ("register duplicate check",
+     "SELECT id FROM users WHERE username = %s OR email = %s",
+     ("user4242", "new@example.com")),
+    ("register pending check",
+     "SELECT id FROM pending_hosts WHERE username = %s OR email = %s",
+     ("applicant42", "new@example.com")),
+    ("users for reporting",
+     "SELECT id, username, email FROM users WHERE role = %s AND id != %s AND status = 'active'",
+     ("host", 1)),
+    ("admin users by date_joined",
+     "SELECT id, username FROM users WHERE role != 'admin' ORDER BY date_joined, id LIMIT 51",
+     ()),
+    ("spaces by availability + type",
+     "SELECT s.id, s.title FROM spaces s WHERE s.type = %s AND s.availability = %s ORDER BY s.id LIMIT 51",
+     ("parking", "on_hold")),
+    ("spaces location prefix",
+     "SELECT s.id, s.title FROM spaces s WHERE s.location LIKE %s ORDER BY s.id LIMIT 51",
+     ("Savar%",)),
+    ("reports newest first",
+     """SELECT r.id, reporter.username, reported.username FROM reports r
+        JOIN users reporter ON r.reporter_id = reporter.id
+        JOIN users reported ON r.reported_id = reported.id
+        ORDER BY r.timestamp DESC LIMIT 50""",
+     ()),
+    ("pending hosts",
+     "SELECT id, username FROM pending_hosts WHERE admin_id IS NULL",
+     ()),
+]
+
+
+def explain(cursor, query, params):
+    cursor.execute("EXPLAIN " + query, params)
+    names = [column[0] for column in cursor.description]
+    plans = [dict(zip(names, row)) for row in cursor.fetchall()]
+    # First row is the driving table; that is where a missing index shows up
+    plan = plans[0]
+    return f"{plan['type']}/{plan['key'] or '-'} rows={plan['rows']} {plan['Extra'] or ''}".strip()
+
+
+def timed(cursor, query, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def measure(connection, repeat):
+    cursor = connection.cursor()
+    results = {}
+    for label, query, params in QUERIES:
+        results[label] = (explain(cursor, query, params), timed(cursor, query, params, repeat))
+    cursor.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="jirao_bench")
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--spaces", type=int, default=100000)
+    parser.add_argument("--interests", type=int, default=200000)
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--pending-hosts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    connection = create_database(args.database)
+    start = time.perf_counter()
+    populate(connection, users=args.users, spaces=args.spaces, interests=args.interests,
+             reports=args.reports, pending_hosts=args.pending_hosts)
+    print(f"loaded synthetic data in {time.perf_counter() - start:.1f}s")
+
+    before = measure(connection, args.repeat)
+    migrate(connection)
+    cursor = connection.cursor()
+    cursor.execute("ANALYZE TABLE users, spaces, interests, reports, pending_hosts")
+    cursor.fetchall()
+    cursor.close()
+    after = measure(connection, args.repeat)
+    connection.close()
+
+    for label, _, _ in QUERIES:
+        (old_plan, old), (new_plan, new) = before[label], after[label]
+        print(f"\n{label}")
+        print(f"  before: {old * 1000:8.2f} ms  {old_plan}")
+        print(f"  after:  {new * 1000:8.2f} ms  {new_plan}")
+        print(f"  speed-up: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
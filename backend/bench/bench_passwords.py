@@ -0,0 +1,87 @@
+"""
+Size the scrypt cost in passwords.py against a login throughput target.
+No database needed.
+
+    cd backend
+    python -m bench.bench_passwords --target 50 --threads 4
+
+For each cost (log2 N) it measures the latency of one verification and the
+verifications per second that --threads KDF threads (PASSWORD_HASH_THREADS)
+sustain on this machine, then suggests the highest cost whose throughput,
+scaled down to the --budget share of CPU the KDF may use, still meets
+--target logins per second per worker process.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import passwords
+
+
+def latency(log_n, r, p, repeat):
+    stored = passwords.hash_password_sync("correct horse", log_n, r, p)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        passwords.verify_password_sync("correct horse", stored)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), stored
+
+
+def throughput(stored, threads, duration):
+    done = [0] * threads
+    deadline = time.perf_counter() + duration
+
+    def run(index):
+        while time.perf_counter() < deadline:
+            passwords.verify_password_sync("correct horse", stored)
+            done[index] += 1
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(done) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", type=float, default=50, help="logins per second per worker")
+    parser.add_argument("--threads", type=int, default=passwords.PASSWORD_HASH_THREADS)
+    parser.add_argument("--budget", type=float, default=0.5, help="share of CPU the KDF may use")
+    parser.add_argument("--min-log-n", type=int, default=12)
+    parser.add_argument("--max-log-n", type=int, default=17)
+    parser.add_argument("-r", type=int, default=passwords.PASSWORD_SCRYPT_R)
+    parser.add_argument("-p", type=int, default=passwords.PASSWORD_SCRYPT_P)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"scrypt r={args.r} p={args.p}, {args.threads} threads, target {args.target:g} logins/s "
+          f"within {args.budget:.0%} of CPU")
+    print(f"{'log2 N':>6} {'memory':>9} {'verify ms':>10} {'verifies/s':>11} {'budgeted/s':>11}")
+    suggested = None
+    for log_n in range(args.min_log_n, args.max_log_n + 1):
+        single, stored = latency(log_n, args.r, args.p, args.repeat)
+        rate = throughput(stored, args.threads, args.duration)
+        budgeted = rate * args.budget
+        memory = 128 * args.r * (1 << log_n) * args.p / 2 ** 20
+        ok = budgeted >= args.target
+        if ok:
+            suggested = log_n
+        print(f"{log_n:>6} {memory:>7.0f}MiB {single * 1000:>10.1f} {rate:>11.1f} {budgeted:>11.1f}"
+              f"{'' if ok else '  below target'}")
+
+    current = passwords.PASSWORD_SCRYPT_LOG_N
+    if suggested is None:
+        print("No cost meets the target; add KDF threads or cores, or lower --min-log-n")
+    else:
+        print(f"Suggested PASSWORD_SCRYPT_LOG_N={suggested} (current {current}); "
+              f"peak KDF memory {args.threads * 128 * args.r * (1 << suggested) * args.p / 2 ** 20:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
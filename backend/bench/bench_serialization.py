@@ -0,0 +1,85 @@
+"""
+Compare the old per-row dict mutation + jsonable_encoder path with the
+RowSchema + orjson pipeline on synthetic space rows. No database needed.
+
+    cd backend
+    python -m bench.bench_serialization --rows 20000
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from main import SPACE_ROW
+from serialize import dumps
+
+
+class FakeCursor:
+    def __init__(self, rows, names=None):
+        self._rows = rows
+        self._names = names
+
+    def fetchall(self):
+        if self._names is None:
+            return list(self._rows)
+        # What cursor(dictionary=True) hands back
+        return [dict(zip(self._names, row)) for row in self._rows]
+
+
+def make_rows(count):
+    rows = []
+    for i in range(count):
+        parking = i % 2 == 0
+        rows.append((
+            i + 1, 7, "parking" if parking else "room", f"Space {i}", "Dhanmondi, Dhaka",
+            23.74 + i * 1e-5, 90.37 + i * 1e-5, Decimal("150.00"), "A quiet spot near the lake " * 4,
+            "available", '{"length": 18, "width": 9, "height": 7}' if parking else None,
+            datetime(2025, 8, 1, 10, 30), datetime(2025, 8, 2, 11, 0), "sarah_host",
+        ))
+    return rows
+
+
+def legacy(rows):
+    spaces = FakeCursor(rows, SPACE_ROW.names).fetchall()
+    for space in spaces:
+        if space["type"] == "parking" and space["dimensions"]:
+            space["dimensions"] = json.loads(space["dimensions"])
+        else:
+            space["dimensions"] = None
+    # What FastAPI's JSONResponse does with a plain return value
+    return json.dumps(jsonable_encoder(spaces), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def pipeline(rows):
+    return dumps(SPACE_ROW.rows(FakeCursor(rows)))
+
+
+def timed(fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    old, old_size = timed(legacy, rows, args.repeat)
+    new, new_size = timed(pipeline, rows, args.repeat)
+    print(f"rows: {args.rows}")
+    print(f"dict cursor + jsonable_encoder: {old * 1000:8.1f} ms  {old_size} bytes")
+    print(f"tuple cursor + orjson:          {new * 1000:8.1f} ms  {new_size} bytes")
+    print(f"speed-up: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Space creation throughput: POST /api/spaces once per space versus
+POST /api/spaces/bulk as JSON, NDJSON and CSV, in a scratch database.
+
+    cd backend
+    python -m bench.bench_space_import --database jirao_bench --spaces 2000
+
+The API runs in-process (no HTTP server needed) against the scratch
+database, which is dropped and recreated; it must differ from DB_NAME.
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import time
+
+import db
+from migrate import migrate
+
+from bench.dataset import AREAS, create_database, populate
+
+
+def make_spaces(count, seed=0):
+    rng = random.Random(seed)
+    spaces = []
+    for i in range(count):
+        area, lat, lng = rng.choice(AREAS)
+        parking = rng.random() < 0.6
+        space = {
+            "type": "parking" if parking else "room",
+            "title": f"Garage bay {i}" if parking else f"Room {i}",
+            "location": f"{area}, Dhaka",
+            "rate_per_hour": rng.choice((30, 50, 80, 150, 250)),
+            "description": "Imported by the space import benchmark",
+            "availability": "available",
+            "latitude": round(lat + rng.uniform(-0.02, 0.02), 6),
+            "longitude": round(lng + rng.uniform(-0.02, 0.02), 6),
+        }
+        if parking:
+            space["dimensions"] = {"length": 18, "width": 9, "height": 7}
+        spaces.append(space)
+    return spaces
+
+
+def as_ndjson(spaces):
+    return "".join(json.dumps(space) + "\n" for space in spaces).encode()
+
+
+def as_csv(spaces):
+    out = io.StringIO()
+    columns = ["type", "title", "location", "rate_per_hour", "description", "availability",
+               "latitude", "longitude", "length", "width", "height"]
+    writer = csv.DictWriter(out, columns)
+    writer.writeheader()
+    for space in spaces:
+        row = {key: value for key, value in space.items() if key != "dimensions"}
+        row.update(space.get("dimensions") or {})
+        writer.writerow(row)
+    return out.getvalue().encode()
+
+
+def single(client, owner_id, spaces):
+    for space in spaces:
+        response = client.post("/api/spaces", json={**space, "owner_id": owner_id})
+        response.raise_for_status()
+
+
+def bulk(client, owner_id, body, content_type):
+    response = client.post("/api/spaces/bulk", params={"owner_id": owner_id}, content=body,
+                           headers={"content-type": content_type})
+    response.raise_for_status()
+    result = response.json()
+    if result["failed"]:
+        raise SystemExit(f"bulk import failed rows: {result['failed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="jirao_bench")
+    parser.add_argument("--spaces", type=int, default=2000)
+    args = parser.parse_args()
+
+    connection = create_database(args.database)
+    ids = populate(connection, users=200, spaces=0, interests=0, reports=0, pending_hosts=0, host_share=0.2)
+    migrate(connection)
+    connection.close()
+    owner_id = ids["hosts"][0]
+
+    # Point the in-process API at the scratch database before its pool opens
+    db.DB_CONFIG["database"] = args.database
+    from fastapi.testclient import TestClient
+    import main as api
+    client = TestClient(api.app)
+
+    spaces = make_spaces(args.spaces)
+    payloads = [
+        ("bulk JSON", json.dumps(spaces).encode(), "application/json"),
+        ("bulk NDJSON", as_ndjson(spaces), "application/x-ndjson"),
+        ("bulk CSV", as_csv(spaces), "text/csv"),
+    ]
+
+    print(f"{args.spaces} spaces per run")
+    start = time.perf_counter()
+    single(client, owner_id, spaces)
+    baseline = time.perf_counter() - start
+    print(f"{'single-row POST /api/spaces':30} {baseline:7.2f}s {args.spaces / baseline:9.0f} rows/s")
+    for label, body, content_type in payloads:
+        start = time.perf_counter()
+        bulk(client, owner_id, body, content_type)
+        elapsed = time.perf_counter() - start
+        print(f"{label:30} {elapsed:7.2f}s {args.spaces / elapsed:9.0f} rows/s  {baseline / elapsed:5.1f}x")
+    db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
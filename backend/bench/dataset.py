@@ -0,0 +1,251 @@
+"""
+Synthetic JIRAO dataset for benchmarks and load tests.
+
+create_database() builds a scratch database from the schema in
+database/JIRAO.sql (without its sample rows) and populate() fills it with
+deterministic, realistically skewed data that respects every FK and enum:
+mostly guests, a few hosts owning all spaces, Dhaka-area locations and
+coordinates, parking dimensions, interests and reports spread over existing
+users and spaces. Rows are generated and inserted in batches, so 1M spaces
+and 10M interests load in constant memory.
+
+    cd backend
+    python -m bench.dataset --database jirao_load --spaces 1000000 --interests 10000000
+
+Every synthetic user has password "1234" and email user<id>@example.com; the
+admin account is admin / admin. Passwords are stored hashed with the current
+KDF settings (passwords.py), so logins measure verification, not upgrades.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import mysql.connector
+
+import db
+import passwords
+from migrate import migrate, split_statements
+
+SCHEMA_FILE = Path(__file__).resolve().parents[2] / "database" / "JIRAO.sql"
+
+AREAS = [
+    ("Dhanmondi", 23.746, 90.376), ("Gulshan", 23.792, 90.415), ("Banani", 23.794, 90.404),
+    ("Mirpur", 23.822, 90.365), ("Uttara", 23.875, 90.380), ("Mohammadpur", 23.766, 90.358),
+    ("Motijheel", 23.733, 90.417), ("Bashundhara", 23.819, 90.452), ("Narayanganj", 23.623, 90.500),
+    ("Savar", 23.858, 90.266),
+]
+ROOM_WORDS = ["Cozy", "Bright", "Quiet", "Spacious", "Furnished", "Modern", "Compact", "Lakeside"]
+REPORT_REASONS = [
+    "Listing did not match the description", "Host did not respond",
+    "Guest left the space damaged", "Inappropriate messages",
+]
+
+BATCH_SIZE = 5000
+EPOCH = datetime(2024, 1, 1)
+SPAN_MINUTES = 600 * 24 * 60
+
+
+def create_database(name, config=None):
+    """
+    Drop and recreate database `name` with the JIRAO schema and return a connection to it.
+    Refuses to touch the database the API is configured to use.
+    """
+    config = dict(config or db.DB_CONFIG)
+    if name == config.get("database"):
+        raise ValueError(f"Refusing to recreate the application database {name!r}")
+    config.pop("database", None)
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+    cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci")
+    cursor.execute(f"USE `{name}`")
+    for statement in split_statements(SCHEMA_FILE.read_text(encoding="utf-8")):
+        if statement.startswith("INSERT INTO"):
+            continue
+        cursor.execute(statement)
+    connection.commit()
+    cursor.close()
+    return connection
+
+
+def _insert(cursor, query, rows):
+    """Insert rows from an iterable, BATCH_SIZE at a time."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            # executemany folds INSERT ... VALUES into multi-row statements
+            cursor.executemany(query, batch)
+            batch = []
+    if batch:
+        cursor.executemany(query, batch)
+
+
+def _when(rng):
+    return EPOCH + timedelta(minutes=rng.randrange(SPAN_MINUTES))
+
+
+def _users(rng, count, host_share, password):
+    for i in range(1, count + 1):
+        yield (
+            i, f"user{i}", f"user{i}@example.com", password,
+            "host" if rng.random() < host_share else "guest",
+            rng.choices(("active", "banned", "pending"), weights=(90, 7, 3))[0],
+            _when(rng),
+        )
+
+
+def _spaces(rng, count, hosts):
+    for i in range(1, count + 1):
+        area, lat, lng = rng.choice(AREAS)
+        lat += rng.uniform(-0.02, 0.02)
+        lng += rng.uniform(-0.02, 0.02)
+        parking = rng.random() < 0.35
+        dimensions = None
+        if parking:
+            dimensions = (
+                f'{{"length": {rng.randint(12, 25)}, "width": {rng.randint(7, 12)}, '
+                f'"height": {rng.randint(6, 10)}}}'
+            )
+        created = _when(rng)
+        yield (
+            i, rng.choice(hosts), "parking" if parking else "room",
+            f"{rng.choice(ROOM_WORDS)} {'parking spot' if parking else 'room'} in {area}",
+            f"{area}, Dhaka", round(rng.uniform(50, 800), 2),
+            f"{rng.choice(ROOM_WORDS)} place close to {area} market",
+            rng.choices(("available", "on_hold", "not_available"), weights=(70, 15, 15))[0],
+            dimensions, created, created, lat, lng, lng, lat,
+        )
+
+
+def _interests(rng, count, guests, spaces):
+    # Spread interests evenly over guests; each guest's spaces are distinct,
+    # which keeps (user_id, space_id) unique without remembering every pair
+    per_guest, extra = divmod(count, len(guests))
+    interest_id = 0
+    for index, user_id in enumerate(guests):
+        wanted = min(per_guest + (1 if index < extra else 0), spaces)
+        for space_id in rng.sample(range(1, spaces + 1), wanted):
+            interest_id += 1
+            status = rng.choices(("pending", "accepted", "rejected"), weights=(30, 50, 20))[0]
+            requested = _when(rng)
+            responded = None if status == "pending" else requested + timedelta(hours=rng.randint(1, 72))
+            yield (interest_id, user_id, space_id, rng.randint(1, 8), status, responded, requested)
+
+
+def _reports(rng, count, guests, hosts):
+    for i in range(1, count + 1):
+        reporter, reported = (rng.choice(guests), rng.choice(hosts))
+        if rng.random() < 0.3:
+            reporter, reported = reported, reporter
+        yield (i, reporter, reported, rng.choice(REPORT_REASONS), _when(rng))
+
+
+def _pending_hosts(rng, count, admin_id, password):
+    for i in range(1, count + 1):
+        yield (
+            i, f"applicant{i}", f"applicant{i}@example.com", password, "01700000000", f"{i:010d}",
+            _when(rng), admin_id if rng.random() < 0.8 else None,
+        )
+
+
+def populate(connection, users=50000, spaces=100000, interests=200000, reports=20000,
+             pending_hosts=5000, host_share=0.1, seed=0, log=None):
+    """
+    Fill an empty schema. The same arguments and seed always produce the same rows.
+    Returns the generated ids as {"guests": [...], "hosts": [...], "admin": id}.
+    """
+    rng = random.Random(seed)
+    # One hash per distinct password (fixed salt) keeps the rows deterministic and the load fast
+    salt = random.Random(seed).randbytes(passwords.SALT_BYTES)
+    user_password = passwords.hash_password_sync("1234", salt=salt)
+    admin_password = passwords.hash_password_sync("admin", salt=salt)
+    cursor = connection.cursor()
+
+    def step(name, query, rows):
+        start = time.perf_counter()
+        _insert(cursor, query, rows)
+        connection.commit()
+        if log:
+            log(f"{name}: {time.perf_counter() - start:.1f}s")
+
+    guests, hosts = [], []
+
+    def users_rows():
+        for row in _users(rng, users, host_share, user_password):
+            (hosts if row[4] == "host" else guests).append(row[0])
+            yield row
+        # One admin so admin_login has a row to find
+        yield (users + 1, "admin", "admin@example.com", admin_password, "admin", "active", EPOCH)
+
+    step("users", """
+    INSERT INTO users (id, username, email, password, role, status, date_joined)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, users_rows())
+    if not guests or not hosts:
+        raise ValueError("Need at least one guest and one host; raise --users or adjust --host-share")
+
+    # geo_point only exists once migrations/0005 ran; on the baseline schema
+    # that migration backfills it from latitude/longitude later
+    cursor.execute("SHOW COLUMNS FROM spaces LIKE 'geo_point'")
+    if cursor.fetchall():
+        step("spaces", """
+        INSERT INTO spaces (id, owner_id, type, title, location, rate_per_hour, description,
+                            availability, dimensions, created_at, updated_at, latitude, longitude, geo_point)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, POINT(%s, %s))
+        """, _spaces(rng, spaces, hosts))
+    else:
+        step("spaces", """
+        INSERT INTO spaces (id, owner_id, type, title, location, rate_per_hour, description,
+                            availability, dimensions, created_at, updated_at, latitude, longitude)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (row[:-2] for row in _spaces(rng, spaces, hosts)))
+
+    step("interests", """
+    INSERT INTO interests (id, user_id, space_id, hours_requested, status, host_response_date, timestamp)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, _interests(rng, interests, guests, spaces))
+
+    step("reports", """
+    INSERT INTO reports (id, reporter_id, reported_id, reason, timestamp)
+    VALUES (%s, %s, %s, %s, %s)
+    """, _reports(rng, reports, guests, hosts))
+
+    step("pending_hosts", """
+    INSERT INTO pending_hosts (id, username, email, password, phone, nid, date_applied, admin_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, _pending_hosts(rng, pending_hosts, users + 1, user_password))
+
+    cursor.execute("ANALYZE TABLE users, spaces, interests, reports, pending_hosts")
+    cursor.fetchall()
+    cursor.close()
+    return {"guests": guests, "hosts": hosts, "admin": users + 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="jirao_load")
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--spaces", type=int, default=100000)
+    parser.add_argument("--interests", type=int, default=200000)
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--pending-hosts", type=int, default=5000)
+    parser.add_argument("--host-share", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-migrate", action="store_true", help="leave the schema at the JIRAO.sql baseline")
+    args = parser.parse_args()
+
+    connection = create_database(args.database)
+    populate(connection, users=args.users, spaces=args.spaces, interests=args.interests,
+             reports=args.reports, pending_hosts=args.pending_hosts,
+             host_share=args.host_share, seed=args.seed, log=print)
+    if not args.no_migrate:
+        migrate(connection)
+    connection.close()
+    print(f"database {args.database} is ready; point the API at it with DB_NAME={args.database}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,587 @@
+"""
+Scripted load test for every route in main.py.
+
+Run the API against a synthetic database (see bench/dataset.py), then:
+
+    cd backend
+    DB_NAME=jirao_load RATE_LIMIT_ENABLED=0 SESSION_SECRET=load-test CACHE_BACKEND=redis \
+        uvicorn main:app --port 8000 --workers 4 &
+    python -m bench.load_test --database jirao_load --mix mixed --users 32 --duration 60
+
+Each virtual user is a thread with its own keep-alive HTTP connection that
+picks operations from the chosen traffic mix until the time is up. Latency is
+recorded per route and reported as p50/p95/p99 together with throughput and
+error counts. Write operations clean up after themselves where the API allows
+(ban is followed by unban, new interests are cancelled, registered users are
+deleted), but approvals, responses and reports do change the database, so
+only point it at a scratch copy.
+
+Every virtual user carries one admin session, so all workers must share
+SESSION_SECRET; the run stops as soon as any worker rejects it.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+import mysql.connector
+
+import db
+from bench.dataset import AREAS
+
+SAMPLE_SIZE = 2000
+REJECTED = "Admin session rejected; start every worker with the same SESSION_SECRET (and CACHE_BACKEND=redis)"
+
+
+class Recorder:
+    """Thread-safe latency samples and status counts per route label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, label, seconds, status):
+        with self._lock:
+            self.latencies[label].append(seconds)
+            self.statuses[label][status] += 1
+
+
+class Client:
+    """One keep-alive connection per virtual user."""
+
+    def __init__(self, base_url, recorder, token=None, timeout=30, rejected=None):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.token = token
+        self.rejected = rejected
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.recorder = recorder
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._connection
+
+    def request(self, label, method, path, body=None, params=None):
+        """Send one request, record it under `label` and return (status, decoded JSON or None)."""
+        if params:
+            path += "?" + urlencode(params)
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        start = time.perf_counter()
+        try:
+            connection = self._connect()
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            raw = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # Count the failure and reconnect on the next request
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+            self.recorder.add(label, time.perf_counter() - start, "error")
+            return None, None
+        self.recorder.add(label, time.perf_counter() - start, status)
+        try:
+            decoded = json.loads(raw) if raw else None
+        except ValueError:
+            decoded = None
+        if status == 401 and self.rejected is not None and (decoded or {}).get("detail") == "Session expired or revoked":
+            self.rejected.set()
+        return status, decoded
+
+    def first_event(self, label, path):
+        """Open a Server-Sent Events stream on a fresh connection, record the time to its first event, close it."""
+        start = time.perf_counter()
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request("GET", path, headers={
+                "Accept": "text/event-stream", "Authorization": f"Bearer {self.token}",
+            })
+            response = connection.getresponse()
+            if response.status == 200:
+                while response.readline() not in (b"\n", b"\r\n", b""):
+                    pass
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = "error"
+        finally:
+            connection.close()
+        self.recorder.add(label, time.perf_counter() - start, status)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+
+class Context:
+    """Ids sampled from the database plus state shared between virtual users."""
+
+    def __init__(self, samples):
+        self.guests = samples["guests"]
+        self.hosts = samples["hosts"]
+        self.spaces = samples["spaces"]
+        self.interests = samples["interests"]
+        self.admin = samples["admin"]
+        self.admin_token = None
+        self.rejected = threading.Event()
+        self.run_id = f"{int(time.time()) % 100000}"
+        self._sequence = itertools.count()
+        self._claimed = set()
+        self._lock = threading.Lock()
+
+    def unique(self, prefix):
+        return f"{prefix}{self.run_id}_{next(self._sequence)}"
+
+    def claim(self, ids):
+        """Claim one id nobody else has taken (pending applications are reviewed once)."""
+        with self._lock:
+            for id_ in ids:
+                if id_ not in self._claimed:
+                    self._claimed.add(id_)
+                    return id_
+        return None
+
+
+def sample_ids(config):
+    """Pick random active guests/hosts, spaces and interests to drive the requests with."""
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor()
+    samples = {}
+    queries = {
+        "guests": "SELECT id FROM users WHERE role = 'guest' AND status = 'active'",
+        "hosts": "SELECT id FROM users WHERE role = 'host' AND status = 'active'",
+        "spaces": "SELECT id FROM spaces",
+        "interests": "SELECT id FROM interests",
+    }
+    for name, query in queries.items():
+        cursor.execute(f"{query} ORDER BY RAND() LIMIT %s", (SAMPLE_SIZE,))
+        samples[name] = [id_ for (id_,) in cursor.fetchall()]
+        if not samples[name]:
+            raise SystemExit(f"No {name} in the database; generate data with bench.dataset first")
+    cursor.execute("SELECT id FROM users WHERE role = 'admin' LIMIT 1")
+    row = cursor.fetchone()
+    samples["admin"] = row[0] if row else None
+    cursor.close()
+    connection.close()
+    return samples
+
+
+# Operations. Each takes (client, ctx, rng) and issues one or more requests;
+# labels are the route templates so results group per endpoint.
+
+def health(client, ctx, rng):
+    client.request("GET /api/test", "GET", "/api/test")
+
+
+def login(client, ctx, rng):
+    user_id = rng.choice(ctx.guests + ctx.hosts)
+    client.request("POST /api/auth/login", "POST", "/api/auth/login",
+                   {"email": f"user{user_id}@example.com", "password": "1234"})
+
+
+def admin_login(client, ctx, rng):
+    client.request("POST /api/auth/admin-login", "POST", "/api/auth/admin-login",
+                   {"username": "admin", "password": "admin"})
+
+
+def logout(client, ctx, rng):
+    # With a session of its own: signing the shared admin session out would end the run
+    user_id = rng.choice(ctx.guests)
+    status, body = client.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                  {"email": f"user{user_id}@example.com", "password": "1234"})
+    if status == 200 and body:
+        user = Client(client.base_url, client.recorder, token=body["token"])
+        user.request("POST /api/auth/logout", "POST", "/api/auth/logout")
+        user.close()
+
+
+def live_events(client, ctx, rng):
+    client.first_event("GET /api/events", "/api/events")
+
+
+def list_spaces(client, ctx, rng):
+    params = {}
+    if rng.random() < 0.5:
+        params["type"] = rng.choice(("room", "parking"))
+    if rng.random() < 0.5:
+        params["availability"] = "available"
+    if rng.random() < 0.3:
+        params["location"] = rng.choice(AREAS)[0]
+    status, page = client.request("GET /api/spaces", "GET", "/api/spaces", params=params)
+    # A third of the visitors scroll to the second page
+    if status == 200 and page and page.get("next_cursor") and rng.random() < 0.33:
+        params["after"] = page["next_cursor"]
+        client.request("GET /api/spaces", "GET", "/api/spaces", params=params)
+
+
+def search_spaces(client, ctx, rng):
+    area = rng.choice(AREAS)[0]
+    query = rng.choice((area, f"{area} parking", f"quiet room {area}"))
+    client.request("GET /api/spaces/search", "GET", "/api/spaces/search", params={"q": query})
+
+
+def nearby_spaces(client, ctx, rng):
+    _, lat, lng = rng.choice(AREAS)
+    client.request("GET /api/spaces/nearby", "GET", "/api/spaces/nearby", params={
+        "lat": round(lat + rng.uniform(-0.01, 0.01), 5),
+        "lng": round(lng + rng.uniform(-0.01, 0.01), 5),
+        "radius_km": rng.choice((1, 2, 5)),
+    })
+
+
+def space_detail(client, ctx, rng):
+    space_id = rng.choice(ctx.spaces)
+    client.request("GET /api/spaces/{id}", "GET", f"/api/spaces/{space_id}")
+    client.request("GET /api/interests/check/{space_id}/{user_id}", "GET",
+                   f"/api/interests/check/{space_id}/{rng.choice(ctx.guests)}")
+
+
+def guest_interests(client, ctx, rng):
+    client.request("GET /api/interests/user/{user_id}", "GET",
+                   f"/api/interests/user/{rng.choice(ctx.guests)}")
+
+
+def express_and_cancel_interest(client, ctx, rng):
+    status, interest = client.request("POST /api/interests", "POST", "/api/interests", {
+        "user_id": rng.choice(ctx.guests), "space_id": rng.choice(ctx.spaces),
+        "hours_requested": rng.randint(1, 8),
+    })
+    if status == 200 and interest:
+        client.request("DELETE /api/interests/{id}", "DELETE", f"/api/interests/{interest['id']}")
+
+
+def bulk_interest_and_cancel(client, ctx, rng):
+    status, result = client.request("POST /api/interests/bulk", "POST", "/api/interests/bulk", {
+        "user_id": rng.choice(ctx.guests), "space_ids": rng.sample(ctx.spaces, min(5, len(ctx.spaces))),
+        "hours_requested": rng.randint(1, 8),
+    })
+    if status == 200 and result:
+        for interest in result["created"]:
+            client.request("DELETE /api/interests/{id}", "DELETE", f"/api/interests/{interest['id']}")
+
+
+def report_user(client, ctx, rng):
+    guest, host = rng.choice(ctx.guests), rng.choice(ctx.hosts)
+    reporter, reported = (guest, host) if rng.random() < 0.7 else (host, guest)
+    client.request("GET /api/users/for-reporting/{id}/{role}", "GET",
+                   f"/api/users/for-reporting/{reporter}/{'host' if reported == host else 'guest'}")
+    client.request("POST /api/reports", "POST", "/api/reports", {
+        "reporter_id": reporter, "reported_id": reported, "reason": "Load test report",
+    })
+
+
+def host_dashboard(client, ctx, rng):
+    host = rng.choice(ctx.hosts)
+    client.request("GET /api/spaces/host/{owner_id}", "GET", f"/api/spaces/host/{host}")
+    client.request("GET /api/interests/host/{owner_id}/summary", "GET",
+                   f"/api/interests/host/{host}/summary", params={"latest": 5})
+
+
+def space_interests(client, ctx, rng):
+    client.request("GET /api/interests/space/{space_id}", "GET",
+                   f"/api/interests/space/{rng.choice(ctx.spaces)}")
+
+
+def respond_to_interest(client, ctx, rng):
+    client.request("PUT /api/interests/{id}/respond", "PUT",
+                   f"/api/interests/{rng.choice(ctx.interests)}/respond",
+                   {"status": rng.choice(("accepted", "rejected"))})
+
+
+def manage_space(client, ctx, rng):
+    area, lat, lng = rng.choice(AREAS)
+    space = {
+        "owner_id": rng.choice(ctx.hosts), "type": "room", "title": f"Load test room in {area}",
+        "location": f"{area}, Dhaka", "rate_per_hour": 200, "description": "Created by the load test",
+        "availability": "available", "latitude": lat, "longitude": lng,
+    }
+    status, created = client.request("POST /api/spaces", "POST", "/api/spaces", space)
+    if status != 200 or not created:
+        return
+    space["rate_per_hour"] = 250
+    client.request("PUT /api/spaces/{id}", "PUT", f"/api/spaces/{created['id']}", space)
+    client.request("PUT /api/spaces/{id}/availability", "PUT", f"/api/spaces/{created['id']}/availability",
+                   {"availability": "not_available"})
+
+
+def import_spaces(client, ctx, rng):
+    # A host importing a batch of listings, then re-importing it with new rates
+    owner_id = rng.choice(ctx.hosts)
+    rows = []
+    for i in range(20):
+        area, lat, lng = rng.choice(AREAS)
+        rows.append({
+            "type": "room", "title": f"Imported room {i} in {area}", "location": f"{area}, Dhaka",
+            "rate_per_hour": 150, "description": "Imported by the load test",
+            "latitude": lat, "longitude": lng,
+        })
+    status, result = client.request("POST /api/spaces/bulk", "POST", "/api/spaces/bulk", rows,
+                                    params={"owner_id": owner_id})
+    if status != 200 or not result:
+        return
+    updates = [{**row, "id": outcome["id"], "rate_per_hour": 175}
+               for row, outcome in zip(rows, result["rows"]) if outcome["result"] == "created"]
+    if updates:
+        client.request("POST /api/spaces/bulk", "POST", "/api/spaces/bulk", updates, params={"owner_id": owner_id})
+
+
+def sync_changes(client, ctx, rng):
+    # A replica catching up from a recent cursor instead of re-pulling the lists
+    status, page = client.request("GET /api/changes", "GET", "/api/changes")
+    if status != 200 or not page:
+        return
+    since = max(0, page["cursor"] - rng.randint(0, 2000))
+    client.request("GET /api/changes", "GET", "/api/changes", params={"since": since, "limit": 500})
+
+
+def admin_overview(client, ctx, rng):
+    client.request("GET /api/admin/stats", "GET", "/api/admin/stats")
+    client.request("GET /api/admin/users/counts", "GET", "/api/admin/users/counts")
+    client.request("GET /api/admin/cache-stats", "GET", "/api/admin/cache-stats")
+
+
+def admin_diagnostics(client, ctx, rng):
+    client.request("GET /metrics", "GET", "/metrics")
+    status, profiles = client.request("GET /api/admin/profiles", "GET", "/api/admin/profiles")
+    if status == 200 and profiles:
+        client.request("GET /api/admin/profiles/{id}", "GET", f"/api/admin/profiles/{profiles[0]['id']}",
+                       params={"format": "json"})
+
+
+def admin_jobs(client, ctx, rng):
+    params = {"limit": 50}
+    if rng.random() < 0.5:
+        params["status"] = rng.choice(("queued", "running", "succeeded", "failed"))
+    status, page = client.request("GET /api/admin/jobs", "GET", "/api/admin/jobs", params=params)
+    if status == 200 and page:
+        client.request("GET /api/admin/jobs/{id}", "GET", f"/api/admin/jobs/{rng.choice(page)['id']}")
+
+
+def admin_users(client, ctx, rng):
+    params = {"sort": rng.choice(("id", "username", "-date_joined"))}
+    if rng.random() < 0.5:
+        params["role"] = rng.choice(("guest", "host"))
+    if rng.random() < 0.3:
+        params["q"] = f"user{rng.randint(1, 99)}"
+    client.request("GET /api/admin/users", "GET", "/api/admin/users", params=params)
+
+
+def admin_reports(client, ctx, rng):
+    client.request("GET /api/reports", "GET", "/api/reports")
+
+
+def ban_and_unban(client, ctx, rng):
+    user_id = rng.choice(ctx.guests)
+    client.request("PUT /api/admin/users/{id}/ban", "PUT", f"/api/admin/users/{user_id}/ban")
+    client.request("PUT /api/admin/users/{id}/unban", "PUT", f"/api/admin/users/{user_id}/unban")
+
+
+def bulk_ban_and_unban(client, ctx, rng):
+    user_ids = rng.sample(ctx.guests, min(20, len(ctx.guests)))
+    for action in ("ban", "unban"):
+        client.request("POST /api/admin/users/bulk", "POST", "/api/admin/users/bulk",
+                       {"action": action, "user_ids": user_ids})
+
+
+def review_host_application(client, ctx, rng):
+    status, pending = client.request("GET /api/admin/pending-hosts", "GET", "/api/admin/pending-hosts")
+    if status != 200 or not pending:
+        return
+    application = ctx.claim(host["id"] for host in pending)
+    if application is None:
+        return
+    if rng.random() < 0.7 and ctx.admin:
+        client.request("POST /api/admin/approve-host/{id}", "POST", f"/api/admin/approve-host/{application}",
+                       {"admin_id": ctx.admin})
+    else:
+        client.request("DELETE /api/admin/reject-host/{id}", "DELETE", f"/api/admin/reject-host/{application}")
+
+
+def register_and_delete(client, ctx, rng):
+    name = ctx.unique("lt")
+    if rng.random() < 0.2:
+        # Host sign-ups become pending applications (the API answers 400 by design)
+        client.request("POST /api/auth/register", "POST", "/api/auth/register", {
+            "username": name, "email": f"{name}@example.com", "password": "1234",
+            "role": "host", "phone": "01700000000", "nid": name,
+        })
+        return
+    status, body = client.request("POST /api/auth/register", "POST", "/api/auth/register", {
+        "username": name, "email": f"{name}@example.com", "password": "1234", "role": "guest",
+    })
+    if status == 200 and body:
+        client.request("DELETE /api/admin/users/{id}", "DELETE", f"/api/admin/users/{body['user']['id']}")
+
+
+def bulk_review_host_applications(client, ctx, rng):
+    status, pending = client.request("GET /api/admin/pending-hosts", "GET", "/api/admin/pending-hosts")
+    if status != 200 or not pending:
+        return
+    ids = [id_ for id_ in (ctx.claim(host["id"] for host in pending) for _ in range(5)) if id_ is not None]
+    if not ids:
+        return
+    if rng.random() < 0.7 and ctx.admin:
+        body = {"action": "approve", "pending_host_ids": ids, "admin_id": ctx.admin}
+    else:
+        body = {"action": "reject", "pending_host_ids": ids}
+    client.request("POST /api/admin/pending-hosts/bulk", "POST", "/api/admin/pending-hosts/bulk", body)
+
+
+def register_and_bulk_delete(client, ctx, rng):
+    user_ids = []
+    for _ in range(3):
+        name = ctx.unique("lt")
+        status, body = client.request("POST /api/auth/register", "POST", "/api/auth/register", {
+            "username": name, "email": f"{name}@example.com", "password": "1234", "role": "guest",
+        })
+        if status == 200 and body:
+            user_ids.append(body["user"]["id"])
+    if user_ids:
+        client.request("POST /api/admin/users/bulk", "POST", "/api/admin/users/bulk",
+                       {"action": "delete", "user_ids": user_ids})
+
+
+# Traffic mixes: (weight, operation)
+MIXES = {
+    "browse": [
+        (30, list_spaces), (15, space_detail), (10, search_spaces), (10, nearby_spaces),
+        (8, login), (8, guest_interests), (6, express_and_cancel_interest),
+        (2, bulk_interest_and_cancel), (2, report_user), (2, live_events),
+        (1, logout), (1, health),
+    ],
+    "host": [
+        (30, host_dashboard), (20, space_interests), (15, respond_to_interest),
+        (10, manage_space), (10, login), (5, list_spaces), (5, sync_changes),
+        (2, import_spaces), (2, live_events),
+    ],
+    "admin": [
+        (20, admin_overview), (20, admin_users), (10, admin_reports), (10, ban_and_unban),
+        (10, review_host_application), (10, register_and_delete), (5, admin_login),
+        (5, admin_jobs), (5, sync_changes), (3, bulk_ban_and_unban), (3, bulk_review_host_applications),
+        (3, register_and_bulk_delete), (2, admin_diagnostics),
+    ],
+}
+# Default: mostly guests browsing, some hosts, a few admins
+MIXES["mixed"] = (
+    [(weight * 7, op) for weight, op in MIXES["browse"]]
+    + [(weight * 2, op) for weight, op in MIXES["host"]]
+    + [(weight, op) for weight, op in MIXES["admin"]]
+)
+
+
+def virtual_user(base_url, recorder, ctx, mix, deadline, think, seed):
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in mix]
+    operations = [op for _, op in mix]
+    # Every virtual user carries the admin session so the admin routes are reachable
+    client = Client(base_url, recorder, token=ctx.admin_token, rejected=ctx.rejected)
+    try:
+        while time.monotonic() < deadline and not ctx.rejected.is_set():
+            rng.choices(operations, weights)[0](client, ctx, rng)
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+    finally:
+        client.close()
+
+
+def percentiles(samples):
+    if len(samples) == 1:
+        return samples[0], samples[0], samples[0]
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def report(recorder, elapsed):
+    print(f"\n{'route':48} {'count':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'4xx':>6} {'5xx/err':>8}")
+    total = 0
+    failures = 0
+    everything = []
+    for label in sorted(recorder.latencies):
+        samples = recorder.latencies[label]
+        statuses = recorder.statuses[label]
+        client_errors = sum(n for s, n in statuses.items() if isinstance(s, int) and 400 <= s < 500)
+        server_errors = sum(n for s, n in statuses.items() if s == "error" or (isinstance(s, int) and s >= 500))
+        p50, p95, p99 = percentiles(samples)
+        print(f"{label:48} {len(samples):7d} {len(samples) / elapsed:8.1f} "
+              f"{p50 * 1000:8.1f} {p95 * 1000:8.1f} {p99 * 1000:8.1f} {client_errors:6d} {server_errors:8d}")
+        total += len(samples)
+        failures += server_errors
+        everything.extend(samples)
+    if everything:
+        p50, p95, p99 = percentiles(everything)
+        print(f"{'all routes':48} {total:7d} {total / elapsed:8.1f} "
+              f"{p50 * 1000:8.1f} {p95 * 1000:8.1f} {p99 * 1000:8.1f} {'':6} {failures:8d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--database", help="database the API serves (defaults to DB_NAME)")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--users", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--think", type=float, default=0, help="mean pause between operations in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--admin-username", default="admin")
+    parser.add_argument("--admin-password", default="admin")
+    args = parser.parse_args()
+
+    config = dict(db.DB_CONFIG)
+    if args.database:
+        config["database"] = args.database
+    ctx = Context(sample_ids(config))
+    recorder = Recorder()
+    status, body = Client(args.base_url, recorder).request(
+        "POST /api/auth/admin-login", "POST", "/api/auth/admin-login",
+        {"username": args.admin_username, "password": args.admin_password},
+    )
+    if status != 200:
+        raise SystemExit(f"Admin login failed ({status}); pass --admin-username/--admin-password")
+    ctx.admin_token = body["token"]
+    # Fresh connections land on different workers; each must accept the token
+    for _ in range(16):
+        probe = Client(args.base_url, Recorder(), token=ctx.admin_token, rejected=ctx.rejected)
+        probe.request("GET /api/admin/stats", "GET", "/api/admin/stats")
+        probe.close()
+    if ctx.rejected.is_set():
+        raise SystemExit(REJECTED)
+
+    print(f"{args.users} virtual users, mix '{args.mix}', {args.duration:.0f}s against {args.base_url}")
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(
+            target=virtual_user,
+            args=(args.base_url, recorder, ctx, MIXES[args.mix], deadline, args.think, args.seed + i),
+            daemon=True,
+        )
+        for i in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(recorder, time.monotonic() - start)
+    if ctx.rejected.is_set():
+        raise SystemExit(REJECTED)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+from serialize import dumps
+
+# Cache configuration (override with environment variables)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")  # 'local' or 'redis'
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_PREFIX = "jirao:"
+
+MISSING = object()
+
+
+class LocalBackend:
+    """
+    In-process LRU cache with per-entry TTL. Safe to share between the event
+    loop and the DB worker threads. Each worker process keeps its own copy, so
+    use the redis backend when running several uvicorn workers.
+
+    Values are stored encoded, like the redis backend stores them, so every
+    hit decodes a fresh copy that callers are free to modify.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+        return orjson.loads(value)
+
+    def set(self, key, value, ttl):
+        value = dumps(value)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    # Counters live outside the LRU so eviction can never reset a generation or version
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Shared cache for multi-worker deployments. Values are stored as JSON, so
+    datetimes come back as the same "...Z" strings the API sends.
+    Eviction is left to Redis: configure maxmemory-policy volatile-lru, so
+    only entries (which have a TTL) are evicted, never the version counters.
+    """
+
+    blocking = True
+
+    def __init__(self, url=CACHE_REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(CACHE_PREFIX + key)
+        if raw is None:
+            return MISSING
+        return json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(CACHE_PREFIX + key, dumps(value), px=int(ttl * 1000))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(CACHE_PREFIX + key for key in keys))
+
+    def incr(self, key):
+        return self._client.incr(CACHE_PREFIX + key)
+
+    def counter(self, key):
+        return int(self._client.get(CACHE_PREFIX + key) or 0)
+
+    def __len__(self):
+        return self._client.dbsize()
+
+
+class Cache:
+    """
+    Read-through cache for API responses, keyed by query shape.
+
+    Keys that can be invalidated exactly (one space, one host's listing) are
+    stored under `<key>#<version>`; invalidate() bumps the version. A load
+    that started before the invalidation therefore fills the old version,
+    which nobody reads any more, instead of overwriting the fresh state with
+    what it read. Listing pages depend on filters, so their keys embed a
+    generation number that every space write bumps instead.
+    """
+
+    def __init__(self, backend, ttl=CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    async def _call(self, fn, *args):
+        # Keep network round trips of a shared backend off the event loop
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _lookup(self, key):
+        versioned = f"{key}#{self.backend.counter(f'ver:{key}')}"
+        return versioned, self.backend.get(versioned)
+
+    async def read_through(self, key, load, ttl=None):
+        """Return the cached value for key, or await load() and cache its result."""
+        # The version is read before load(), so an invalidation during the load wins
+        versioned, value = await self._call(self._lookup, key)
+        if value is not MISSING:
+            self._count(True)
+            return value
+        self._count(False)
+        value = await load()
+        await self._call(self.backend.set, versioned, value, ttl or self.ttl)
+        return value
+
+    async def generation(self, name):
+        return await self._call(self.backend.counter, f"gen:{name}")
+
+    # Invalidation is called from DB worker threads right after a commit
+
+    def invalidate(self, *keys):
+        for key in keys:
+            version = self.backend.incr(f"ver:{key}")
+            # Not needed for correctness (nobody reads it now), just frees the entry early
+            self.backend.delete(f"{key}#{version - 1}")
+
+    def bump(self, name):
+        self.backend.incr(f"gen:{name}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+
+def _make_backend():
+    if CACHE_BACKEND == "redis":
+        return RedisBackend()
+    return LocalBackend()
+
+
+cache = Cache(_make_backend())
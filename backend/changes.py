@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import os
+from decimal import Decimal
+
+import orjson
+from mysql.connector import Error
+
+import db
+from serialize import dumps
+
+# Change feed settings (override with environment variables)
+CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "1000"))
+CHANGES_MAX_PAGE_SIZE = 10000
+CHANGES_RETENTION_DAYS = float(os.getenv("CHANGES_RETENTION_DAYS", "30"))
+CHANGES_PRUNE_INTERVAL = float(os.getenv("CHANGES_PRUNE_INTERVAL", "3600"))
+# Rows deleted per transaction while pruning
+CHANGES_PRUNE_BATCH = 5000
+
+ENTITIES = ("space", "interest", "user")
+
+logger = logging.getLogger("jirao.changes")
+
+
+class CursorExpired(Exception):
+    """The changes after the cursor were pruned; the client has to reload in full."""
+
+
+def record(cursor, entity, entity_id, op, data=None, user_id=None, owner_id=None):
+    """Append one change; see record_many."""
+    record_many(cursor, [(entity, entity_id, op, data, user_id, owner_id)])
+
+
+def record_many(cursor, rows):
+    """
+    Append (entity, entity_id, op, data, user_id, owner_id) rows in the
+    caller's transaction with one multi-row INSERT. `data` is the changed
+    columns only; None for deletes.
+
+    The ids come from the change_sequence row, whose lock is held until the
+    caller commits: concurrent writers queue there, so ids commit in order
+    and readers never see an id before every lower one. Call it as the last
+    statement before the commit to keep that queue short; what the queue
+    costs is measured by bench/bench_changes.py.
+    """
+    if not rows:
+        return
+    cursor.execute(
+        "UPDATE change_sequence SET last_id = LAST_INSERT_ID(last_id + %s) WHERE id = 1",
+        (len(rows),)
+    )
+    if cursor.rowcount != 1:
+        raise Error("change_sequence has no row; run migrate.py")
+    first_id = cursor.lastrowid - len(rows) + 1
+    cursor.executemany("""
+    INSERT INTO changes (id, entity, entity_id, op, data, user_id, owner_id, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, UTC_TIMESTAMP(3))
+    """, [
+        (first_id + offset, entity, entity_id, op, None if data is None else dumps(data).decode(), user_id, owner_id)
+        for offset, (entity, entity_id, op, data, user_id, owner_id) in enumerate(rows)
+    ])
+
+
+def _comparable(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def diff(old, new):
+    """The entries of `new` whose value differs from `old` (DECIMAL columns compare as floats)."""
+    return {key: value for key, value in new.items() if _comparable(old.get(key)) != _comparable(value)}
+
+
+def head(cursor):
+    """
+    Id of the newest committed change (0 when there is none). Ids commit in
+    order (see record_many), so every lower id is committed too.
+    """
+    cursor.execute("SELECT MAX(id) FROM changes")
+    (top,) = cursor.fetchone()
+    return top or 0
+
+
+def read(cursor, since, limit, viewer_id=None, entities=ENTITIES):
+    """
+    Changes after `since` up to the head, oldest first, at most
+    `limit` rows scanned into the page. viewer_id None reads everything
+    (admins); otherwise spaces plus that user's own interests.
+
+    Returns (rows, cursor, more): pass `cursor` as the next `since`.
+    Raises CursorExpired when rows after `since` were already pruned.
+    """
+    cursor.execute("SELECT MIN(id) FROM changes")
+    (oldest,) = cursor.fetchone()
+    if oldest is not None and since < oldest - 1:
+        raise CursorExpired()
+    top = head(cursor)
+    if top <= since:
+        return [], since, False
+
+    where = [f"entity IN ({', '.join(['%s'] * len(entities))})"]
+    params = [*entities]
+    if viewer_id is not None:
+        where.append("(entity = 'space' OR user_id = %s OR owner_id = %s)")
+        params += [viewer_id, viewer_id]
+    cursor.execute(f"""
+    SELECT id, entity, entity_id, op, data, created_at
+    FROM changes
+    WHERE id > %s AND id <= %s AND {" AND ".join(where)}
+    ORDER BY id
+    LIMIT %s
+    """, (since, top, *params, limit + 1))
+    rows = cursor.fetchall()
+    more = len(rows) > limit
+    if more:
+        rows = rows[:limit]
+        return rows, rows[-1][0], True
+    # Fewer than a page: everything up to the head has been seen, matching or not
+    return rows, top, False
+
+
+def compact(rows):
+    """
+    Fold a page of change rows to one delta per entity, in order of its last
+    change: updates merge into the earlier create or update, a delete drops
+    the data, and an entity created and deleted within the page disappears.
+    """
+    deltas = {}
+    for _, entity, entity_id, op, data, created_at in rows:
+        key = (entity, entity_id)
+        data = orjson.loads(data) if data else None
+        previous = deltas.pop(key, None)
+        if previous is not None and previous["op"] != "delete":
+            if op == "delete":
+                if previous["op"] == "create":
+                    continue
+            else:
+                data = {**previous.get("data", {}), **(data or {})}
+                op = previous["op"]
+        delta = {"entity": entity, "id": entity_id, "op": op, "at": created_at}
+        if data:
+            delta["data"] = data
+        deltas[key] = delta
+    return list(deltas.values())
+
+
+def prune(connection, retention_days=CHANGES_RETENTION_DAYS):
+    """Delete changes older than the retention, in id order and in batches. Returns the row count."""
+    cursor = connection.cursor()
+    try:
+        # The first row to keep; everything before it (in id order) goes
+        cursor.execute("""
+        SELECT id FROM changes
+        WHERE created_at >= UTC_TIMESTAMP(3) - INTERVAL %s SECOND
+        ORDER BY id
+        LIMIT 1
+        """, (int(retention_days * 86400),))
+        row = cursor.fetchone()
+        if row is None:
+            # All expired: keep the newest row, so older cursors are still told they expired
+            cursor.execute("SELECT MAX(id) FROM changes")
+            row = cursor.fetchone()
+        keep_from = row[0]
+        connection.commit()
+        removed = 0
+        while keep_from is not None:
+            cursor.execute("DELETE FROM changes WHERE id < %s ORDER BY id LIMIT %s",
+                           (keep_from, CHANGES_PRUNE_BATCH))
+            count = cursor.rowcount
+            connection.commit()
+            removed += count
+            if count < CHANGES_PRUNE_BATCH:
+                break
+        return removed
+    finally:
+        cursor.close()
+
+
+def _prune():
+    with db.init_pool().get() as connection:
+        return prune(connection)
+
+
+async def prune_forever(interval=CHANGES_PRUNE_INTERVAL):
+    """Background task: prune now, then every `interval` seconds."""
+    while True:
+        try:
+            removed = await db.run_db(_prune)
+            if removed:
+                logger.info("Pruned %d changes older than %g days", removed, CHANGES_RETENTION_DAYS)
+        except Error as e:
+            logger.warning("Pruning the change log failed: %s", e)
+        except Exception:
+            logger.exception("Pruning the change log failed")
+        await asyncio.sleep(interval)
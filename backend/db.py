@@ -0,0 +1,213 @@
+import asyncio
+import functools
+import os
+import queue
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+from mysql.connector import Error
+
+import metrics
+import profiling
+
+# Database configuration (override with environment variables)
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "database": os.getenv("DB_NAME", "jirao_db"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+}
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+# Worker threads that run blocking DB calls; defaults to the pool size so a
+# thread never waits on the pool for longer than a query takes
+DB_THREADS = int(os.getenv("DB_THREADS", str(DB_POOL_SIZE)))
+# Idle connections older than this are pinged before being handed out
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))
+
+
+class PoolTimeout(Error):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a mysql.connector connection checked out of a ConnectionPool.
+    Everything is forwarded to the real connection except cursor(), which returns
+    a metrics.TimedCursor, and close(), which hands the connection back to the
+    pool instead of dropping it.
+
+    Use it as a context manager (`with pool.get() as connection:`) to have it
+    closed on exit. A proxy that is garbage collected while still checked out
+    returns its slot too, with a ResourceWarning, so a missed close() cannot
+    shrink the pool for good.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._cursors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        if self.__dict__.get("_connection") is not None:
+            warnings.warn("Pooled connection was never closed; returning it to the pool",
+                          ResourceWarning, stacklevel=2)
+            self.close()
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise Error("Connection already returned to the pool")
+        return getattr(self._connection, name)
+
+    def is_connected(self):
+        # True until close() so callers always hand the connection back; the pool
+        # itself drops it on release if the server side has gone away.
+        return self._connection is not None
+
+    def cursor(self, *args, **kwargs):
+        if self._connection is None:
+            raise Error("Connection already returned to the pool")
+        cursor = metrics.TimedCursor(self._connection.cursor(*args, **kwargs))
+        self._cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        if self._connection is not None:
+            # Record statements on cursors the handler never closed
+            for cursor in self._cursors:
+                cursor.flush()
+            self._cursors = []
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+
+class ConnectionPool:
+    """
+    Fixed-size MySQL connection pool.
+
+    - Connections are opened lazily, up to `size`.
+    - get() blocks for at most `timeout` seconds when every connection is in use.
+    - Connections that sat idle for more than `ping_after` seconds are pinged on
+      checkout and replaced if the server dropped them.
+    - Open transactions are rolled back on release so the next request never
+      sees a stale snapshot.
+    """
+
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, ping_after=DB_POOL_PING_AFTER, **config):
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.config = config or DB_CONFIG
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._closed = False
+
+    def get(self):
+        if self._closed:
+            raise Error("Connection pool is closed")
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        metrics.POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+        if not acquired:
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        try:
+            connection = self._checkout_idle()
+            if connection is None:
+                start = time.perf_counter()
+                connection = mysql.connector.connect(**self.config)
+                metrics.CONNECT_SECONDS.observe(time.perf_counter() - start)
+        except Exception:
+            self._slots.release()
+            raise
+        return PooledConnection(self, connection)
+
+    def _checkout_idle(self):
+        while True:
+            try:
+                connection, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - released_at < self.ping_after:
+                return connection
+            try:
+                connection.ping(reconnect=False)
+                return connection
+            except Error:
+                self._discard(connection)
+
+    def release(self, connection):
+        try:
+            if self._closed:
+                self._discard(connection)
+                return
+            if connection.in_transaction:
+                connection.rollback()
+            self._idle.put((connection, time.monotonic()))
+        except Error:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def close(self):
+        """Close every idle connection; connections still checked out are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
+
+
+pool = None
+executor = None
+
+
+def init_pool():
+    global pool, executor
+    if pool is None:
+        pool = ConnectionPool()
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
+    return pool
+
+
+def close_pool():
+    global pool, executor
+    if executor is not None:
+        executor.shutdown(wait=True)
+        executor = None
+    if pool is not None:
+        pool.close()
+        pool = None
+
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Run a blocking database function on the DB thread pool and await its result,
+    so mysql.connector calls never stall the event loop.
+    Exceptions raised by fn (including HTTPException) propagate to the caller.
+    """
+    init_pool()
+    profile = profiling.current.get()
+    if profile is not None:
+        fn = profile.wrap(fn)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import threading
+
+import metrics
+from serialize import dumps
+
+# Event push configuration (override with environment variables)
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "local")  # 'local' or 'redis'
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+# Undelivered events per open stream; a client that falls further behind is told to resync
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+# Seconds between keep-alive comments on an idle stream (also when revoked sessions are noticed)
+EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15"))
+EVENTS_CHANNEL = "jirao:events"
+# Pause before resubscribing after the redis connection dropped
+EVENTS_RECONNECT_DELAY = 5
+
+logger = logging.getLogger("jirao.events")
+
+# Put on a subscription's queue when it overflowed
+RESYNC = object()
+
+
+class LocalBackend:
+    """
+    Hands events straight to this process's streams. Each uvicorn worker only
+    sees its own publishes, so use the redis backend with several workers.
+    """
+
+    def __init__(self):
+        self.receive = None
+
+    def publish(self, message):
+        self.receive(message)
+
+    async def listen(self):
+        pass
+
+
+class RedisBackend:
+    """Redis pub/sub: every worker receives every event and delivers it to its own streams."""
+
+    def __init__(self, url=EVENTS_REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("EVENTS_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self.receive = None
+
+    def publish(self, message):
+        self._client.publish(EVENTS_CHANNEL, message)
+
+    async def listen(self):
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await asyncio.to_thread(pubsub.subscribe, EVENTS_CHANNEL)
+                while True:
+                    message = await asyncio.to_thread(pubsub.get_message, timeout=1.0)
+                    if message is not None:
+                        self.receive(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event subscription to redis lost, retrying: %s", e)
+                await asyncio.sleep(EVENTS_RECONNECT_DELAY)
+            finally:
+                pubsub.close()
+
+
+class Subscription:
+    def __init__(self, topics, size):
+        self.topics = topics
+        self.queue = asyncio.Queue(size)
+
+
+class Hub:
+    """
+    Pub/sub for pushing changes to open client streams.
+
+    Events are published to topics ("user:<id>") and encoded once, as
+    `<type> <topic>,<topic>\\n<json>`, so the backend and every stream pass
+    the same bytes along. Publishing is fire-and-forget: it never fails the
+    write that caused it, and streams that fall behind get a resync marker
+    instead of holding memory.
+    """
+
+    def __init__(self, backend, queue_size=EVENTS_QUEUE_SIZE):
+        self.backend = backend
+        self.backend.receive = self._receive
+        self.queue_size = queue_size
+        self._topics = {}
+        self._loop = None
+        self._lock = threading.Lock()
+
+    # Streams, on the event loop
+
+    def subscribe(self, topics):
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(tuple(topics), self.queue_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def streams(self):
+        with self._lock:
+            return len({subscription for subscribers in self._topics.values() for subscription in subscribers})
+
+    async def run(self):
+        """Background task: receive events published by other workers (redis backend)."""
+        self._loop = asyncio.get_running_loop()
+        await self.backend.listen()
+
+    # Publishing is called from DB worker threads right after a commit
+
+    def publish(self, topics, type_, data):
+        message = f"{type_} {','.join(topics)}\n".encode() + dumps({"type": type_, "data": data})
+        try:
+            self.backend.publish(message)
+        except Exception as e:
+            logger.warning("Could not publish %s event: %s", type_, e)
+
+    def _receive(self, message):
+        # Any thread; nothing to deliver before the first stream opened here
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, message)
+
+    def _deliver(self, message):
+        header, _, event = message.partition(b"\n")
+        type_, _, topics = header.partition(b" ")
+        with self._lock:
+            targets = {
+                subscription
+                for topic in topics.decode().split(",")
+                for subscription in self._topics.get(topic, ())
+            }
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait((type_, event))
+            except asyncio.QueueFull:
+                # Drop the backlog; the client reloads once instead
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(RESYNC)
+
+
+async def stream(topics, still_valid, keepalive=EVENTS_KEEPALIVE):
+    """
+    Server-Sent Events body subscribed to `topics`. Each event is sent as
+    `event: <type>` with the JSON envelope as data. `resync` means events
+    were dropped and the client should refetch. Every `keepalive` seconds of
+    silence a comment line is sent. `await still_valid()` is checked before
+    each event and keepalive; the stream ends when it returns False, so a
+    revoked session is never sent another event.
+    """
+    # Subscribed here, not by the caller, so the finally below always runs
+    subscription = hub.subscribe(topics)
+    try:
+        yield b"retry: 5000\nevent: ready\ndata: {}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                event = None
+            if not await still_valid():
+                return
+            if event is None:
+                yield b": keepalive\n\n"
+                continue
+            if event is RESYNC:
+                yield b"event: resync\ndata: {}\n\n"
+                return
+            type_, data = event
+            yield b"event: " + type_ + b"\ndata: " + data + b"\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def _make_backend():
+    if EVENTS_BACKEND == "redis":
+        return RedisBackend()
+    return LocalBackend()
+
+
+hub = Hub(_make_backend())
+
+EVENT_STREAMS = metrics.Gauge(
+    "jirao_event_streams", "Open event streams in this worker.",
+    lambda: {(): hub.streams()},
+)
+metrics.REGISTRY.append(EVENT_STREAMS)
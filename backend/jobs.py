@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import os
+import secrets
+import socket
+import time
+
+import orjson
+from mysql.connector import Error
+
+import db
+import metrics
+from serialize import dumps
+
+# Background job settings (override with environment variables)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # per process; 0 runs no jobs here
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Delay before the first retry; doubled for every further attempt
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+# A running job whose worker has not finished it within this many seconds is
+# assumed lost (process killed) and queued again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+# Pause after the jobs table could not be read (database down, migration missing)
+JOB_ERROR_BACKOFF = 30
+
+logger = logging.getLogger("jirao.jobs")
+
+handlers = {}
+
+_loop = None
+_wakeup = None
+_last_recovery = 0.0
+
+
+class JobFailed(Exception):
+    """Raised by a handler for an error that retrying cannot fix; the job fails at once."""
+
+
+def handler(kind):
+    """
+    Register `fn(connection, payload) -> result` as the handler for jobs of `kind`.
+
+    Handlers run on the DB thread pool with a pooled connection and commit
+    their own work. A job can run more than once (retries, a lost lease), so
+    handlers must be idempotent: check what is left to do before doing it.
+    """
+    def register(fn):
+        handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(cursor, kind, payload, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Queue a job in the caller's transaction, so it exists only if that commits.
+    Returns the job id; call wake() after the commit to skip the poll delay.
+    """
+    if kind not in handlers:
+        raise ValueError(f"No handler for job kind {kind!r}")
+    cursor.execute("""
+    INSERT INTO jobs (kind, payload, max_attempts, run_after, created_at)
+    VALUES (%s, %s, %s, UTC_TIMESTAMP(3), UTC_TIMESTAMP(3))
+    """, (kind, dumps(payload).decode(), max_attempts))
+    return cursor.lastrowid
+
+
+def wake():
+    """Nudge the job workers of this process. Safe to call from DB threads."""
+    if _loop is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+def _recover_lost():
+    global _last_recovery
+    if time.monotonic() - _last_recovery < JOB_LEASE_SECONDS / 4:
+        return
+    _last_recovery = time.monotonic()
+    with db.init_pool().get() as connection:
+        cursor = connection.cursor()
+        # A job that keeps taking its worker down has used up its attempts
+        cursor.execute("""
+        UPDATE jobs
+        SET status = 'failed', error = 'Worker went away on the last attempt', locked_by = NULL,
+            finished_at = UTC_TIMESTAMP(3)
+        WHERE status = 'running' AND locked_at < UTC_TIMESTAMP(3) - INTERVAL %s SECOND
+          AND attempts >= max_attempts
+        """, (int(JOB_LEASE_SECONDS),))
+        failed = cursor.rowcount
+        cursor.execute("""
+        UPDATE jobs SET status = 'queued', locked_by = NULL, run_after = UTC_TIMESTAMP(3)
+        WHERE status = 'running' AND locked_at < UTC_TIMESTAMP(3) - INTERVAL %s SECOND
+        """, (int(JOB_LEASE_SECONDS),))
+        requeued = cursor.rowcount
+        connection.commit()
+        if failed:
+            logger.warning("Failed %d jobs whose worker went away on their last attempt", failed)
+        if requeued:
+            logger.warning("Requeued %d jobs whose worker went away", requeued)
+        cursor.close()
+
+
+def _claim(worker):
+    """
+    Take the oldest due job. The claim is one conditional UPDATE stamped with
+    a fresh token, so two workers (in any process) never get the same job.
+    """
+    _recover_lost()
+    token = f"{worker}:{secrets.token_hex(4)}"
+    with db.init_pool().get() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+        UPDATE jobs
+        SET status = 'running', attempts = attempts + 1, locked_by = %s,
+            locked_at = UTC_TIMESTAMP(3), started_at = COALESCE(started_at, UTC_TIMESTAMP(3))
+        WHERE status = 'queued' AND run_after <= UTC_TIMESTAMP(3)
+        ORDER BY id
+        LIMIT 1
+        """, (token,))
+        if cursor.rowcount == 0:
+            connection.commit()
+            cursor.close()
+            return None
+        cursor.execute("""
+        SELECT id, kind, payload, attempts, max_attempts,
+               TIMESTAMPDIFF(MICROSECOND, created_at, locked_at) / 1000000
+        FROM jobs
+        WHERE locked_by = %s
+        """, (token,))
+        row = cursor.fetchone()
+        connection.commit()
+        cursor.close()
+        return (*row, token)
+
+
+def _run(kind, payload):
+    fn = handlers.get(kind)
+    if fn is None:
+        raise JobFailed(f"No handler for job kind {kind!r}")
+    with db.init_pool().get() as connection:
+        return fn(connection, payload)
+
+
+def _finish(job_id, token, status, result, error, retry_in):
+    with db.init_pool().get() as connection:
+        cursor = connection.cursor()
+        if status == "queued":
+            cursor.execute("""
+            UPDATE jobs
+            SET status = 'queued', error = %s, locked_by = NULL,
+                run_after = UTC_TIMESTAMP(3) + INTERVAL %s SECOND
+            WHERE id = %s AND locked_by = %s
+            """, (error, int(retry_in), job_id, token))
+        else:
+            cursor.execute("""
+            UPDATE jobs
+            SET status = %s, result = %s, error = %s, locked_by = NULL, finished_at = UTC_TIMESTAMP(3)
+            WHERE id = %s AND locked_by = %s
+            """, (status, result, error, job_id, token))
+        connection.commit()
+        cursor.close()
+
+
+async def _execute(job):
+    job_id, kind, payload, attempts, max_attempts, waited, token = job
+    if attempts == 1 and waited is not None:
+        metrics.JOB_WAIT_SECONDS.observe(float(waited), kind)
+
+    result = error = None
+    retry_in = 0
+    start = time.perf_counter()
+    try:
+        result = dumps(await db.run_db(_run, kind, orjson.loads(payload))).decode()
+        status = "succeeded"
+    except JobFailed as e:
+        status, error = "failed", str(e)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if attempts < max_attempts:
+            status, retry_in = "queued", JOB_RETRY_DELAY * 2 ** (attempts - 1)
+        else:
+            status = "failed"
+    metrics.JOB_SECONDS.observe(time.perf_counter() - start, kind, status)
+    if error:
+        logger.warning("Job %s (%s) attempt %d/%d: %s -> %s", job_id, kind, attempts, max_attempts, error, status)
+
+    try:
+        await db.run_db(_finish, job_id, token, status, result, error, retry_in)
+    except Error as e:
+        # The lease runs out and the job is retried (handlers are idempotent), or
+        # marked failed if this was its last attempt
+        logger.warning("Could not record the outcome of job %s: %s", job_id, e)
+
+
+async def _worker(name):
+    while True:
+        try:
+            job = await db.run_db(_claim, name)
+        except Error as e:
+            logger.warning("Job worker %s cannot read the jobs table: %s", name, e)
+            await asyncio.sleep(JOB_ERROR_BACKOFF)
+            continue
+        except Exception:
+            logger.exception("Job worker %s failed to claim a job", name)
+            await asyncio.sleep(JOB_ERROR_BACKOFF)
+            continue
+        if job is not None:
+            await _execute(job)
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+async def run_forever(workers=JOB_WORKERS):
+    """Background task: run `workers` job workers until cancelled."""
+    global _loop, _wakeup
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    tasks = [asyncio.create_task(_worker(f"{prefix}:{i}")) for i in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
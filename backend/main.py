@@ -1,11 +1,59 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 import mysql.connector
-from mysql.connector import Error
-from datetime import datetime
+from mysql.connector import Error, errorcode
+from contextlib import asynccontextmanager
+import asyncio
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import base64
+import csv
+import hashlib
+import io
 import json
-
-app = FastAPI(title="JIRAO API", version="1.0.0")
+import math
+import os
+import re
+import threading
+
+import changes
+import db
+import events
+import jobs
+import metrics
+import passwords
+import profiling
+from serialize import FastJSONResponse, RowSchema, dumps
+from cache import cache
+from sessions import sessions
+from ratelimit import limiter, client_ip
+from stats import stats, reconcile_stats, reconcile_forever
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Open the connection pool once per worker and drain it on shutdown
+    db.init_pool()
+    # Admin statistics are recounted at startup and then periodically
+    reconciler = asyncio.create_task(reconcile_forever())
+    # Background jobs queued by the admin endpoints (jobs.py)
+    job_runner = asyncio.create_task(jobs.run_forever())
+    # Interest events published by the other workers (events.py)
+    event_listener = asyncio.create_task(events.hub.run())
+    # Drops change log rows past their retention (changes.py)
+    change_pruner = asyncio.create_task(changes.prune_forever())
+    yield
+    change_pruner.cancel()
+    event_listener.cancel()
+    job_runner.cancel()
+    reconciler.cancel()
+    db.close_pool()
+    passwords.shutdown()
+
+
+app = FastAPI(title="JIRAO API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -16,35 +64,353 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in single-request profiles (PROFILING_ENABLED), see profiling.py
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Per-route latency and response size, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Database connection
 def get_db_connection():
     """
-    Create and return a MySQL database connection.
-    Configure your database credentials here.
+    Check out a MySQL connection from the shared pool.
+    Configure credentials and pool size in db.py (or via DB_* environment variables).
+    Calling close() on the returned connection hands it back to the pool.
     """
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='jirao_db',
-            user='root',
-            password=''
-        )
-        return connection
+        return db.init_pool().get()
+    except db.PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=f"Database busy: {str(e)}")
     except Error as e:
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
 
+# Sessions
+async def current_session(request: Request):
+    """
+    Dependency: the caller's session from "Authorization: Bearer <token>".
+    Checked against the user's session_version through the cache; a query
+    only on a cache miss.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    session = await sessions.authenticate(token)
+    if session is None:
+        raise HTTPException(status_code=401, detail="Session expired or revoked")
+    return session
+
+async def require_admin(session=Depends(current_session)):
+    if session.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return session
+
+# Rate limiting
+async def enforce_rate_limit(route, request: Request, identifier=None):
+    """
+    Charge the caller's IP and the submitted identifier against `route`'s
+    token buckets (ratelimit.py). Called before any database work, so
+    rejected attempts never take a pool connection.
+    """
+    retry_after = await limiter.check(route, client_ip(request.client, request.headers), identifier)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+# Passwords
+async def upgrade_password_hash(user, password):
+    """
+    Re-store a just-verified password under the current KDF parameters:
+    legacy plaintext rows (and the pending_hosts copy a host was approved
+    from) or hashes made with older settings. The old value is part of the
+    WHERE clause, so a concurrent password change is never overwritten.
+    """
+    new_hash = await passwords.hash_password(password)
+
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+            cursor.execute("UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                           (new_hash, user["id"], user["password"]))
+            cursor.execute("UPDATE pending_hosts SET password = %s WHERE email = %s AND password = %s",
+                           (new_hash, user["email"], user["password"]))
+            connection.commit()
+        except (Error, HTTPException):
+            # The login already succeeded; the next one retries the upgrade
+            pass
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    await db.run_db(work)
+
+# Rows fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+async def ndjson_response(query, params, schema, filename):
+    """
+    Stream the rows of `query` as NDJSON, one JSON object per line.
+
+    The cursor is unbuffered, so rows stay on the server and are pulled
+    EXPORT_BATCH_SIZE at a time; memory stays flat however large the table is.
+    The query runs before the response starts so errors still get a proper
+    status code. Every fetch runs on the DB thread pool.
+
+    The connection is handed back by a background task, which Starlette runs
+    after the body whether it finished or the client went away, even before
+    the first chunk. A fetch still running on a DB thread when the client
+    disconnects holds the lock, so the release waits for it.
+    """
+    connection = await db.run_db(get_db_connection)
+    try:
+        cursor = connection.cursor()
+        await db.run_db(cursor.execute, query, params)
+    except Error as e:
+        await db.run_db(connection.close)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            return cursor.fetchmany(EXPORT_BATCH_SIZE)
+
+    def release():
+        # A client that disconnects mid-stream leaves unread rows behind;
+        # the pool then drops that connection instead of reusing it
+        with lock:
+            connection.close()
+
+    async def rows():
+        try:
+            while True:
+                batch = await db.run_db(fetch)
+                if not batch:
+                    break
+                yield b"".join(dumps(schema.row(row)) + b"\n" for row in batch)
+        finally:
+            # Return it as soon as the last row is out; close() is idempotent
+            await db.run_db(release)
+
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(db.run_db, release),
+    )
+
+# HTTP conditional requests for space reads
+
+def _as_utc(value):
+    # updated_at is a UTC TIMESTAMP; the redis cache hands it back as an ISO string
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.removesuffix("Z"))
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+def conditional_response(request, body, spaces, last_modified=False):
+    """
+    Answer with 304 Not Modified when the client already holds the current
+    version of `body`, otherwise send it with validators.
+
+    The ETag is a hash of the encoded body, so it changes with anything the
+    client would see: any field of any space (even two updates within the
+    same second of updated_at) and the page's next_cursor. Last-Modified is
+    only sent for single spaces: a deletion from a listing would not move
+    its newest updated_at forward.
+    """
+    response = FastJSONResponse(body)
+    etag = 'W/"' + hashlib.sha1(response.body).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    modified = None
+    if last_modified and spaces:
+        modified = max(_as_utc(space["updated_at"]) for space in spaces)
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as required for GET
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+    elif modified is not None and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and since.tzinfo is not None and modified <= since:
+            return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return response
+
+# Page sizes for GET /api/spaces
+SPACES_PAGE_SIZE = 50
+SPACES_MAX_PAGE_SIZE = 200
+
+# Response rows, read with tuple cursors (see serialize.RowSchema).
+# geo_point is index-only and never selected; rooms never carry dimensions.
+SPACE_FIELDS = (
+    ("id", "s.id"),
+    ("owner_id", "s.owner_id"),
+    ("type", "s.type"),
+    ("title", "s.title"),
+    ("location", "s.location"),
+    ("latitude", "s.latitude"),
+    ("longitude", "s.longitude"),
+    ("rate_per_hour", "s.rate_per_hour"),
+    ("description", "s.description"),
+    ("availability", "s.availability"),
+    ("dimensions", "CASE WHEN s.type = 'parking' THEN s.dimensions END"),
+    ("created_at", "s.created_at"),
+    ("updated_at", "s.updated_at"),
+    ("owner_name", "u.username"),
+)
+SPACE_ROW = RowSchema(*SPACE_FIELDS, json_columns=("dimensions",))
+SEARCH_SPACE_ROW = RowSchema(
+    *SPACE_FIELDS,
+    ("relevance", "MATCH(s.title, s.location, s.description) AGAINST (%s IN BOOLEAN MODE)"),
+    json_columns=("dimensions",),
+)
+NEARBY_SPACE_ROW = RowSchema(
+    *SPACE_FIELDS,
+    ("distance_km", "ROUND(ST_Distance_Sphere(s.geo_point, POINT(%s, %s)) / 1000, 3)"),
+    json_columns=("dimensions",),
+)
+
+INTEREST_FIELDS = (
+    ("id", "i.id"),
+    ("user_id", "i.user_id"),
+    ("space_id", "i.space_id"),
+    ("hours_requested", "i.hours_requested"),
+    ("status", "i.status"),
+    ("host_response_date", "i.host_response_date"),
+    ("timestamp", "i.timestamp"),
+)
+# get_user_interests: interest plus the space it is for
+USER_INTEREST_ROW = RowSchema(
+    *INTEREST_FIELDS,
+    ("space_title", "s.title"),
+    ("space_location", "s.location"),
+    ("space_rate", "s.rate_per_hour"),
+)
+# get_space_interests: interest plus the guest who sent it
+SPACE_INTEREST_ROW = RowSchema(
+    *INTEREST_FIELDS,
+    ("user_name", "u.username"),
+    ("user_email", "u.email"),
+)
+
+REPORT_ROW = RowSchema(
+    ("id", "r.id"),
+    ("reporter_id", "r.reporter_id"),
+    ("reported_id", "r.reported_id"),
+    ("reason", "r.reason"),
+    ("timestamp", "r.timestamp"),
+    ("reporter_role", "reporter.role"),
+    ("reported_role", "reported.role"),
+    ("reporter_name", "reporter.username"),
+    ("reported_name", "reported.username"),
+    ("reporter_email", "reporter.email"),
+    ("reported_email", "reported.email"),
+)
+
+JOB_ROW = RowSchema(
+    ("id", "id"),
+    ("kind", "kind"),
+    ("status", "status"),
+    ("attempts", "attempts"),
+    ("max_attempts", "max_attempts"),
+    ("payload", "payload"),
+    ("result", "result"),
+    ("error", "error"),
+    ("created_at", "created_at"),
+    ("started_at", "started_at"),
+    ("finished_at", "finished_at"),
+    # Queue wait until the first attempt, and run time of the last attempt
+    ("wait_seconds", "TIMESTAMPDIFF(MICROSECOND, created_at, started_at) / 1000000"),
+    ("run_seconds", "TIMESTAMPDIFF(MICROSECOND, locked_at, finished_at) / 1000000"),
+    json_columns=("payload", "result"),
+)
+
+USER_ROW = RowSchema(
+    ("id", "id"),
+    ("username", "username"),
+    ("email", "email"),
+    ("role", "role"),
+    ("status", "status"),
+    ("date_joined", "date_joined"),
+)
+
+# "Spaces near me" (SPATIAL key on spaces.geo_point)
+NEARBY_DEFAULT_LIMIT = 20
+NEARBY_MAX_RADIUS_KM = 50
+KM_PER_DEGREE_LAT = 111.32
+
+def bounding_box_wkt(lat, lng, radius_km):
+    """WKT polygon around (lat, lng) that contains every point within radius_km."""
+    d_lat = radius_km / KM_PER_DEGREE_LAT
+    d_lng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    south, north = max(lat - d_lat, -90), min(lat + d_lat, 90)
+    west, east = max(lng - d_lng, -180), min(lng + d_lng, 180)
+    # POINT columns store (x=longitude, y=latitude)
+    return (
+        f"POLYGON(({west} {south}, {east} {south}, {east} {north}, "
+        f"{west} {north}, {west} {south}))"
+    )
+
+# Full-text search over spaces (FULLTEXT keys ft_spaces_location / ft_spaces_search)
+FULLTEXT_MIN_TOKEN = 3  # innodb_ft_min_token_size
+
+def fulltext_terms(text):
+    """
+    Turn free text into a BOOLEAN MODE query where every word is required and
+    prefix-matched, e.g. "dhan road" -> "+dhan* +road*".
+    Returns None when no word is long enough to be in the index.
+    """
+    words = re.findall(r"\w+", text)
+    terms = [f"+{word}*" for word in words if len(word) >= FULLTEXT_MIN_TOKEN]
+    return " ".join(terms) or None
+
+# Admin user listing
+USERS_PAGE_SIZE = 50
+USERS_MAX_PAGE_SIZE = 200
+USER_SORT_KEYS = {"id": "id", "username": "username", "email": "email", "date_joined": "date_joined"}
+
+def like_prefix(text):
+    """LIKE pattern matching values that start with `text` (wildcards escaped)."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def encode_cursor(values):
+    # Opaque keyset cursor: the sort values of the last row on the page
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+    return values
+
+# Upper bound for ?latest= on the host interest summary
+INTEREST_SUMMARY_MAX_LATEST = 20
+
 # AUTH ENDPOINTS
 
 @app.get("/api/test")
 async def test():
-    conn = get_db_connection()
+    def work():
+        conn = get_db_connection()
+        conn.close()
 
-    cursor = conn.cursor()
+    await db.run_db(work)
     return {"message": "Hello, World!"}
 
-    cursor.close()
-    conn.close()
-
 @app.post("/api/auth/login")
 async def login(request: Request):
     """
@@ -64,56 +430,62 @@ async def login(request: Request):
             "status": "active",  # 'active', 'banned', 'pending'
             "date_joined": "2024-01-15T10:30:00Z"
         },
-        "token": "simple_token_123"  # Just return any string as token
+        "token": "<signed session token>"  # send as "Authorization: Bearer <token>"
     }
     
     """
 
-    try:
-        # 1. Parse JSON body
-        data = await request.json()
-        email = data.get("email")
-        password = data.get("password")
+    # 1. Parse JSON body
+    data = await request.json()
+    email = data.get("email")
+    password = data.get("password")
+    await enforce_rate_limit("login", request, email)
 
-        if not email or not password:
-            raise HTTPException(status_code=400, detail="Email and password required")
+    if not email or not password:
+        raise HTTPException(status_code=400, detail="Email and password required")
 
-        # 2. Connect to MySQL
-        connection = get_db_connection(); 
-        cursor = connection.cursor(dictionary=True)
+    def work():
+        try:
+            # 2. Connect to MySQL
+            connection = get_db_connection(); 
+            cursor = connection.cursor(dictionary=True)
+
+            # 3. Query user; the password is checked off the DB thread below
+            query = """
+            SELECT id, username, email, role, status, date_joined, password, session_version
+            FROM users
+            WHERE email = %s
+            """
+            cursor.execute(query, (email,))
+            return cursor.fetchone()
 
-        # 3. Query user
-        query = """
-        SELECT id, username, email, role, status, date_joined
-        FROM users
-        WHERE email = %s AND password = %s
-        """
-        cursor.execute(query, (email, password))
-        user = cursor.fetchone()
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
+    user = await db.run_db(work)
 
-        if user["status"] == "banned": 
-            raise HTTPException(status_code=401, detail="User is Banned")
+    # 4. Verify on the KDF pool (a missing user costs the same)
+    ok, needs_rehash = await passwords.verify_password(password, user["password"] if user else None)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if user["status"] == "banned": 
+        raise HTTPException(status_code=401, detail="User is Banned")
 
-        # 4. Format datetime for JSON
-        if isinstance(user["date_joined"], datetime):
-            user["date_joined"] = user["date_joined"].isoformat() + "Z"
+    if needs_rehash:
+        await upgrade_password_hash(user, password)
+    del user["password"]
 
-        # 5. Return user info and a simple token
-        return {
-            "user": user,
-            "token": ""
-        }
+    # 5. Format datetime for JSON
+    if isinstance(user["date_joined"], datetime):
+        user["date_joined"] = user["date_joined"].isoformat() + "Z"
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    # 6. Return user info and a session token
+    return {"user": user, "token": await sessions.issue(user, user.pop("session_version"))}
 
 
 
@@ -135,87 +507,95 @@ async def register(request: Request):
     """
     
 
-    try:
-        # 1. Parse JSON body
-        data = await request.json()
-        username = data.get("username")
-        email = data.get("email")
-        password = data.get("password")
-        role = data.get("role")
-        phone = data.get("phone")
-        # accept either "nid" or "nid_number" from client
-        nid = data.get("nid") or data.get("nid_number")
-
-        # Basic validation
-        if not username or not email or not password or not role:
-            raise HTTPException(status_code=400, detail="Missing required fields")
-        if role not in ("guest", "host"):
-            raise HTTPException(status_code=400, detail="Invalid role")
-
-        # 2. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # 3. Check if username/email already exists in users
-        check_users_q = "SELECT id FROM users WHERE username = %s OR email = %s"
-        cursor.execute(check_users_q, (username, email))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Username or email already exists")
-
-        # 3b. Also check pending_hosts to avoid duplicate host applications
-        cursor.execute("SELECT id FROM pending_hosts WHERE username = %s OR email = %s", (username, email))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Pending host application already exists for this username/email")
-
-        # 4. If host -> insert into pending_hosts and raise the required HTTPException
-        if role == "host":
-            if not nid:
-                raise HTTPException(status_code=400, detail="NID is required for host registration")
-
-            insert_pending_q = """
-            INSERT INTO pending_hosts (username, email, password, phone, nid)
-            VALUES (%s, %s, %s, %s, %s)
+    # 1. Parse JSON body
+    data = await request.json()
+    username = data.get("username")
+    email = data.get("email")
+    password = data.get("password")
+    role = data.get("role")
+    phone = data.get("phone")
+    # accept either "nid" or "nid_number" from client
+    nid = data.get("nid") or data.get("nid_number")
+    await enforce_rate_limit("register", request, email)
+
+    # Basic validation
+    if not username or not email or not password or not role:
+        raise HTTPException(status_code=400, detail="Missing required fields")
+    if role not in ("guest", "host"):
+        raise HTTPException(status_code=400, detail="Invalid role")
+
+    # Hashed on the KDF pool before a DB connection is taken
+    password_hash = await passwords.hash_password(password)
+
+    def work():
+        try:
+            # 2. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+
+            # 3. Check if username/email already exists in users
+            check_users_q = "SELECT id FROM users WHERE username = %s OR email = %s"
+            cursor.execute(check_users_q, (username, email))
+            if cursor.fetchone():
+                raise HTTPException(status_code=400, detail="Username or email already exists")
+
+            # 3b. Also check pending_hosts to avoid duplicate host applications
+            cursor.execute("SELECT id FROM pending_hosts WHERE username = %s OR email = %s", (username, email))
+            if cursor.fetchone():
+                raise HTTPException(status_code=400, detail="Pending host application already exists for this username/email")
+
+            # 4. If host -> insert into pending_hosts and raise the required HTTPException
+            if role == "host":
+                if not nid:
+                    raise HTTPException(status_code=400, detail="NID is required for host registration")
+
+                insert_pending_q = """
+                INSERT INTO pending_hosts (username, email, password, phone, nid)
+                VALUES (%s, %s, %s, %s, %s)
+                """
+                cursor.execute(insert_pending_q, (username, email, password_hash, phone, nid))
+                connection.commit()
+                stats.adjust("pending_hosts", "total")
+
+                # Per spec: respond by raising 400 with this message
+                raise HTTPException(status_code=400, detail="Host application submitted. Please wait for admin approval.")
+
+            # 5. If guest -> insert into users with status 'active'
+            insert_guest_q = """
+            INSERT INTO users (username, email, password, role, status, phone)
+            VALUES (%s, %s, %s, 'guest', 'active', %s)
             """
-            cursor.execute(insert_pending_q, (username, email, password, phone, nid))
+            cursor.execute(insert_guest_q, (username, email, password_hash, phone))
             connection.commit()
+            user_id = cursor.lastrowid
+            stats.adjust_user("guest", "active")
 
-            # Per spec: respond by raising 400 with this message
-            raise HTTPException(status_code=400, detail="Host application submitted. Please wait for admin approval.")
-
-        # 5. If guest -> insert into users with status 'active'
-        insert_guest_q = """
-        INSERT INTO users (username, email, password, role, status, phone)
-        VALUES (%s, %s, %s, 'guest', 'active', %s)
-        """
-        cursor.execute(insert_guest_q, (username, email, password, phone))
-        connection.commit()
-        user_id = cursor.lastrowid
+            # 6. Fetch the inserted user to return
+            cursor.execute("""
+            SELECT id, username, email, role, status, date_joined, phone, nid, session_version
+            FROM users
+            WHERE id = %s
+            """, (user_id,))
+            user = cursor.fetchone()
 
-        # 6. Fetch the inserted user to return
-        cursor.execute("""
-        SELECT id, username, email, role, status, date_joined, phone, nid
-        FROM users
-        WHERE id = %s
-        """, (user_id,))
-        user = cursor.fetchone()
+            # 7. Format date_joined
+            if user and isinstance(user.get("date_joined"), datetime):
+                user["date_joined"] = user["date_joined"].isoformat() + "Z"
 
-        # 7. Format date_joined
-        if user and isinstance(user.get("date_joined"), datetime):
-            user["date_joined"] = user["date_joined"].isoformat() + "Z"
+            # 8. Return guest info; the session token is added below
+            return {"user": user}
 
-        # 8. Return guest info + token (simple token as requested)
-        return {
-            "user": user,
-            "token": "simple_token_register"
-        }
+        except Error as e:
+            # Database / connector errors
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-    except Error as e:
-        # Database / connector errors
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    result = await db.run_db(work)
+    result["token"] = await sessions.issue(result["user"], result["user"].pop("session_version"))
+    return result
 
 @app.post("/api/auth/admin-login")
 async def admin_login(request: Request):
@@ -231,165 +611,430 @@ async def admin_login(request: Request):
     # TODO: Implement admin login logic
     
 
-    try:
-        # 1. Parse request body
-        data = await request.json()
-        username = data.get("username")
-        password = data.get("password")
+    # 1. Parse request body
+    data = await request.json()
+    username = data.get("username")
+    password = data.get("password")
+    await enforce_rate_limit("admin_login", request, username)
 
-        if not username or not password:
-            raise HTTPException(status_code=400, detail="Username and password required")
+    if not username or not password:
+        raise HTTPException(status_code=400, detail="Username and password required")
 
-        # 2. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+    def work():
+        try:
+            # 2. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+
+            # 3. Query admin user; the password is checked off the DB thread below
+            query = """
+            SELECT id, username, email, role, status, date_joined, password, session_version
+            FROM users
+            WHERE username = %s AND role = 'admin'
+            """
+            cursor.execute(query, (username,))
+            return cursor.fetchone()
 
-        # 3. Query admin user
-        query = """
-        SELECT id, username, email, role, status, date_joined
-        FROM users
-        WHERE username = %s AND password = %s AND role = 'admin'
-        """
-        cursor.execute(query, (username, password))
-        user = cursor.fetchone()
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid admin credentials")
+    user = await db.run_db(work)
 
-        # 4. Check if not banned
-        if user["status"] == "banned":
-            raise HTTPException(status_code=403, detail="Admin account is banned")
+    # 4. Verify on the KDF pool (a missing admin costs the same)
+    ok, needs_rehash = await passwords.verify_password(password, user["password"] if user else None)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid admin credentials")
 
-        # 5. Format date
-        if isinstance(user["date_joined"], datetime):
-            user["date_joined"] = user["date_joined"].isoformat() + "Z"
+    # 5. Check if not banned
+    if user["status"] == "banned":
+        raise HTTPException(status_code=403, detail="Admin account is banned")
 
-        # 6. Return with token
-        return {
-            "user": user,
-            "token": "simple_token_admin"
-        }
+    if needs_rehash:
+        await upgrade_password_hash(user, password)
+    del user["password"]
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    # 6. Format date
+    if isinstance(user["date_joined"], datetime):
+        user["date_joined"] = user["date_joined"].isoformat() + "Z"
+
+    # 7. Return the admin and a session token
+    return {"user": user, "token": await sessions.issue(user, user.pop("session_version"))}
+
+@app.post("/api/auth/logout")
+async def logout(session=Depends(current_session)):
+    """
+    End every session of the caller (all devices).
+
+    return
+    {"message": "Logged out"}
+    """
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+            sessions.revoke_in(cursor, [session.user_id])
+            connection.commit()
+            sessions.revoke_user(session.user_id)
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    await db.run_db(work)
+    return {"message": "Logged out"}
 
 # SPACE ENDPOINTS
 
 @app.get("/api/spaces")
-async def get_spaces(location: str = None):
+async def get_spaces(
+    request: Request,
+    location: str = None,
+    type_: str = Query(None, alias="type"),
+    availability: str = None,
+    min_rate: float = None,
+    max_rate: float = None,
+    limit: int = SPACES_PAGE_SIZE,
+    after: int = None,
+):
     """
     
-    Body
+    Query
     - location
+    - type: 'room' or 'parking' (optional)
+    - availability: 'available', 'on_hold' or 'not_available' (optional)
+    - min_rate / max_rate: rate_per_hour range (optional)
+    - limit: page size, at most SPACES_MAX_PAGE_SIZE
+    - after: next_cursor from the previous page (optional)
     
     Return
-    [
-        {
-            "id": 1,
-            "owner_id": 2,
-            "type": "room",  # 'room' or 'parking'
-            "title": "Cozy Downtown Room",
-            "location": "Downtown NYC",
-            "rate_per_hour": 15.0,
-            "description": "A comfortable room...",
-            "availability": "available",  # should be 'available'
-            "owner_name": "sarah_host",
-            "dimensions": {"length": 20, "width": 10, "height": 8}  # only for parking, null for rooms
-        }
-    ]
+    {
+        "spaces": [
+            {
+                "id": 1,
+                "owner_id": 2,
+                "type": "room",  # 'room' or 'parking'
+                "title": "Cozy Downtown Room",
+                "location": "Downtown NYC",
+                "rate_per_hour": 15.0,
+                "description": "A comfortable room...",
+                "availability": "available",  # should be 'available'
+                "owner_name": "sarah_host",
+                "dimensions": {"length": 20, "width": 10, "height": 8}  # only for parking, null for rooms
+            }
+        ],
+        "next_cursor": 57  # pass as `after` to get the next page, null on the last page
+    }
     
 
     """
 
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
-    try:
-        cursor = conn.cursor(dictionary=True)
-
-        base_query = """
-            SELECT s.*, u.username AS owner_name
-            FROM spaces s
-            JOIN users u ON s.owner_id = u.id
+    if type_ is not None and type_ not in ("room", "parking"):
+        raise HTTPException(status_code=422, detail="Invalid type value")
+    if availability is not None and availability not in ("available", "on_hold", "not_available"):
+        raise HTTPException(status_code=422, detail="Invalid availability value")
+    if limit < 1:
+        raise HTTPException(status_code=422, detail="limit must be positive")
+    limit = min(limit, SPACES_MAX_PAGE_SIZE)
 
-        """
-        params = ()
+    def work():
+        conn = get_db_connection()
+        if not conn:
+            raise HTTPException(status_code=500, detail="Database connection failed")
 
-        if location:
-            base_query += " AND s.location LIKE %s"
-            params = ('%' + location + '%',)
+        try:
+            cursor = conn.cursor()
+
+            # Keyset pagination: walk spaces in id order, starting after the cursor
+            conditions = []
+            params = []
+
+            if after is not None:
+                conditions.append("s.id > %s")
+                params.append(after)
+            if location:
+                terms = fulltext_terms(location)
+                if terms:
+                    conditions.append("MATCH(s.location) AGAINST (%s IN BOOLEAN MODE)")
+                    params.append(terms)
+                else:
+                    # Too short for the full-text index; a prefix match can still use an index
+                    conditions.append("s.location LIKE %s")
+                    params.append(location + '%')
+            if type_:
+                conditions.append("s.type = %s")
+                params.append(type_)
+            if availability:
+                conditions.append("s.availability = %s")
+                params.append(availability)
+            if min_rate is not None:
+                conditions.append("s.rate_per_hour >= %s")
+                params.append(min_rate)
+            if max_rate is not None:
+                conditions.append("s.rate_per_hour <= %s")
+                params.append(max_rate)
+
+            query = f"""
+                SELECT {SPACE_ROW.select}
+                FROM spaces s
+                JOIN users u ON s.owner_id = u.id
+            """
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            # Fetch one extra row to know whether another page exists
+            query += " ORDER BY s.id LIMIT %s"
+            params.append(limit + 1)
+
+            cursor.execute(query, tuple(params))
+            spaces = SPACE_ROW.rows(cursor)
+
+            next_cursor = None
+            if len(spaces) > limit:
+                spaces = spaces[:limit]
+                next_cursor = spaces[-1]["id"]
+
+            return {"spaces": spaces, "next_cursor": next_cursor}
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
+
+    # Listing pages are keyed by their filters plus the spaces generation,
+    # which every space write bumps
+    generation = await cache.generation("spaces")
+    key = f"spaces:{generation}:{location}|{type_}|{availability}|{min_rate}|{max_rate}|{limit}|{after}"
+    page = await cache.read_through(key, lambda: db.run_db(work))
+    return conditional_response(request, page, page["spaces"])
+
+@app.get("/api/spaces/search")
+async def search_spaces(
+    q: str,
+    type_: str = Query(None, alias="type"),
+    availability: str = None,
+    limit: int = SPACES_PAGE_SIZE,
+    offset: int = 0,
+):
+    """
+    Full-text search over title, location and description, best matches first.
+    Every word must match, as a word prefix ("dhan" finds "Dhanmondi").
 
-        cursor.execute(base_query, params)
-        spaces = cursor.fetchall()
+    Query
+    - q: search text
+    - type, availability: optional filters, same as get_spaces
+    - limit, offset: paging through the ranked results
 
-        # Process dimensions JSON for parking spaces
-        for space in spaces:
-            if space["type"] == "parking" and space["dimensions"]:
-                try:
-                    space["dimensions"] = json.loads(space["dimensions"])
-                except json.JSONDecodeError:
-                    space["dimensions"] = None
-            else:
-                space["dimensions"] = None
+    Return
+    {
+        "spaces": [ same as get_spaces, plus "relevance": 3.21 ],
+        "next_offset": 50  # null on the last page
+    }
+    """
 
-        cursor.close()
-        conn.close()
+    terms = fulltext_terms(q)
+    if not terms:
+        raise HTTPException(status_code=422, detail=f"Search text needs a word of at least {FULLTEXT_MIN_TOKEN} characters")
+    if type_ is not None and type_ not in ("room", "parking"):
+        raise HTTPException(status_code=422, detail="Invalid type value")
+    if availability is not None and availability not in ("available", "on_hold", "not_available"):
+        raise HTTPException(status_code=422, detail="Invalid availability value")
+    if limit < 1 or offset < 0:
+        raise HTTPException(status_code=422, detail="Invalid limit or offset")
+    limit = min(limit, SPACES_MAX_PAGE_SIZE)
 
-        return spaces
+    def work():
+        conn = get_db_connection()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        try:
+            cursor = conn.cursor()
 
-@app.get("/api/spaces/{space_id}")
-async def get_space_by_id(space_id: int):
+            query = f"""
+                SELECT {SEARCH_SPACE_ROW.select}
+                FROM spaces s
+                JOIN users u ON s.owner_id = u.id
+                WHERE MATCH(s.title, s.location, s.description) AGAINST (%s IN BOOLEAN MODE)
+            """
+            params = [terms, terms]
+            if type_:
+                query += " AND s.type = %s"
+                params.append(type_)
+            if availability:
+                query += " AND s.availability = %s"
+                params.append(availability)
+            query += " ORDER BY relevance DESC, s.id LIMIT %s OFFSET %s"
+            params += [limit + 1, offset]
+
+            cursor.execute(query, tuple(params))
+            spaces = SEARCH_SPACE_ROW.rows(cursor)
+
+            next_offset = None
+            if len(spaces) > limit:
+                spaces = spaces[:limit]
+                next_offset = offset + limit
+
+            return {"spaces": spaces, "next_offset": next_offset}
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
+
+    return FastJSONResponse(await db.run_db(work))
+
+@app.get("/api/spaces/nearby")
+async def get_nearby_spaces(
+    lat: float,
+    lng: float,
+    radius_km: float = None,
+    limit: int = NEARBY_DEFAULT_LIMIT,
+    type_: str = Query(None, alias="type"),
+    availability: str = None,
+):
     """
-    Receive
-    - space_id
-    
+    Spaces closest to a point, nearest first.
+
+    Query
+    - lat, lng: the point to search around
+    - radius_km: only spaces within this distance; when omitted the search
+      widens until `limit` spaces are found (up to NEARBY_MAX_RADIUS_KM)
+    - limit: how many spaces to return (the k nearest)
+    - type, availability: optional filters, same as get_spaces
 
+    Return
+    [ same as get_spaces, plus "distance_km": 1.27 ]
     """
-    # TODO: Implement get space by ID logic
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Database connection failed")
 
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT s.*, u.username AS owner_name
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise HTTPException(status_code=422, detail="Invalid coordinates")
+    if radius_km is not None and not (0 < radius_km <= NEARBY_MAX_RADIUS_KM):
+        raise HTTPException(status_code=422, detail=f"radius_km must be between 0 and {NEARBY_MAX_RADIUS_KM}")
+    if type_ is not None and type_ not in ("room", "parking"):
+        raise HTTPException(status_code=422, detail="Invalid type value")
+    if availability is not None and availability not in ("available", "on_hold", "not_available"):
+        raise HTTPException(status_code=422, detail="Invalid availability value")
+    if limit < 1:
+        raise HTTPException(status_code=422, detail="limit must be positive")
+    limit = min(limit, SPACES_MAX_PAGE_SIZE)
+
+    def search(cursor, radius):
+        # MBRContains narrows candidates through the spatial index; the exact
+        # great-circle distance is only computed for rows inside the box
+        query = f"""
+            SELECT {NEARBY_SPACE_ROW.select}
             FROM spaces s
             JOIN users u ON s.owner_id = u.id
-            WHERE s.id = %s
+            WHERE MBRContains(ST_GeomFromText(%s), s.geo_point)
+              AND s.latitude IS NOT NULL AND s.longitude IS NOT NULL
         """
-        cursor.execute(query, (space_id,))
-        space = cursor.fetchone()
+        params = [lng, lat, bounding_box_wkt(lat, lng, radius)]
+        if type_:
+            query += " AND s.type = %s"
+            params.append(type_)
+        if availability:
+            query += " AND s.availability = %s"
+            params.append(availability)
+        query += " HAVING distance_km <= %s ORDER BY distance_km, s.id LIMIT %s"
+        params += [radius, limit]
+        cursor.execute(query, tuple(params))
+        return NEARBY_SPACE_ROW.rows(cursor)
+
+    def work():
+        conn = get_db_connection()
 
-        if not space:
-            raise HTTPException(status_code=404, detail="Space not found")
+        try:
+            cursor = conn.cursor()
 
-        # Process dimensions JSON for parking spaces
-        if space["type"] == "parking" and space["dimensions"]:
-            try:
-                space["dimensions"] = json.loads(space["dimensions"])
-            except json.JSONDecodeError:
-                space["dimensions"] = None
-        else:
-            space["dimensions"] = None
+            if radius_km is not None:
+                spaces = search(cursor, radius_km)
+            else:
+                # k-nearest: widen the box until enough spaces are found
+                radius = 1.0
+                spaces = search(cursor, radius)
+                while len(spaces) < limit and radius < NEARBY_MAX_RADIUS_KM:
+                    radius = min(radius * 4, NEARBY_MAX_RADIUS_KM)
+                    spaces = search(cursor, radius)
 
-        cursor.close()
-        conn.close()
+            return spaces
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
+
+    return FastJSONResponse(await db.run_db(work))
+
+async def cached_space(space_id):
+    """The space row as GET /api/spaces/{id} returns it, read through the cache; 404 if missing."""
+    def work():
+        conn = get_db_connection()
+        if not conn:
+            raise HTTPException(status_code=500, detail="Database connection failed")
+
+        try:
+            cursor = conn.cursor()
+            query = f"""
+                SELECT {SPACE_ROW.select}
+                FROM spaces s
+                JOIN users u ON s.owner_id = u.id
+                WHERE s.id = %s
+            """
+            cursor.execute(query, (space_id,))
+            space = SPACE_ROW.one(cursor)
+
+            if not space:
+                raise HTTPException(status_code=404, detail="Space not found")
+
+            return space
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
+
+    return await cache.read_through(f"space:{space_id}", lambda: db.run_db(work))
 
-        return space
+async def cached_user_card(user_id):
+    """
+    {"username", "email"} of a user for embedding in other responses, read
+    through the cache; 404 if missing. Neither field can change, and
+    delete_user drops the entry.
+    """
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT username, email FROM users WHERE id = %s", (user_id,))
+            user = cursor.fetchone()
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            return user
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await cache.read_through(f"user_card:{user_id}", lambda: db.run_db(work))
+
+@app.get("/api/spaces/{space_id}")
+async def get_space_by_id(space_id: int, request: Request):
+    """
+    Receive
+    - space_id
+    
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """
+    space = await cached_space(space_id)
+    return conditional_response(request, space, [space], last_modified=True)
 
 @app.get("/api/spaces/host/{owner_id}")
 async def get_host_spaces(owner_id: int):
@@ -401,38 +1046,31 @@ async def get_host_spaces(owner_id: int):
     """
 
     
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT s.*, u.username AS owner_name
-            FROM spaces s
-            JOIN users u ON s.owner_id = u.id
-            WHERE s.owner_id = %s
-        """
-        cursor.execute(query, (owner_id,))
-        spaces = cursor.fetchall()
+    def work():
+        conn = get_db_connection()
+        if not conn:
+            raise HTTPException(status_code=500, detail="Database connection failed")
 
-        # Process 'dimensions' JSON field
-        for space in spaces:
-            if space["type"] == "parking" and space["dimensions"]:
-                try:
-                    space["dimensions"] = json.loads(space["dimensions"])
-                except json.JSONDecodeError:
-                    space["dimensions"] = None
-            else:
-                space["dimensions"] = None
+        try:
+            cursor = conn.cursor()
+            query = f"""
+                SELECT {SPACE_ROW.select}
+                FROM spaces s
+                JOIN users u ON s.owner_id = u.id
+                WHERE s.owner_id = %s
+            """
+            cursor.execute(query, (owner_id,))
+            spaces = SPACE_ROW.rows(cursor)
 
-        cursor.close()
-        conn.close()
+            return spaces
 
-        return spaces
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    spaces = await cache.read_through(f"host_spaces:{owner_id}", lambda: db.run_db(work))
+    return FastJSONResponse(spaces)
 
 @app.post("/api/spaces")
 async def create_space(request: Request):
@@ -497,49 +1135,399 @@ async def create_space(request: Request):
         except Exception:
             raise HTTPException(status_code=422, detail="Invalid dimensions format")
 
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Database connection failed")
+    def work():
+        conn = get_db_connection()
+        if not conn:
+            raise HTTPException(status_code=500, detail="Database connection failed")
 
-    try:
-        cursor = conn.cursor(dictionary=True)
-        insert_query = """
-            INSERT INTO spaces
-            (owner_id, type, title, location, latitude, longitude, rate_per_hour, description, availability, dimensions)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (
-            owner_id, type_, title, location, latitude, longitude, rate_per_hour, description, availability, dimensions_json
-        ))
-        conn.commit()
+        try:
+            cursor = conn.cursor()
+            insert_query = """
+                INSERT INTO spaces
+                (owner_id, type, title, location, latitude, longitude, geo_point, rate_per_hour, description, availability, dimensions)
+                VALUES (%s, %s, %s, %s, %s, %s, POINT(COALESCE(%s, 0), COALESCE(%s, 0)), %s, %s, %s, %s)
+            """
+            cursor.execute(insert_query, (
+                owner_id, type_, title, location, latitude, longitude, longitude, latitude,
+                rate_per_hour, description, availability, dimensions_json
+            ))
+            new_space_id = cursor.lastrowid
+            changes.record(cursor, "space", new_space_id, "create", {
+                "owner_id": owner_id, "type": type_, "title": title, "location": location,
+                "latitude": latitude, "longitude": longitude, "rate_per_hour": rate_per_hour,
+                "description": description, "availability": availability,
+                "dimensions": dimensions if dimensions_json else None,
+            })
+            conn.commit()
+
+            stats.adjust("spaces_by_type", type_)
+            stats.adjust("spaces_by_availability", availability)
+            cache.invalidate(f"host_spaces:{owner_id}")
+            cache.bump("spaces")
+
+            select_query = f"""
+                SELECT {SPACE_ROW.select}
+                FROM spaces s
+                JOIN users u ON s.owner_id = u.id
+                WHERE s.id = %s
+            """
+            cursor.execute(select_query, (new_space_id,))
+            created_space = SPACE_ROW.one(cursor)
 
-        new_space_id = cursor.lastrowid
+            return created_space
 
-        select_query = """
-            SELECT s.*, u.username AS owner_name
-            FROM spaces s
-            JOIN users u ON s.owner_id = u.id
-            WHERE s.id = %s
-        """
-        cursor.execute(select_query, (new_space_id,))
-        created_space = cursor.fetchone()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
+
+    return await db.run_db(work)
 
-        # Process dimensions field
-        if created_space["type"] == "parking" and created_space["dimensions"]:
+# Bulk space import: rows per request, and rows per INSERT/transaction
+SPACE_IMPORT_LIMIT = int(os.getenv("SPACE_IMPORT_LIMIT", "10000"))
+SPACE_IMPORT_CHUNK = int(os.getenv("SPACE_IMPORT_CHUNK", "500"))
+SPACE_TYPES = ("room", "parking")
+SPACE_AVAILABILITY = ("available", "on_hold", "not_available")
+DIMENSION_KEYS = ("length", "width", "height")
+
+def parse_space_rows(body, content_type):
+    """
+    Split an import body into raw rows: a JSON array (or {"spaces": [...]}),
+    NDJSON (one object per line) or CSV with a header row. A CSV row carries
+    dimensions either as a JSON `dimensions` column or as length/width/height.
+    Unparseable NDJSON lines come back as None.
+    """
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body is not valid UTF-8")
+    if "csv" in content_type:
+        rows = []
+        for row in csv.DictReader(io.StringIO(text)):
+            row = {key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+            if "dimensions" in row:
+                try:
+                    row["dimensions"] = json.loads(row["dimensions"])
+                except ValueError:
+                    pass  # reported by validate_space_row
+            elif any(key in row for key in DIMENSION_KEYS):
+                row["dimensions"] = {key: row.pop(key) for key in DIMENSION_KEYS if key in row}
+            rows.append(row)
+        return rows
+    if "ndjson" in content_type:
+        rows = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
             try:
-                created_space["dimensions"] = json.loads(created_space["dimensions"])
-            except Exception:
-                created_space["dimensions"] = None
+                rows.append(json.loads(line))
+            except ValueError:
+                rows.append(None)
+        return rows
+    try:
+        data = json.loads(text)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if isinstance(data, dict):
+        data = data.get("spaces")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of spaces")
+    return data
+
+def _number(value):
+    # CSV values arrive as strings; JSON booleans are not numbers
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def validate_space_row(raw):
+    """
+    Check one import row. Returns (space, errors): `space` holds the cleaned
+    columns, with "id" set for updates. Updates may leave out type,
+    availability and coordinates, which then keep their stored values.
+    """
+    if not isinstance(raw, dict):
+        return None, ["Row is not an object"]
+    errors = []
+    space = {}
+
+    if raw.get("id") is not None:
+        try:
+            space["id"] = int(raw["id"])
+        except (TypeError, ValueError):
+            errors.append("id must be an integer")
+    updating = "id" in raw and raw["id"] is not None
+
+    type_ = raw.get("type")
+    if type_ is not None or not updating:
+        if type_ not in SPACE_TYPES:
+            errors.append("type must be 'room' or 'parking'")
+        space["type"] = type_
+
+    for field in ("title", "location"):
+        value = raw.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f"{field} is required")
+        elif len(value) > 200:
+            errors.append(f"{field} is longer than 200 characters")
+        space[field] = value
+    description = raw.get("description")
+    if not isinstance(description, str) or not description.strip():
+        errors.append("description is required")
+    space["description"] = description
+
+    rate = _number(raw.get("rate_per_hour"))
+    if rate is None or not 0 <= rate < 10 ** 8:
+        errors.append("rate_per_hour must be a number between 0 and 99999999.99")
+    space["rate_per_hour"] = rate
+
+    availability = raw.get("availability")
+    if availability is not None or not updating:
+        availability = availability or "available"
+        if availability not in SPACE_AVAILABILITY:
+            errors.append("availability must be 'available', 'on_hold' or 'not_available'")
+        space["availability"] = availability
+
+    if "latitude" in raw or "longitude" in raw:
+        latitude, longitude = _number(raw.get("latitude")), _number(raw.get("longitude"))
+        if latitude is None or longitude is None or not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+            errors.append("latitude and longitude must be given together, within -90..90 and -180..180")
+        space["latitude"], space["longitude"] = latitude, longitude
+
+    dimensions = raw.get("dimensions")
+    if dimensions is not None:
+        if not isinstance(dimensions, dict) or not dimensions or set(dimensions) - set(DIMENSION_KEYS):
+            errors.append("dimensions must be an object with length, width and/or height")
         else:
-            created_space["dimensions"] = None
+            numbers = {key: _number(value) for key, value in dimensions.items()}
+            if any(value is None or value <= 0 for value in numbers.values()):
+                errors.append("dimensions must be positive numbers")
+            dimensions = {key: int(value) if value and value.is_integer() else value for key, value in numbers.items()}
+    space["dimensions"] = dimensions
 
-        cursor.close()
-        conn.close()
+    return space, errors
+
+@app.post("/api/spaces/bulk")
+async def import_spaces(owner_id: int, request: Request):
+    """
+    Create and update many spaces of one host.
+
+    receive
+    - owner_id: int (query parameter)
+    - body: a JSON array of spaces (Content-Type: application/json), NDJSON
+      (application/x-ndjson) or CSV with a header row (text/csv). Fields as
+      in create_space, plus latitude/longitude. A row with "id" updates that
+      space (it must belong to owner_id) instead of creating one; its type
+      cannot change.
+
+    Rows are validated in one pass, then written SPACE_IMPORT_CHUNK at a time:
+    each chunk is one multi-row INSERT for new spaces (row by row when
+    innodb_autoinc_lock_mode is 2) and one multi-row upsert for updates,
+    committed as its own transaction.
+
+    return
+    {
+        "created": 480,
+        "updated": 14,
+        "failed": 6,
+        "rows": [
+            {"row": 0, "result": "created", "id": 1201},
+            {"row": 1, "result": "updated", "id": 88},
+            {"row": 2, "result": "invalid", "errors": ["title is required"]},
+            {"row": 3, "result": "not_found", "id": 99},  # no such space of this owner
+            {"row": 4, "result": "invalid", "id": 91, "errors": ["type cannot be changed ..."]},
+            {"row": 5, "result": "failed", "errors": ["Database error: ..."]}  # its chunk was rolled back
+        ]
+    }
+    """
+    rows = parse_space_rows(await request.body(), request.headers.get("content-type", ""))
+    if not rows:
+        raise HTTPException(status_code=400, detail="No spaces in the request")
+    if len(rows) > SPACE_IMPORT_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {SPACE_IMPORT_LIMIT} spaces per request")
+
+    # 1. Validate everything before touching the database
+    outcomes = [None] * len(rows)
+    valid = []
+    seen_ids = set()
+    for index, raw in enumerate(rows):
+        if raw is None:
+            outcomes[index] = {"row": index, "result": "invalid", "errors": ["Invalid JSON line"]}
+            continue
+        space, errors = validate_space_row(raw)
+        if space and "id" in space:
+            if space["id"] in seen_ids:
+                errors.append("Space updated more than once in this request")
+            seen_ids.add(space["id"])
+        if errors:
+            outcomes[index] = {"row": index, "result": "invalid", "errors": errors}
+        else:
+            valid.append((index, space))
+
+    def write_chunk(cursor, chunk, existing, consecutive_ids):
+        """Write one chunk; returns its row outcomes and the stats/cache changes to apply after commit."""
+        creates = [(index, space) for index, space in chunk if "id" not in space]
+        updates = []
+        done = []
+        for index, space in chunk:
+            if "id" not in space:
+                continue
+            current = existing.get(space["id"])
+            if current is None:
+                done.append({"row": index, "result": "not_found", "id": space["id"]})
+            elif space.get("type", current["type"]) != current["type"]:
+                # Dimensions and stats depend on the type; PUT /api/spaces cannot change it either
+                done.append({"row": index, "result": "invalid", "id": space["id"], "errors": [
+                    f"type cannot be changed (space is a {current['type']}); delete it and create a new one"
+                ]})
+            else:
+                updates.append((index, {**current, **space}))
+
+        def values(space):
+            dimensions = space["dimensions"] if space["type"] == "parking" else None
+            return (
+                space["type"], space["title"], space["location"], space.get("latitude"), space.get("longitude"),
+                space.get("longitude"), space.get("latitude"), space["rate_per_hour"], space["description"],
+                space["availability"], json.dumps(dimensions) if dimensions else None,
+            )
+
+        def columns(space):
+            # What the change log records (changes.py)
+            return {
+                "title": space["title"], "location": space["location"],
+                "latitude": space.get("latitude"), "longitude": space.get("longitude"),
+                "rate_per_hour": space["rate_per_hour"], "description": space["description"],
+                "availability": space["availability"],
+                "dimensions": space["dimensions"] if space["type"] == "parking" else None,
+            }
+
+        created = []
+        if creates:
+            insert = """
+                INSERT INTO spaces
+                (owner_id, type, title, location, latitude, longitude, geo_point, rate_per_hour, description, availability, dimensions)
+                VALUES (%s, %s, %s, %s, %s, %s, POINT(COALESCE(%s, 0), COALESCE(%s, 0)), %s, %s, %s, %s)
+            """
+            if consecutive_ids:
+                # One multi-row INSERT; its ids run consecutively from LAST_INSERT_ID()
+                cursor.executemany(insert, [(owner_id, *values(space)) for _, space in creates])
+                ids = range(cursor.lastrowid, cursor.lastrowid + len(creates))
+            else:
+                ids = []
+                for _, space in creates:
+                    cursor.execute(insert, (owner_id, *values(space)))
+                    ids.append(cursor.lastrowid)
+            created = [(space_id, space) for space_id, (_, space) in zip(ids, creates)]
+            done += [{"row": index, "result": "created", "id": space_id} for space_id, (index, _) in zip(ids, creates)]
+        if updates:
+            cursor.executemany("""
+                INSERT INTO spaces
+                (id, owner_id, type, title, location, latitude, longitude, geo_point, rate_per_hour, description, availability, dimensions)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, POINT(COALESCE(%s, 0), COALESCE(%s, 0)), %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    title = VALUES(title), location = VALUES(location),
+                    latitude = VALUES(latitude), longitude = VALUES(longitude), geo_point = VALUES(geo_point),
+                    rate_per_hour = VALUES(rate_per_hour), description = VALUES(description),
+                    availability = VALUES(availability), dimensions = VALUES(dimensions)
+            """, [(space["id"], owner_id, *values(space)) for _, space in updates])
+            done += [{"row": index, "result": "updated", "id": space["id"]} for index, space in updates]
+
+        changes.record_many(cursor, [
+            ("space", space_id, "create", {"owner_id": owner_id, "type": space["type"], **columns(space)}, None, None)
+            for space_id, space in created
+        ] + [
+            ("space", space["id"], "update", changes.diff(existing[space["id"]], columns(space)), None, None)
+            for _, space in updates
+        ])
+        return done, creates, updates
+
+    def work():
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+
+            # 2. The owner must exist
+            cursor.execute("SELECT id FROM users WHERE id = %s", (owner_id,))
+            if not cursor.fetchone():
+                raise HTTPException(status_code=404, detail="Owner not found")
 
-        return created_space
+            # A multi-row INSERT only gets consecutive ids with autoinc lock mode 0
+            # or 1 (the MariaDB default). Mode 2 (interleaved, the MySQL 8 default)
+            # may interleave other sessions' ids, so insert row by row there
+            cursor.execute("SELECT @@innodb_autoinc_lock_mode")
+            consecutive_ids = cursor.fetchone()[0] != 2
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            for start in range(0, len(valid), SPACE_IMPORT_CHUNK):
+                chunk = valid[start:start + SPACE_IMPORT_CHUNK]
+                try:
+                    # 3. Lock the owner's spaces this chunk updates; unset fields keep these
+                    # values, and the change log records what differs from them
+                    update_ids = [space["id"] for _, space in chunk if "id" in space]
+                    existing = {}
+                    if update_ids:
+                        cursor.execute(f"""
+                            SELECT id, type, availability, latitude, longitude,
+                                   title, location, description, rate_per_hour, dimensions
+                            FROM spaces
+                            WHERE owner_id = %s AND id IN ({", ".join(["%s"] * len(update_ids))})
+                            FOR UPDATE
+                        """, (owner_id, *update_ids))
+                        for row in cursor.fetchall():
+                            try:
+                                dimensions = json.loads(row[9]) if row[9] else None
+                            except ValueError:
+                                dimensions = None
+                            existing[row[0]] = {
+                                "type": row[1], "availability": row[2], "latitude": row[3], "longitude": row[4],
+                                "title": row[5], "location": row[6], "description": row[7],
+                                "rate_per_hour": row[8], "dimensions": dimensions,
+                            }
+
+                    # 4. One multi-row statement per kind of write, one commit per chunk
+                    done, creates, updates = write_chunk(cursor, chunk, existing, consecutive_ids)
+                    conn.commit()
+                except Error as e:
+                    conn.rollback()
+                    for index, _ in chunk:
+                        outcomes[index] = {"row": index, "result": "failed", "errors": [f"Database error: {str(e)}"]}
+                    continue
+
+                for outcome in done:
+                    outcomes[outcome["row"]] = outcome
+                for _, space in creates:
+                    stats.adjust("spaces_by_type", space["type"])
+                    stats.adjust("spaces_by_availability", space["availability"])
+                for _, space in updates:
+                    stats.move("spaces_by_availability", existing[space["id"]]["availability"], space["availability"])
+                if updates:
+                    cache.invalidate(*(f"space:{space['id']}" for _, space in updates))
+
+            if any(outcome["result"] in ("created", "updated") for outcome in outcomes):
+                cache.invalidate(f"host_spaces:{owner_id}")
+                cache.bump("spaces")
+
+            counts = {"created": 0, "updated": 0}
+            for outcome in outcomes:
+                if outcome["result"] in counts:
+                    counts[outcome["result"]] += 1
+            return {
+                **counts,
+                "failed": len(outcomes) - counts["created"] - counts["updated"],
+                "rows": outcomes,
+            }
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
+
+    return FastJSONResponse(await db.run_db(work))
 
 @app.put("/api/spaces/{space_id}")
 async def update_space(space_id: int, request: Request):
@@ -592,76 +1580,87 @@ async def update_space(space_id: int, request: Request):
     description = data["description"]
     dimensions = data.get("dimensions")
 
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
-    try:
-        cursor = conn.cursor(dictionary=True)
+    def work():
+        conn = get_db_connection()
+        if not conn:
+            raise HTTPException(status_code=500, detail="Database connection failed")
 
-        # Check if space exists
-        cursor.execute("SELECT * FROM spaces WHERE id = %s", (space_id,))
-        space = cursor.fetchone()
-        if not space:
-            raise HTTPException(status_code=404, detail="Space not found")
+        try:
+            cursor = conn.cursor(dictionary=True)
 
-        # Prepare dimensions JSON (only if parking)
-        dimensions_json = None
-        if space["type"] == "parking" and dimensions:
-            try:
-                dimensions_json = json.dumps(dimensions)
-            except Exception:
-                raise HTTPException(status_code=422, detail="Invalid dimensions format")
-
-        # Latitude/Longitude: keep existing if not provided
-        latitude = data.get("latitude", space.get("latitude") if isinstance(space, dict) else None)
-        longitude = data.get("longitude", space.get("longitude") if isinstance(space, dict) else None)
-
-        # Update query
-        update_query = """
-            UPDATE spaces
-            SET title = %s,
-                location = %s,
-                latitude = %s,
-                longitude = %s,
-                rate_per_hour = %s,
-                description = %s,
-                dimensions = %s
-            WHERE id = %s
-        """
-        cursor.execute(update_query, (
-            title, location, latitude, longitude, rate_per_hour, description, dimensions_json, space_id
-        ))
-        conn.commit()
-
-        # Fetch updated space with owner_name
-        select_query = """
-            SELECT s.*, u.username AS owner_name
-            FROM spaces s
-            JOIN users u ON s.owner_id = u.id
-            WHERE s.id = %s
-        """
-        cursor.execute(select_query, (space_id,))
-        updated_space = cursor.fetchone()
+            # Check if space exists
+            cursor.execute("SELECT * FROM spaces WHERE id = %s", (space_id,))
+            space = cursor.fetchone()
+            if not space:
+                raise HTTPException(status_code=404, detail="Space not found")
 
-        # Deserialize dimensions if parking
-        if updated_space["type"] == "parking" and updated_space["dimensions"]:
+            # Prepare dimensions JSON (only if parking)
+            dimensions_json = None
+            if space["type"] == "parking" and dimensions:
+                try:
+                    dimensions_json = json.dumps(dimensions)
+                except Exception:
+                    raise HTTPException(status_code=422, detail="Invalid dimensions format")
+
+            # Latitude/Longitude: keep existing if not provided
+            latitude = data.get("latitude", space.get("latitude") if isinstance(space, dict) else None)
+            longitude = data.get("longitude", space.get("longitude") if isinstance(space, dict) else None)
+
+            # Update query
+            update_query = """
+                UPDATE spaces
+                SET title = %s,
+                    location = %s,
+                    latitude = %s,
+                    longitude = %s,
+                    geo_point = POINT(COALESCE(%s, 0), COALESCE(%s, 0)),
+                    rate_per_hour = %s,
+                    description = %s,
+                    dimensions = %s
+                WHERE id = %s
+            """
+            cursor.execute(update_query, (
+                title, location, latitude, longitude, longitude, latitude,
+                rate_per_hour, description, dimensions_json, space_id
+            ))
+            # Only the columns whose value changed go to the change log
             try:
-                updated_space["dimensions"] = json.loads(updated_space["dimensions"])
-            except Exception:
-                updated_space["dimensions"] = None
-        else:
-            updated_space["dimensions"] = None
+                old_dimensions = json.loads(space["dimensions"]) if space["dimensions"] else None
+            except ValueError:
+                old_dimensions = None
+            delta = changes.diff(
+                {**space, "dimensions": old_dimensions},
+                {"title": title, "location": location, "latitude": latitude, "longitude": longitude,
+                 "rate_per_hour": rate_per_hour, "description": description,
+                 "dimensions": dimensions if dimensions_json else None},
+            )
+            if delta:
+                changes.record(cursor, "space", space_id, "update", delta)
+            conn.commit()
+            cache.invalidate(f"space:{space_id}", f"host_spaces:{space['owner_id']}")
+            cache.bump("spaces")
+
+            # Fetch updated space with owner_name
+            select_query = f"""
+                SELECT {SPACE_ROW.select}
+                FROM spaces s
+                JOIN users u ON s.owner_id = u.id
+                WHERE s.id = %s
+            """
+            cursor = conn.cursor()
+            cursor.execute(select_query, (space_id,))
+            updated_space = SPACE_ROW.one(cursor)
 
-        cursor.close()
-        conn.close()
+            return updated_space
 
-        return updated_space
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await db.run_db(work)
 
 @app.put("/api/spaces/{space_id}/availability")
 async def update_space_availability(space_id: int, request: Request):
@@ -687,54 +1686,53 @@ async def update_space_availability(space_id: int, request: Request):
     if availability not in ("available", "on_hold", "not_available"):
         raise HTTPException(status_code=422, detail="Invalid or missing availability value")
 
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
-    try:
-        cursor = conn.cursor(dictionary=True)
-
-        # Check if space exists
-        cursor.execute("SELECT * FROM spaces WHERE id = %s", (space_id,))
-        space = cursor.fetchone()
-        if not space:
-            raise HTTPException(status_code=404, detail="Space not found")
-
-        # Update availability
-        cursor.execute(
-            "UPDATE spaces SET availability = %s WHERE id = %s",
-            (availability, space_id)
-        )
-        conn.commit()
+    def work():
+        conn = get_db_connection()
+        if not conn:
+            raise HTTPException(status_code=500, detail="Database connection failed")
 
-        # Get updated space with owner_name
-        select_query = """
-            SELECT s.*, u.username AS owner_name
-            FROM spaces s
-            JOIN users u ON s.owner_id = u.id
-            WHERE s.id = %s
-        """
-        cursor.execute(select_query, (space_id,))
-        updated_space = cursor.fetchone()
+        try:
+            cursor = conn.cursor(dictionary=True)
 
-        # Parse dimensions if parking
-        if updated_space["type"] == "parking" and updated_space["dimensions"]:
-            try:
-                updated_space["dimensions"] = json.loads(updated_space["dimensions"])
-            except Exception:
-                updated_space["dimensions"] = None
-        else:
-            updated_space["dimensions"] = None
+            # Check if space exists
+            cursor.execute("SELECT * FROM spaces WHERE id = %s", (space_id,))
+            space = cursor.fetchone()
+            if not space:
+                raise HTTPException(status_code=404, detail="Space not found")
+
+            # Update availability
+            cursor.execute(
+                "UPDATE spaces SET availability = %s WHERE id = %s",
+                (availability, space_id)
+            )
+            if availability != space["availability"]:
+                changes.record(cursor, "space", space_id, "update", {"availability": availability})
+            conn.commit()
+            stats.move("spaces_by_availability", space["availability"], availability)
+            cache.invalidate(f"space:{space_id}", f"host_spaces:{space['owner_id']}")
+            cache.bump("spaces")
+
+            # Get updated space with owner_name
+            select_query = f"""
+                SELECT {SPACE_ROW.select}
+                FROM spaces s
+                JOIN users u ON s.owner_id = u.id
+                WHERE s.id = %s
+            """
+            cursor = conn.cursor()
+            cursor.execute(select_query, (space_id,))
+            updated_space = SPACE_ROW.one(cursor)
 
-        cursor.close()
-        conn.close()
+            return updated_space
 
-        return updated_space
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await db.run_db(work)
 
 # INTEREST ENDPOINTS
 
@@ -766,72 +1764,203 @@ async def express_interest(request: Request):
     }
     """
 
-    try:
 
-        data = await request.json()
-        user_id = data.get("user_id")
-        space_id = data.get("space_id")
-        hours_requested = data.get("hours_requested")
+    data = await request.json()
+    user_id = data.get("user_id")
+    space_id = data.get("space_id")
+    hours_requested = data.get("hours_requested")
 
-        if not user_id or not space_id:
-            raise HTTPException(status_code=400, detail="user_id and space_id are required")
+    if not user_id or not space_id:
+        raise HTTPException(status_code=400, detail="user_id and space_id are required")
+    try:
+        user_id, space_id = int(user_id), int(space_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="user_id and space_id must be integers")
 
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+    # The guest and space columns of the response; usually cache hits
+    user, space = await asyncio.gather(cached_user_card(user_id), cached_space(space_id))
+    # Set here rather than by the column default so the response needs no read-back
+    timestamp = datetime.utcnow().replace(microsecond=0)
 
-        check_query = """
-        SELECT id FROM interests WHERE user_id = %s AND space_id = %s
-        """
-        cursor.execute(check_query, (user_id, space_id))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Already interested")
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
 
+            # unique_user_space is the duplicate check: no SELECT first, no race
+            insert_query = """
+            INSERT INTO interests (user_id, space_id, hours_requested, status, timestamp)
+            VALUES (%s, %s, %s, 'pending', %s)
+            """
+            cursor.execute(insert_query, (user_id, space_id, hours_requested, timestamp))
+            interest_id = cursor.lastrowid
+            changes.record(cursor, "interest", interest_id, "create", {
+                "user_id": user_id, "space_id": space_id, "hours_requested": hours_requested,
+                "status": "pending", "timestamp": timestamp,
+            }, user_id=user_id, owner_id=space["owner_id"])
+            connection.commit()
+            stats.adjust("interests_by_status", "pending")
+
+            interest = new_interest(interest_id, user_id, user, space_id, space, hours_requested, timestamp)
+            events.hub.publish(interest_topics(user_id, space["owner_id"]), "interest.created", interest)
+            return interest
+
+        except mysql.connector.IntegrityError as e:
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise HTTPException(status_code=400, detail="Already interested")
+            if e.errno == errorcode.ER_NO_REFERENCED_ROW_2:
+                # Deleted since the cached lookup
+                raise HTTPException(status_code=404, detail="User or space not found")
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
+
+# Spaces per POST /api/interests/bulk call
+INTEREST_BULK_LIMIT = 100
+
+def new_interest(interest_id, user_id, user, space_id, space, hours_requested, timestamp):
+    """Response row of a just-created interest, built from values already in hand."""
+    return {
+        "id": interest_id,
+        "user_id": user_id,
+        "space_id": space_id,
+        "hours_requested": hours_requested,
+        "status": "pending",
+        "host_response_date": None,
+        "timestamp": timestamp,
+        "user_name": user["username"],
+        "user_email": user["email"],
+        "space_title": space["title"],
+        "space_location": space["location"],
+        "space_rate": space["rate_per_hour"],
+    }
 
-        insert_query = """
-        INSERT INTO interests (user_id, space_id, hours_requested, status)
-        VALUES (%s, %s, %s, 'pending')
-        """
-        cursor.execute(insert_query, (user_id, space_id, hours_requested))
-        connection.commit()
-        interest_id = cursor.lastrowid
-
-
-        select_query = """
-        SELECT 
-            i.id, 
-            i.user_id, 
-            i.space_id, 
-            i.hours_requested,
-            i.status,
-            i.host_response_date,
-            i.timestamp,
-            u.username AS user_name,
-            u.email AS user_email,
-            s.title AS space_title,
-            s.location AS space_location,
-            s.rate_per_hour AS space_rate
-        FROM interests i
-        JOIN users u ON i.user_id = u.id
-        JOIN spaces s ON i.space_id = s.id
-        WHERE i.id = %s
-        """
-        cursor.execute(select_query, (interest_id,))
-        interest = cursor.fetchone()
+def interest_topics(user_id, owner_id):
+    """Event topics (events.py) of an interest: the guest's and the space owner's streams."""
+    return (f"user:{user_id}", f"user:{owner_id}")
 
-        # 6. Format datetime fields
-        if isinstance(interest["timestamp"], datetime):
-            interest["timestamp"] = interest["timestamp"].isoformat() + "Z"
-        if interest["host_response_date"] and isinstance(interest["host_response_date"], datetime):
-            interest["host_response_date"] = interest["host_response_date"].isoformat() + "Z"
+@app.post("/api/interests/bulk")
+async def express_interests_bulk(request: Request):
+    """
+    Express interest in several spaces at once, in one transaction.
 
-        return interest
+    body
+    {
+        "user_id": 1,
+        "space_ids": [123, 124, 125],
+        "hours_requested": 4  # optional, applies to every space
+    }
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    Return
+    {
+        "created": [ same as express_interest ],
+        "already_interested": [124],  # space ids skipped
+        "not_found": [125]
+    }
+    """
+    data = await request.json()
+    user_id = data.get("user_id")
+    space_ids = data.get("space_ids")
+    hours_requested = data.get("hours_requested")
+
+    if not user_id or not isinstance(space_ids, list) or not space_ids:
+        raise HTTPException(status_code=400, detail="user_id and a non-empty space_ids list are required")
+    try:
+        user_id = int(user_id)
+        # Duplicates in the request count once
+        space_ids = list(dict.fromkeys(int(space_id) for space_id in space_ids))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="user_id and space_ids must be integers")
+    if len(space_ids) > INTEREST_BULK_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {INTEREST_BULK_LIMIT} spaces per request")
+
+    timestamp = datetime.utcnow().replace(microsecond=0)
+    placeholders = ", ".join(["%s"] * len(space_ids))
+
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 1. Lock the guest: serializes bulk calls for one user, so their
+            # gap locks below cannot deadlock each other
+            cursor.execute("SELECT username, email FROM users WHERE id = %s FOR UPDATE", (user_id,))
+            row = cursor.fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="User not found")
+            user = {"username": row[0], "email": row[1]}
+
+            # 2. Existing interests; FOR UPDATE also locks the missing pairs'
+            # gaps so a concurrent express_interest waits for this commit
+            cursor.execute(
+                f"SELECT space_id FROM interests WHERE user_id = %s AND space_id IN ({placeholders}) FOR UPDATE",
+                (user_id, *space_ids),
+            )
+            existing = {space_id for (space_id,) in cursor.fetchall()}
+
+            # 3. The spaces that exist, with the columns the response needs
+            cursor.execute(
+                f"SELECT id, owner_id, title, location, rate_per_hour FROM spaces WHERE id IN ({placeholders})",
+                tuple(space_ids),
+            )
+            spaces = {
+                space_id: {"owner_id": owner_id, "title": title, "location": location, "rate_per_hour": rate}
+                for space_id, owner_id, title, location, rate in cursor.fetchall()
+            }
+
+            new_ids = [space_id for space_id in space_ids if space_id in spaces and space_id not in existing]
+            created = []
+            if new_ids:
+                # 4. One multi-row INSERT, then read back the ids it assigned
+                cursor.executemany("""
+                INSERT INTO interests (user_id, space_id, hours_requested, status, timestamp)
+                VALUES (%s, %s, %s, 'pending', %s)
+                """, [(user_id, space_id, hours_requested, timestamp) for space_id in new_ids])
+                new_placeholders = ", ".join(["%s"] * len(new_ids))
+                cursor.execute(
+                    f"SELECT space_id, id FROM interests WHERE user_id = %s AND space_id IN ({new_placeholders})",
+                    (user_id, *new_ids),
+                )
+                interest_ids = dict(cursor.fetchall())
+                created = [
+                    new_interest(interest_ids[space_id], user_id, user, space_id, spaces[space_id],
+                                 hours_requested, timestamp)
+                    for space_id in new_ids
+                ]
+                changes.record_many(cursor, [
+                    ("interest", interest_ids[space_id], "create",
+                     {"user_id": user_id, "space_id": space_id, "hours_requested": hours_requested,
+                      "status": "pending", "timestamp": timestamp},
+                     user_id, spaces[space_id]["owner_id"])
+                    for space_id in new_ids
+                ])
+            connection.commit()
+            if created:
+                stats.adjust("interests_by_status", "pending", len(created))
+            for interest in created:
+                owner_id = spaces[interest["space_id"]]["owner_id"]
+                events.hub.publish(interest_topics(user_id, owner_id), "interest.created", interest)
+
+            return {
+                "created": created,
+                "already_interested": [space_id for space_id in space_ids if space_id in existing],
+                "not_found": [space_id for space_id in space_ids if space_id not in spaces],
+            }
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
 
 @app.get("/api/interests/user/{user_id}")
 async def get_user_interests(user_id: int):
@@ -862,38 +1991,29 @@ async def get_user_interests(user_id: int):
     """
 
     
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
-    try:
-        cursor = conn.cursor(dictionary=True)
+    def work():
+        conn = get_db_connection()
+        if not conn:
+            raise HTTPException(status_code=500, detail="Database connection failed")
 
-        query = """
-            SELECT 
-                i.id, i.user_id, i.space_id, i.hours_requested, i.status, i.host_response_date, i.timestamp,
-                s.title AS space_title, s.location AS space_location, s.rate_per_hour AS space_rate
-            FROM interests i
-            JOIN spaces s ON i.space_id = s.id
-            WHERE i.user_id = %s
-        """
-        cursor.execute(query, (user_id,))
-        interests = cursor.fetchall()
-
-        # Convert datetime fields to ISO format strings if present
-        for interest in interests:
-            if interest["host_response_date"]:
-                interest["host_response_date"] = interest["host_response_date"].isoformat()
-            if interest["timestamp"]:
-                interest["timestamp"] = interest["timestamp"].isoformat()
+        try:
+            cursor = conn.cursor()
 
-        cursor.close()
-        conn.close()
+            query = f"""
+                SELECT {USER_INTEREST_ROW.select}
+                FROM interests i
+                JOIN spaces s ON i.space_id = s.id
+                WHERE i.user_id = %s
+            """
+            cursor.execute(query, (user_id,))
+            return USER_INTEREST_ROW.rows(cursor)
 
-        return interests
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            conn.close()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return FastJSONResponse(await db.run_db(work))
 
 @app.get("/api/interests/space/{space_id}")
 async def get_space_interests(space_id: int):
@@ -919,40 +2039,124 @@ async def get_space_interests(space_id: int):
     ]
     
     """
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # 2. Query with JOIN
-        query = """
-        SELECT i.id, i.user_id, i.space_id, i.hours_requested, i.status, 
-               i.host_response_date, i.timestamp,
-               u.username AS user_name, u.email AS user_email
-        FROM interests i
-        JOIN users u ON i.user_id = u.id
-        WHERE i.space_id = %s
-        """
-        cursor.execute(query, (space_id,))
-        interests = cursor.fetchall()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
 
-        # 3. Format datetime fields
-        for interest in interests:
-            if isinstance(interest["timestamp"], datetime):
-                interest["timestamp"] = interest["timestamp"].isoformat() + "Z"
-            if isinstance(interest["host_response_date"], datetime):
-                interest["host_response_date"] = interest["host_response_date"].isoformat() + "Z"  
-            elif interest["host_response_date"] is None:
-                interest["host_response_date"] = None
+            # 2. Query with JOIN
+            query = f"""
+            SELECT {SPACE_INTEREST_ROW.select}
+            FROM interests i
+            JOIN users u ON i.user_id = u.id
+            WHERE i.space_id = %s
+            """
+            cursor.execute(query, (space_id,))
 
-        return interests
+            # 3. Rows go to the encoder as-is; datetimes are rendered as UTC "...Z"
+            return SPACE_INTEREST_ROW.rows(cursor)
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
+
+@app.get("/api/interests/host/{owner_id}/summary")
+async def get_host_interest_summary(owner_id: int, latest: int = 0):
+    """
+    Interest counts for every space of a host in one call.
+
+    receive
+    - owner_id
+    - latest: also include the N most recent interests per space (optional, default 0)
+
+    return
+    [
+        {
+            "space_id": 123,
+            "total": 3,
+            "pending": 1,
+            "accepted": 1,
+            "rejected": 1,
+            "latest": [ same as get_space_interests ]  # only when latest > 0
+        }
+    ]
+    """
+
+    if latest < 0:
+        raise HTTPException(status_code=422, detail="latest must not be negative")
+    latest = min(latest, INTEREST_SUMMARY_MAX_LATEST)
+
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+
+            # 2. Count interests per space and status in one grouped query
+            query = """
+            SELECT s.id AS space_id,
+                   COUNT(i.id) AS total,
+                   COALESCE(SUM(i.status = 'pending'), 0) AS pending,
+                   COALESCE(SUM(i.status = 'accepted'), 0) AS accepted,
+                   COALESCE(SUM(i.status = 'rejected'), 0) AS rejected
+            FROM spaces s
+            LEFT JOIN interests i ON i.space_id = s.id
+            WHERE s.owner_id = %s
+            GROUP BY s.id
+            """
+            cursor.execute(query, (owner_id,))
+            summary = cursor.fetchall()
+            for row in summary:
+                for key in ("total", "pending", "accepted", "rejected"):
+                    row[key] = int(row[key])
+
+            if not latest or not summary:
+                return summary
+
+            # 3. Latest N interests per space, ranked in SQL
+            latest_query = """
+            SELECT * FROM (
+                SELECT i.id, i.user_id, i.space_id, i.hours_requested, i.status,
+                       i.host_response_date, i.timestamp,
+                       u.username AS user_name, u.email AS user_email,
+                       ROW_NUMBER() OVER (PARTITION BY i.space_id ORDER BY i.timestamp DESC, i.id DESC) AS rn
+                FROM interests i
+                JOIN spaces s ON i.space_id = s.id
+                JOIN users u ON i.user_id = u.id
+                WHERE s.owner_id = %s
+            ) ranked
+            WHERE rn <= %s
+            ORDER BY space_id, rn
+            """
+            cursor.execute(latest_query, (owner_id, latest))
+            by_space = {}
+            for interest in cursor.fetchall():
+                del interest["rn"]
+                if isinstance(interest["timestamp"], datetime):
+                    interest["timestamp"] = interest["timestamp"].isoformat() + "Z"
+                if isinstance(interest["host_response_date"], datetime):
+                    interest["host_response_date"] = interest["host_response_date"].isoformat() + "Z"
+                by_space.setdefault(interest["space_id"], []).append(interest)
+
+            for row in summary:
+                row["latest"] = by_space.get(row["space_id"], [])
+
+            return summary
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await db.run_db(work)
 
 @app.put("/api/interests/{interest_id}/respond")
 async def respond_to_interest(interest_id: int, request: Request):
@@ -987,91 +2191,123 @@ async def respond_to_interest(interest_id: int, request: Request):
     """
 
     
-    try:
-        # 1. Parse JSON body
-        data = await request.json()
-        new_status = data.get("status")
+    # 1. Parse JSON body
+    data = await request.json()
+    new_status = data.get("status")
 
-        if new_status not in ["accepted", "rejected"]:
-            raise HTTPException(status_code=400, detail="Invalid status value. Must be 'accepted' or 'rejected'.")
+    if new_status not in ["accepted", "rejected"]:
+        raise HTTPException(status_code=400, detail="Invalid status value. Must be 'accepted' or 'rejected'.")
 
-        # 2. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+    def work():
+        try:
+            # 2. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+
+            # 3. Lock the interest and remember its current status for the stats
+            cursor.execute("SELECT status, user_id, space_id FROM interests WHERE id = %s FOR UPDATE", (interest_id,))
+            current = cursor.fetchone()
+            if not current:
+                raise HTTPException(status_code=404, detail="Interest not found")
+            # The host, for the change log and the event; a plain read, so the space row stays unlocked
+            cursor.execute("SELECT owner_id FROM spaces WHERE id = %s", (current["space_id"],))
+            owner_id = cursor.fetchone()["owner_id"]
+
+            # 4. Update interest; the time is set here so the change log can carry it
+            responded_at = datetime.utcnow().replace(microsecond=0)
+            update_query = """
+            UPDATE interests
+            SET status = %s, host_response_date = %s
+            WHERE id = %s
+            """
+            cursor.execute(update_query, (new_status, responded_at, interest_id))
+            changes.record(cursor, "interest", interest_id, "update",
+                           {"status": new_status, "host_response_date": responded_at},
+                           user_id=current["user_id"], owner_id=owner_id)
+            connection.commit()
+            stats.move("interests_by_status", current["status"], new_status)
+
+            # 5. Fetch updated interest with user & space details
+            select_query = """
+            SELECT i.id, i.user_id, i.space_id, i.hours_requested, i.status,
+                   i.host_response_date, i.timestamp,
+                   u.username AS user_name, u.email AS user_email,
+                   s.title AS space_title, s.location AS space_location, s.rate_per_hour AS space_rate
+            FROM interests i
+            JOIN users u ON i.user_id = u.id
+            JOIN spaces s ON i.space_id = s.id
+            WHERE i.id = %s
+            """
+            cursor.execute(select_query, (interest_id,))
+            updated_interest = cursor.fetchone()
 
-        # 3. Update interest
-        update_query = """
-        UPDATE interests
-        SET status = %s, host_response_date = NOW()
-        WHERE id = %s
-        """
-        cursor.execute(update_query, (new_status, interest_id))
-        connection.commit()
+            if not updated_interest:
+                raise HTTPException(status_code=404, detail="Updated interest not found")
 
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Interest not found")
-
-        # 4. Fetch updated interest with user & space details
-        select_query = """
-        SELECT i.id, i.user_id, i.space_id, i.hours_requested, i.status,
-               i.host_response_date, i.timestamp,
-               u.username AS user_name, u.email AS user_email,
-               s.title AS space_title, s.location AS space_location, s.rate_per_hour AS space_rate
-        FROM interests i
-        JOIN users u ON i.user_id = u.id
-        JOIN spaces s ON i.space_id = s.id
-        WHERE i.id = %s
-        """
-        cursor.execute(select_query, (interest_id,))
-        updated_interest = cursor.fetchone()
+            # 6. Format datetime fields
+            if isinstance(updated_interest["timestamp"], datetime):
+                updated_interest["timestamp"] = updated_interest["timestamp"].isoformat() + "Z"
+            if isinstance(updated_interest["host_response_date"], datetime):
+                updated_interest["host_response_date"] = updated_interest["host_response_date"].isoformat() + "Z"
+            elif updated_interest["host_response_date"] is None:
+                updated_interest["host_response_date"] = None
 
-        if not updated_interest:
-            raise HTTPException(status_code=404, detail="Updated interest not found")
+            # 7. Tell the guest (and the host's other tabs)
+            events.hub.publish(interest_topics(updated_interest["user_id"], owner_id),
+                               "interest.responded", updated_interest)
 
-        # 5. Format datetime fields
-        if isinstance(updated_interest["timestamp"], datetime):
-            updated_interest["timestamp"] = updated_interest["timestamp"].isoformat() + "Z"
-        if isinstance(updated_interest["host_response_date"], datetime):
-            updated_interest["host_response_date"] = updated_interest["host_response_date"].isoformat() + "Z"
-        elif updated_interest["host_response_date"] is None:
-            updated_interest["host_response_date"] = None
+            return updated_interest
 
-        return updated_interest
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    return await db.run_db(work)
 
 @app.delete("/api/interests/{interest_id}")
 async def cancel_interest(interest_id: int):
     """
     Cancel an interest.
     """
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        # 2. Delete interest
-        delete_query = "DELETE FROM interests WHERE id = %s"
-        cursor.execute(delete_query, (interest_id,))
-        connection.commit()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Lock the interest and remember its status for the stats
+            cursor.execute("SELECT status, user_id, space_id FROM interests WHERE id = %s FOR UPDATE", (interest_id,))
+            current = cursor.fetchone()
+            if not current:
+                raise HTTPException(status_code=404, detail="Interest not found")
+            status, user_id, space_id = current
+            # The owner to notify; a plain read, so the space row stays unlocked
+            cursor.execute("SELECT owner_id FROM spaces WHERE id = %s", (space_id,))
+            (owner_id,) = cursor.fetchone()
+
+            # 3. Delete interest
+            delete_query = "DELETE FROM interests WHERE id = %s"
+            cursor.execute(delete_query, (interest_id,))
+            changes.record(cursor, "interest", interest_id, "delete", user_id=user_id, owner_id=owner_id)
+            connection.commit()
+            stats.adjust("interests_by_status", status, -1)
+            events.hub.publish(interest_topics(user_id, owner_id), "interest.cancelled",
+                               {"id": interest_id, "user_id": user_id, "space_id": space_id})
 
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Interest not found")
+            # 4. Return success message
+            return {"message": "Interest cancelled successfully"}
 
-        # 3. Return success message
-        return {"message": "Interest cancelled successfully"}
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    return await db.run_db(work)
 
 
 @app.get("/api/interests/check/{space_id}/{user_id}")
@@ -1087,30 +2323,141 @@ async def check_user_interest(space_id: int, user_id: int):
     {"has_interest": true}  # or false
     
     """
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Query count
+            query = """
+            SELECT COUNT(*) 
+            FROM interests 
+            WHERE user_id = %s AND space_id = %s
+            """
+            cursor.execute(query, (user_id, space_id))
+            (count,) = cursor.fetchone()
 
-        # 2. Query count
-        query = """
-        SELECT COUNT(*) 
-        FROM interests 
-        WHERE user_id = %s AND space_id = %s
-        """
-        cursor.execute(query, (user_id, space_id))
-        (count,) = cursor.fetchone()
+            # 3. Return boolean result
+            return {"has_interest": count > 0}
 
-        # 3. Return boolean result
-        return {"has_interest": count > 0}
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    return await db.run_db(work)
 
+@app.get("/api/events")
+async def get_events(request: Request, token: str = None):
+    """
+    Server-Sent Events stream of interest changes for the signed-in user: a
+    guest hears about their own interests, a host about interests in their
+    spaces. Replaces refetching the interest lists to spot changes.
+
+    receive
+    - Authorization: Bearer <token>, or ?token=<token> (EventSource cannot send headers)
+
+    stream
+    event: ready                sent on every (re)connect; events are not replayed, so
+                                refetch once if the stream was down
+    event: interest.created     data: {"type": "interest.created", "data": { same as express_interest }}
+    event: interest.responded   data: {"type": "interest.responded", "data": { same as respond_to_interest }}
+    event: interest.cancelled   data: {"type": "interest.cancelled", "data": {"id": 456, "user_id": 1, "space_id": 123}}
+    event: resync               the client fell behind and events were dropped; refetch
+
+    The stream ends when the session is revoked or expires.
+    """
+    if token is None:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            token = None
+    session = await sessions.authenticate(token) if token else None
+    if session is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    async def still_valid():
+        return await sessions.authenticate(token) is not None
+
+    return StreamingResponse(
+        events.stream((f"user:{session.user_id}",), still_valid),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/changes")
+async def get_changes(
+    since: int = None,
+    limit: int = changes.CHANGES_PAGE_SIZE,
+    entities: str = None,
+    session=Depends(current_session),
+):
+    """
+    Incremental sync: what changed after a cursor, as compact deltas, so a
+    client can keep a local copy current without re-pulling the lists.
+
+    receive
+    - since: the cursor from the previous call. Without it only the current
+      cursor is returned: take it right before loading the full lists
+    - limit: changes per page (default CHANGES_PAGE_SIZE, at most CHANGES_MAX_PAGE_SIZE)
+    - entities: optional comma-separated subset of space,interest,user
+
+    Admins see every change. Other sessions see all spaces and the interests
+    they are the guest or the host of. Several changes to one entity within a
+    page are folded into one delta; "data" holds only the changed columns.
+    Changes show up as soon as they commit.
+
+    return
+    {
+        "changes": [
+            {"entity": "space", "id": 123, "op": "update", "at": "2024-01-15T10:30:00.123000Z",
+             "data": {"availability": "on_hold"}},
+            {"entity": "interest", "id": 456, "op": "create", "at": "...",
+             "data": {"user_id": 1, "space_id": 123, "hours_requested": 4, "status": "pending", "timestamp": "..."}},
+            {"entity": "interest", "id": 457, "op": "delete", "at": "..."},
+            {"entity": "user", "id": 9, "op": "delete", "at": "..."}  # admins only; their spaces and interests are listed too
+        ],
+        "cursor": 10234,  # pass as `since` next time
+        "more": false  # true: another page is ready now
+    }
+
+    410 when the changes after `since` were pruned (CHANGES_RETENTION_DAYS):
+    reload in full and start again without `since`.
+    """
+    if not 1 <= limit <= changes.CHANGES_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {changes.CHANGES_MAX_PAGE_SIZE}")
+    selected = changes.ENTITIES
+    if entities:
+        selected = tuple(dict.fromkeys(entity.strip() for entity in entities.split(",")))
+        if not set(selected) <= set(changes.ENTITIES):
+            raise HTTPException(status_code=400, detail=f"entities must be among {', '.join(changes.ENTITIES)}")
+    viewer_id = None if session.role == "admin" else session.user_id
+
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            if since is None:
+                return {"changes": [], "cursor": changes.head(cursor), "more": False}
+            try:
+                rows, next_cursor, more = changes.read(cursor, since, limit, viewer_id, selected)
+            except changes.CursorExpired:
+                raise HTTPException(status_code=410, detail="Cursor expired; reload and sync again without since")
+            return {"changes": changes.compact(rows), "cursor": next_cursor, "more": more}
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
 
 
 # REPORT ENDPOINTS
@@ -1144,92 +2491,99 @@ async def create_report(request: Request):
     
     """
  
-    try:
-        # 1. Parse request body
-        data = await request.json()
-        reporter_id = data.get("reporter_id")
-        reported_id = data.get("reported_id")
-        space_id = data.get("space_id")
-        reason = data.get("reason")
-
-        if not reporter_id or not reported_id or not reason:
-            raise HTTPException(status_code=400, detail="reporter_id, reported_id, and reason are required")
-
-        # 2. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # 3. Get reporter details
-        cursor.execute("SELECT id, username, email, role FROM users WHERE id = %s", (reporter_id,))
-        reporter = cursor.fetchone()
-        # reporter_role = reporter["role"]
-        if not reporter:
-            raise HTTPException(status_code=404, detail="Reporter not found")
-
-        # 4. Get reported user details
-        cursor.execute("SELECT id, username, email, role FROM users WHERE id = %s", (reported_id,))
-        reported = cursor.fetchone()
-        # reported_role = reported["role"]
-        if not reported:
-            raise HTTPException(status_code=404, detail="Reported user not found")
-
-        # 5. Append space title to reason if space_id provided
-        if space_id:
-            cursor.execute("SELECT title FROM spaces WHERE id = %s", (space_id,))
-            space = cursor.fetchone()
-            if space:
-                reason += f" (Listing: {space['title']})"
-
-        # 6. Insert report
-        # insert_query = """
-        # INSERT INTO reports (reporter_id, reported_id, reporter_role, reported_role, reason, timestamp)
-        # VALUES (%s, %s, %s, %s, %s, NOW())
-        # """
-        # cursor.execute(insert_query, (
-        #     reporter_id,
-        #     reported_id,
-        #     reporter["role"],
-        #     reported["role"],
-        #     reason
-        # ))
-
-        insert_query = """
-        INSERT INTO reports (reporter_id, reported_id, reason, timestamp)
-        VALUES (%s, %s, %s, NOW())
-        """
-        cursor.execute(insert_query, (reporter_id, reported_id, reason))    
-        
-        connection.commit()
-        report_id = cursor.lastrowid
-
-        # 7. Build return object
-        new_report = {
-            "id": report_id,
-            "reporter_id": reporter_id,
-            "reported_id": reported_id,
-            "reporter_role": reporter["role"],
-            "reported_role": reported["role"],
-            "reason": reason,
-            "timestamp": datetime.now().isoformat() + "Z",
-            "reporter_name": reporter["username"],
-            "reported_name": reported["username"],
-            "reporter_email": reporter["email"],
-            "reported_email": reported["email"]
-        }
+    # 1. Parse request body
+    data = await request.json()
+    reporter_id = data.get("reporter_id")
+    reported_id = data.get("reported_id")
+    space_id = data.get("space_id")
+    reason = data.get("reason")
 
-        return new_report
+    if not reporter_id or not reported_id or not reason:
+        raise HTTPException(status_code=400, detail="reporter_id, reported_id, and reason are required")
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    def work():
+        try:
+            # 2. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+
+            # 3. Get reporter details
+            cursor.execute("SELECT id, username, email, role FROM users WHERE id = %s", (reporter_id,))
+            reporter = cursor.fetchone()
+            # reporter_role = reporter["role"]
+            if not reporter:
+                raise HTTPException(status_code=404, detail="Reporter not found")
+
+            # 4. Get reported user details
+            cursor.execute("SELECT id, username, email, role FROM users WHERE id = %s", (reported_id,))
+            reported = cursor.fetchone()
+            # reported_role = reported["role"]
+            if not reported:
+                raise HTTPException(status_code=404, detail="Reported user not found")
+
+            # 5. Append space title to reason if space_id provided
+            if space_id:
+                cursor.execute("SELECT title FROM spaces WHERE id = %s", (space_id,))
+                space = cursor.fetchone()
+                if space:
+                    reason += f" (Listing: {space['title']})"
+
+            # 6. Insert report
+            # insert_query = """
+            # INSERT INTO reports (reporter_id, reported_id, reporter_role, reported_role, reason, timestamp)
+            # VALUES (%s, %s, %s, %s, %s, NOW())
+            # """
+            # cursor.execute(insert_query, (
+            #     reporter_id,
+            #     reported_id,
+            #     reporter["role"],
+            #     reported["role"],
+            #     reason
+            # ))
+
+            insert_query = """
+            INSERT INTO reports (reporter_id, reported_id, reason, timestamp)
+            VALUES (%s, %s, %s, NOW())
+            """
+            cursor.execute(insert_query, (reporter_id, reported_id, reason))    
 
-@app.get("/api/reports")
-async def get_reports():
+            connection.commit()
+            report_id = cursor.lastrowid
+            stats.adjust("reports", "total")
+
+            # 7. Build return object
+            new_report = {
+                "id": report_id,
+                "reporter_id": reporter_id,
+                "reported_id": reported_id,
+                "reporter_role": reporter["role"],
+                "reported_role": reported["role"],
+                "reason": reason,
+                "timestamp": datetime.now().isoformat() + "Z",
+                "reporter_name": reporter["username"],
+                "reported_name": reported["username"],
+                "reporter_email": reporter["email"],
+                "reported_email": reported["email"]
+            }
+
+            return new_report
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await db.run_db(work)
+
+@app.get("/api/reports", dependencies=[Depends(require_admin)])
+async def get_reports(format_: str = Query(None, alias="format")):
     """
     Get all reports 
+
+    receive
+    - format: "ndjson" streams the reports as newline-delimited JSON (optional)
     
 
     
@@ -1238,91 +2592,86 @@ async def get_reports():
 
     """
 
-    
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # 2. Query reports with reporter & reported user details
-        # query = """
-        # SELECT
-        #     r.id,
-        #     r.reporter_id,
-        #     r.reported_id,
-        #     r.reporter_role,
-        #     r.reported_role,
-        #     r.reason,
-        #     DATE_FORMAT(r.timestamp, '%Y-%m-%dT%H:%i:%sZ') AS timestamp,
-        #     reporter.username AS reporter_name,
-        #     reported.username AS reported_name,
-        #     reporter.email AS reporter_email,
-        #     reported.email AS reported_email
-        # FROM reports r
-        # JOIN users reporter ON r.reporter_id = reporter.id
-        # JOIN users reported ON r.reported_id = reported.id
-        # ORDER BY r.timestamp DESC
-        # """
-        # cursor.execute(query)
-        # reports = cursor.fetchall()
-
-        query = """
-            SELECT
-                r.id,
-                r.reporter_id,
-                r.reported_id,
-                r.reason,
-                DATE_FORMAT(r.timestamp, '%Y-%m-%dT%H:%i:%sZ') AS timestamp,
-                reporter.role AS reporter_role,
-                reported.role AS reported_role,
-                reporter.username AS reporter_name,
-                reported.username AS reported_name,
-                reporter.email AS reporter_email,
-                reported.email AS reported_email
-            FROM reports r
-            JOIN users reporter ON r.reporter_id = reporter.id
-            JOIN users reported ON r.reported_id = reported.id
-            ORDER BY r.timestamp DESC
-        """
-        cursor.execute(query)
-        reports = cursor.fetchall()
-        
-        # query = """
-        # SELECT id, reporter_id, reported_id, reason, DATE_FORMAT(timestamp, '%Y-%m-%dT%H:%i:%sZ') AS timestamp FROM reports
-        # """
-        # cursor.execute(query)
-        # reports = cursor.fetchall()
-
-        # query2 = """
-        # SELECT * FROM users WHERE id = %s
-        # """
-        # cursor.execute(query2, (reports[0]["reporter_id"],))
-        # reporter_role = cursor.fetchone()
-        # cursor.execute(query2, (reports[0]["reported_id"],))
-        # reported_role = cursor.fetchone()
-
-        # payload = {
-        #     "id": reports[0]["id"],
-        #     "reporter_id": reports[0]["reporter_id"],
-        #     "reported_id": reports[0]["reported_id"],
-        #     "reporter_role": reporter_role["role"],
-        #     "reported_role": reported_role["role"],
-        #     "reason": reports[0]["reason"],
-        #     "timestamp": reports[0]["timestamp"],
-        #     "reporter_name": reporter_role["username"],
-        #     "reported_name": reported_role["username"],
-        #     "reporter_email": reporter_role["email"],
-        #     "reported_email": reported_role["email"]
-        # }
-
-        return reports
+    query = f"""
+        SELECT {REPORT_ROW.select}
+        FROM reports r
+        JOIN users reporter ON r.reporter_id = reporter.id
+        JOIN users reported ON r.reported_id = reported.id
+        ORDER BY r.timestamp DESC
+    """
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    if format_ == "ndjson":
+        return await ndjson_response(query, (), REPORT_ROW, "reports.ndjson")
+
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Query reports with reporter & reported user details
+            # query = """
+            # SELECT
+            #     r.id,
+            #     r.reporter_id,
+            #     r.reported_id,
+            #     r.reporter_role,
+            #     r.reported_role,
+            #     r.reason,
+            #     DATE_FORMAT(r.timestamp, '%Y-%m-%dT%H:%i:%sZ') AS timestamp,
+            #     reporter.username AS reporter_name,
+            #     reported.username AS reported_name,
+            #     reporter.email AS reporter_email,
+            #     reported.email AS reported_email
+            # FROM reports r
+            # JOIN users reporter ON r.reporter_id = reporter.id
+            # JOIN users reported ON r.reported_id = reported.id
+            # ORDER BY r.timestamp DESC
+            # """
+            # cursor.execute(query)
+            # reports = cursor.fetchall()
+
+            cursor.execute(query)
+            reports = REPORT_ROW.rows(cursor)
+
+            # query = """
+            # SELECT id, reporter_id, reported_id, reason, DATE_FORMAT(timestamp, '%Y-%m-%dT%H:%i:%sZ') AS timestamp FROM reports
+            # """
+            # cursor.execute(query)
+            # reports = cursor.fetchall()
+
+            # query2 = """
+            # SELECT * FROM users WHERE id = %s
+            # """
+            # cursor.execute(query2, (reports[0]["reporter_id"],))
+            # reporter_role = cursor.fetchone()
+            # cursor.execute(query2, (reports[0]["reported_id"],))
+            # reported_role = cursor.fetchone()
+
+            # payload = {
+            #     "id": reports[0]["id"],
+            #     "reporter_id": reports[0]["reporter_id"],
+            #     "reported_id": reports[0]["reported_id"],
+            #     "reporter_role": reporter_role["role"],
+            #     "reported_role": reported_role["role"],
+            #     "reason": reports[0]["reason"],
+            #     "timestamp": reports[0]["timestamp"],
+            #     "reporter_name": reporter_role["username"],
+            #     "reported_name": reported_role["username"],
+            #     "reporter_email": reporter_role["email"],
+            #     "reported_email": reported_role["email"]
+            # }
+
+            return reports
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
     
 
 @app.get("/api/users/for-reporting/{current_user_id}/{target_role}")
@@ -1350,89 +2699,198 @@ async def get_users_for_reporting(current_user_id: int, target_role: str):
     """
 
     
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # 2. Query active users with given role, excluding current user
-        query = """
-        SELECT id, username, email, role, status, date_joined
-        FROM users
-        WHERE role = %s AND id != %s AND status = 'active'
-        """
-        cursor.execute(query, (target_role, current_user_id))
-        users = cursor.fetchall()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Query active users with given role, excluding current user
+            query = f"""
+            SELECT {USER_ROW.select}
+            FROM users
+            WHERE role = %s AND id != %s AND status = 'active'
+            """
+            cursor.execute(query, (target_role, current_user_id))
 
-        # 3. Format datetime for JSON
-        for user in users:
-            if isinstance(user["date_joined"], datetime):
-                user["date_joined"] = user["date_joined"].isoformat() + "Z"
+            # 3. Return users (date_joined is rendered as UTC "...Z" by the encoder)
+            return USER_ROW.rows(cursor)
 
-        return users
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    return FastJSONResponse(await db.run_db(work))
     
 
 # ADMIN ENDPOINTS
 
-@app.get("/api/admin/users")
-async def get_all_users():
+@app.get("/api/admin/users", dependencies=[Depends(require_admin)])
+async def get_all_users(
+    role: str = None,
+    status: str = None,
+    q: str = None,
+    sort: str = "id",
+    limit: int = USERS_PAGE_SIZE,
+    after: str = None,
+    format_: str = Query(None, alias="format"),
+):
     """
-    get all users
-    
+    get users (admins excluded), one page at a time
+
+    receive
+    - role: 'guest' or 'host' (optional)
+    - status: 'active', 'banned' or 'pending' (optional)
+    - q: username or email prefix (optional)
+    - sort: 'id', 'username', 'email' or 'date_joined'; prefix with '-' for descending
+    - limit: page size, at most USERS_MAX_PAGE_SIZE
+    - after: next_cursor from the previous page (optional)
+    - format: "ndjson" streams every matching user as newline-delimited JSON (optional)
 
-    
     return
-    [
-        {
-            "id": 123,
-            "username": "user123",
-            "email": "user@example.com",
-            "role": "guest",
-            "status": "active",
-            "date_joined": "2024-01-15T10:30:00Z"
-        }
-    ]
+    {
+        "users": [
+            {
+                "id": 123,
+                "username": "user123",
+                "email": "user@example.com",
+                "role": "guest",
+                "status": "active",
+                "date_joined": "2024-01-15T10:30:00Z"
+            }
+        ],
+        "next_cursor": "WyJhbGljZSIsIDEyXQ=="  # null on the last page
+    }
     
 
     """
-    
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # 2. Query all users except admins
-        query = """
-        SELECT id, username, email, role, status, date_joined
-        FROM users
-        WHERE role != 'admin'
-        """
-        cursor.execute(query)
-        users = cursor.fetchall()
 
-        # 3. Format datetime for JSON
-        for user in users:
-            if isinstance(user["date_joined"], datetime):
-                user["date_joined"] = user["date_joined"].isoformat() + "Z"
+    if role is not None and role not in ("guest", "host"):
+        raise HTTPException(status_code=422, detail="Invalid role value")
+    if status is not None and status not in ("active", "banned", "pending"):
+        raise HTTPException(status_code=422, detail="Invalid status value")
+    descending = sort.startswith("-")
+    sort_key = sort.lstrip("-")
+    if sort_key not in USER_SORT_KEYS:
+        raise HTTPException(status_code=422, detail="Invalid sort key")
+    if limit < 1:
+        raise HTTPException(status_code=422, detail="limit must be positive")
+    limit = min(limit, USERS_MAX_PAGE_SIZE)
+
+    # Filters; admins are never listed
+    conditions = ["role != 'admin'"]
+    params = []
+    if role:
+        conditions.append("role = %s")
+        params.append(role)
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    if q:
+        pattern = like_prefix(q)
+        conditions.append("(username LIKE %s OR email LIKE %s)")
+        params += [pattern, pattern]
+
+    column = USER_SORT_KEYS[sort_key]
+    direction = "DESC" if descending else "ASC"
+    order_by = f" ORDER BY {column} {direction}" + ("" if column == "id" else f", id {direction}")
+
+    if format_ == "ndjson":
+        query = f"SELECT {USER_ROW.select} FROM users WHERE " + " AND ".join(conditions) + order_by
+        return await ndjson_response(query, tuple(params), USER_ROW, "users.ndjson")
+
+    # Keyset pagination on (sort column, id)
+    if after:
+        op = "<" if descending else ">"
+        if column == "id":
+            (last_id,) = decode_cursor(after, 1)
+            conditions.append(f"id {op} %s")
+            params.append(last_id)
+        else:
+            last_value, last_id = decode_cursor(after, 2)
+            conditions.append(f"({column} {op} %s OR ({column} = %s AND id {op} %s))")
+            params += [last_value, last_value, last_id]
 
-        # 4. Return users
-        return users
+    query = f"SELECT {USER_ROW.select} FROM users WHERE " + " AND ".join(conditions) + order_by + " LIMIT %s"
+    params.append(limit + 1)
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Run the query
+            cursor.execute(query, tuple(params))
+            users = USER_ROW.rows(cursor)
+
+            # 3. One extra row tells whether there is another page
+            next_cursor = None
+            if len(users) > limit:
+                users = users[:limit]
+                last = users[-1]
+                values = [last["id"]] if column == "id" else [last[sort_key], last["id"]]
+                next_cursor = encode_cursor(values)
+
+            return {"users": users, "next_cursor": next_cursor}
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
+
+@app.get("/api/admin/users/counts", dependencies=[Depends(require_admin)])
+async def get_user_counts():
+    """
+    User totals for the admin dashboard (admins excluded), from one grouped query.
 
-@app.put("/api/admin/users/{user_id}/ban")
+    return
+    {
+        "total": 120,
+        "by_role": {"guest": 90, "host": 30},
+        "by_status": {"active": 110, "banned": 8, "pending": 2}
+    }
+    """
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            cursor.execute("""
+            SELECT role, status, COUNT(*)
+            FROM users
+            WHERE role != 'admin'
+            GROUP BY role, status
+            """)
+
+            counts = {
+                "total": 0,
+                "by_role": {"guest": 0, "host": 0},
+                "by_status": {"active": 0, "banned": 0, "pending": 0},
+            }
+            for role, status, count in cursor.fetchall():
+                counts["total"] += count
+                counts["by_role"][role] += count
+                counts["by_status"][status] += count
+            return counts
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await db.run_db(work)
+
+@app.put("/api/admin/users/{user_id}/ban", dependencies=[Depends(require_admin)])
 async def ban_user(user_id: int):
     """
 
@@ -1445,35 +2903,45 @@ async def ban_user(user_id: int):
     
    
     """
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Lock the user and remember the current status for the stats
+            cursor.execute("SELECT role, status FROM users WHERE id = %s FOR UPDATE", (user_id,))
+            current = cursor.fetchone()
+
+            # 3. Update user status to 'banned' and end their sessions
+            update_query = """
+            UPDATE users
+            SET status = 'banned', session_version = session_version + 1
+            WHERE id = %s
+            """
+            cursor.execute(update_query, (user_id,))
+            connection.commit()
 
-        # 2. Update user status to 'banned'
-        update_query = """
-        UPDATE users
-        SET status = 'banned'
-        WHERE id = %s
-        """
-        cursor.execute(update_query, (user_id,))
-        connection.commit()
+            # 4. Check if any row was affected
+            if cursor.rowcount == 0:
+                raise HTTPException(status_code=404, detail="User not found")
+            if current and current[0] != "admin":
+                stats.move("users_by_status", current[1], "banned")
+            sessions.revoke_user(user_id)
 
-        # 3. Check if any row was affected
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="User not found")
+            # 5. Return success message
+            return {"message": "User banned successfully"}
 
-        # 4. Return success message
-        return {"message": "User banned successfully"}
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    return await db.run_db(work)
 
-@app.put("/api/admin/users/{user_id}/unban")
+@app.put("/api/admin/users/{user_id}/unban", dependencies=[Depends(require_admin)])
 async def unban_user(user_id: int):
     """
     
@@ -1486,73 +2954,224 @@ async def unban_user(user_id: int):
 
     """
 
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Lock the user and remember the current status for the stats
+            cursor.execute("SELECT role, status FROM users WHERE id = %s FOR UPDATE", (user_id,))
+            current = cursor.fetchone()
+
+            # 3. Update user status to 'active'
+            update_query = """
+            UPDATE users
+            SET status = 'active'
+            WHERE id = %s
+            """
+            cursor.execute(update_query, (user_id,))
+            connection.commit()
 
-        # 2. Update user status to 'active'
-        update_query = """
-        UPDATE users
-        SET status = 'active'
-        WHERE id = %s
-        """
-        cursor.execute(update_query, (user_id,))
-        connection.commit()
+            # 4. Check if user was found and updated
+            if cursor.rowcount == 0:
+                raise HTTPException(status_code=404, detail="User not found")
+            if current and current[0] != "admin":
+                stats.move("users_by_status", current[1], "active")
 
-        # 3. Check if user was found and updated
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="User not found")
+            # 5. Return success message
+            return {"message": "User unbanned successfully"}
 
-        # 4. Return success message
-        return {"message": "User unbanned successfully"}
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    return await db.run_db(work)
 
-@app.delete("/api/admin/users/{user_id}")
+@app.delete("/api/admin/users/{user_id}", status_code=202, dependencies=[Depends(require_admin)])
 async def delete_user(user_id: int):
     """
+    Sign the user out and queue the deletion; the cascade over their spaces,
+    interests and reports runs as a background job (see delete_user_job).
 
-    
     receive
     - user_id: int
     
-    YOU NEED TO RETURN:
-    {"message": "User deleted successfully"}
+    return
+    {"message": "User deletion queued", "job_id": 42}  # poll GET /api/admin/jobs/{job_id}
 
     """
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Check the user exists
+            cursor.execute("SELECT id FROM users WHERE id = %s", (user_id,))
+            if not cursor.fetchone():
+                raise HTTPException(status_code=404, detail="User not found")
+
+            # 3. Queue the deletion and end their sessions
+            job_id = jobs.enqueue(cursor, "delete_user", {"user_id": user_id})
+            sessions.revoke_in(cursor, [user_id])
+            connection.commit()
+            jobs.wake()
+            sessions.revoke_user(user_id)
 
-        # 2. Delete user (related data will be auto-deleted due to ON DELETE CASCADE)
-        delete_query = """
-        DELETE FROM users WHERE id = %s
-        """
-        cursor.execute(delete_query, (user_id,))
-        connection.commit()
+            return {"message": "User deletion queued", "job_id": job_id}
 
-        # 3. Check if user existed
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="User not found")
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
-        # 4. Return success message
-        return {"message": "User deleted successfully"}
+    return await db.run_db(work)
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+# Rows removed per transaction by delete_user_job
+DELETE_BATCH_SIZE = 1000
+
+@jobs.handler("delete_user")
+def delete_user_job(connection, payload):
+    """
+    Delete a user and everything that depends on it in batches of at most
+    DELETE_BATCH_SIZE rows per transaction, so a host with thousands of
+    spaces never holds locks for long. A retry resumes with what is left.
+    """
+    user_id = payload["user_id"]
+    removed = {"interests": 0, "spaces": 0, "reports": 0}
+    cursor = connection.cursor()
+
+    def lock_interests(limit=None):
+        # (id, status, guest id, space owner) of interests by the user and in the user's spaces
+        cursor.execute(f"""
+        SELECT id, status, user_id, space_id
+        FROM interests
+        WHERE user_id = %s OR space_id IN (SELECT id FROM spaces WHERE owner_id = %s)
+        {"LIMIT %s" if limit else ""}
+        FOR UPDATE
+        """, (user_id, user_id, limit) if limit else (user_id, user_id))
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+        # Space owners for the change log; a plain read, other hosts' spaces stay unlocked
+        space_ids = list({row[3] for row in rows})
+        cursor.execute(f"SELECT id, owner_id FROM spaces WHERE id IN ({', '.join(['%s'] * len(space_ids))})",
+                       space_ids)
+        owners = dict(cursor.fetchall())
+        return [(interest_id, status, guest_id, owners.get(space_id)) for interest_id, status, guest_id, space_id in rows]
+
+    try:
+        # 1. Interests by the user and in the user's spaces
+        while True:
+            rows = lock_interests(DELETE_BATCH_SIZE)
+            if not rows:
+                break
+            placeholders = ", ".join(["%s"] * len(rows))
+            cursor.execute(f"DELETE FROM interests WHERE id IN ({placeholders})", [row[0] for row in rows])
+            changes.record_many(cursor, [
+                ("interest", interest_id, "delete", None, guest_id, owner_id)
+                for interest_id, _, guest_id, owner_id in rows
+            ])
+            connection.commit()
+            for _, status, _, _ in rows:
+                stats.adjust("interests_by_status", status, -1)
+            removed["interests"] += len(rows)
+
+        # 2. The user's spaces
+        while True:
+            cursor.execute(
+                "SELECT id, type, availability FROM spaces WHERE owner_id = %s LIMIT %s FOR UPDATE",
+                (user_id, DELETE_BATCH_SIZE)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            placeholders = ", ".join(["%s"] * len(rows))
+            # Interests added to these spaces since step 1 go by cascade; log them too
+            cursor.execute(f"SELECT id, status, user_id FROM interests WHERE space_id IN ({placeholders}) FOR UPDATE",
+                           [row[0] for row in rows])
+            cascaded = cursor.fetchall()
+            cursor.execute(f"DELETE FROM spaces WHERE id IN ({placeholders})", [row[0] for row in rows])
+            changes.record_many(cursor, [
+                ("interest", interest_id, "delete", None, guest_id, user_id) for interest_id, _, guest_id in cascaded
+            ] + [("space", row[0], "delete", None, None, None) for row in rows])
+            connection.commit()
+            for _, status, _ in cascaded:
+                stats.adjust("interests_by_status", status, -1)
+            for _, type_, availability in rows:
+                stats.adjust("spaces_by_type", type_, -1)
+                stats.adjust("spaces_by_availability", availability, -1)
+            cache.invalidate(*(f"space:{row[0]}" for row in rows))
+            removed["interests"] += len(cascaded)
+            removed["spaces"] += len(rows)
+        if removed["spaces"]:
+            cache.invalidate(f"host_spaces:{user_id}")
+            cache.bump("spaces")
+
+        # 3. Reports by or about the user
+        while True:
+            cursor.execute(
+                "DELETE FROM reports WHERE reporter_id = %s OR reported_id = %s LIMIT %s",
+                (user_id, user_id, DELETE_BATCH_SIZE)
+            )
+            count = cursor.rowcount
+            connection.commit()
+            if count:
+                stats.adjust("reports", "total", -count)
+                removed["reports"] += count
+            if count < DELETE_BATCH_SIZE:
+                break
+
+        # 4. The user row; ON DELETE CASCADE sweeps up anything added meanwhile
+        cursor.execute("SELECT role, status FROM users WHERE id = %s FOR UPDATE", (user_id,))
+        user = cursor.fetchone()
+        if user is None:
+            connection.commit()
+            return {"user_id": user_id, "already_deleted": True, **removed}
+        # Log what the cascade deletes (anything added since steps 1-2). The user
+        # row lock keeps new spaces out and the space locks new interests (their
+        # foreign key checks wait), so nothing slips past these reads
+        cursor.execute("SELECT id, type, availability FROM spaces WHERE owner_id = %s FOR UPDATE", (user_id,))
+        late_spaces = cursor.fetchall()
+        late_interests = lock_interests()
+        # Applications this admin approved lose admin_id (ON DELETE SET NULL) and count as pending again
+        cursor.execute("SELECT COUNT(*) FROM pending_hosts WHERE admin_id = %s", (user_id,))
+        (reopened,) = cursor.fetchone()
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        changes.record_many(cursor, [
+            ("interest", interest_id, "delete", None, guest_id, owner_id)
+            for interest_id, _, guest_id, owner_id in late_interests
+        ] + [
+            ("space", space_id, "delete", None, None, None) for space_id, _, _ in late_spaces
+        ] + [("user", user_id, "delete", None, None, None)])
+        connection.commit()
+
+        stats.adjust_user(user[0], user[1], -1)
+        if reopened:
+            stats.adjust("pending_hosts", "total", reopened)
+        for _, status, _, _ in late_interests:
+            stats.adjust("interests_by_status", status, -1)
+        for _, type_, availability in late_spaces:
+            stats.adjust("spaces_by_type", type_, -1)
+            stats.adjust("spaces_by_availability", availability, -1)
+        if late_spaces:
+            cache.invalidate(f"host_spaces:{user_id}", *(f"space:{space_id}" for space_id, _, _ in late_spaces))
+            cache.bump("spaces")
+        removed["interests"] += len(late_interests)
+        removed["spaces"] += len(late_spaces)
+        sessions.revoke_user(user_id)
+        cache.invalidate(f"user_card:{user_id}")
+        return {"user_id": user_id, **removed}
     finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+        cursor.close()
 
-@app.get("/api/admin/pending-hosts")
+@app.get("/api/admin/pending-hosts", dependencies=[Depends(require_admin)])
 async def get_pending_hosts():
     """
    
@@ -1571,103 +3190,132 @@ async def get_pending_hosts():
     
 
     """
-    try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        # 2. Query all pending hosts
-        query = """
-        SELECT id, username, email, nid, phone, date_applied
-        FROM pending_hosts
-        WHERE admin_id IS NULL
-        """
-        cursor.execute(query)
-        pending_hosts = cursor.fetchall()
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+
+            # 2. Query all pending hosts
+            query = """
+            SELECT id, username, email, nid, phone, date_applied
+            FROM pending_hosts
+            WHERE admin_id IS NULL
+            """
+            cursor.execute(query)
+            pending_hosts = cursor.fetchall()
 
-        # 3. Format datetime fields
-        for host in pending_hosts:
-            if isinstance(host["date_applied"], datetime):
-                host["date_applied"] = host["date_applied"].isoformat() + "Z"
+            # 3. Format datetime fields
+            for host in pending_hosts:
+                if isinstance(host["date_applied"], datetime):
+                    host["date_applied"] = host["date_applied"].isoformat() + "Z"
 
-        # 4. Return list
-        return pending_hosts
+            # 4. Return list
+            return pending_hosts
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await db.run_db(work)
 
-@app.post("/api/admin/approve-host/{pending_host_id}")
+@app.post("/api/admin/approve-host/{pending_host_id}", status_code=202, dependencies=[Depends(require_admin)])
 async def approve_host(pending_host_id: int, request: Request):
     """
-    
+    Queue the approval; the host account is created by a background job
+    (see approve_host_job).
+
     receives
     - pending_host_id
     - admin_id
     
     return
-    {"message": "Host approved successfully"}
+    {"message": "Host approval queued", "job_id": 42}  # poll GET /api/admin/jobs/{job_id}
     
 
     """
-    try:
-        data = await request.json()
-        admin_id = data.get("admin_id")
+    data = await request.json()
+    admin_id = data.get("admin_id")
 
-        if not admin_id:
-            raise HTTPException(status_code=400, detail="admin_id is required")
+    if not admin_id:
+        raise HTTPException(status_code=400, detail="admin_id is required")
 
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
 
-        # 2. Get pending host
-        cursor.execute("SELECT * FROM pending_hosts WHERE id = %s", (pending_host_id,))
-        pending_host = cursor.fetchone()
+            # 2. Get pending host
+            cursor.execute("SELECT admin_id FROM pending_hosts WHERE id = %s", (pending_host_id,))
+            pending_host = cursor.fetchone()
+
+            if not pending_host:
+                raise HTTPException(status_code=404, detail="Pending host not found")
+            if pending_host[0] is not None:
+                raise HTTPException(status_code=400, detail="Host application already approved")
+
+            # 3. Queue the approval
+            job_id = jobs.enqueue(cursor, "approve_host", {"pending_host_id": pending_host_id, "admin_id": admin_id})
+            connection.commit()
+            jobs.wake()
+
+            return {"message": "Host approval queued", "job_id": job_id}
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
 
+    return await db.run_db(work)
+
+@jobs.handler("approve_host")
+def approve_host_job(connection, payload):
+    """Create the host account and mark the application approved, in one transaction."""
+    pending_host_id = payload["pending_host_id"]
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT * FROM pending_hosts WHERE id = %s FOR UPDATE", (pending_host_id,))
+        pending_host = cursor.fetchone()
         if not pending_host:
-            raise HTTPException(status_code=404, detail="Pending host not found")
+            raise jobs.JobFailed("Pending host not found")
+        if pending_host["admin_id"] is not None:
+            # Approved by an earlier attempt (or a second request)
+            return {"already_approved": True}
 
-        # 3. Insert into users
         insert_query = """
             INSERT INTO users (username, email, password, role, status, nid, phone)
             VALUES (%s, %s, %s, 'host', 'active', %s, %s)
         """
-        cursor.execute(insert_query, (
-            pending_host["username"],
-            pending_host["email"],
-            pending_host["password"],
-            pending_host["nid"], 
-            pending_host["phone"],
-        ))
-        connection.commit()
-
-        # # 4. Delete from pending_hosts
-        # cursor.execute("DELETE FROM pending_hosts WHERE id = %s", (pending_host_id,))
-        # connection.commit()
+        try:
+            cursor.execute(insert_query, (
+                pending_host["username"],
+                pending_host["email"],
+                pending_host["password"],
+                pending_host["nid"],
+                pending_host["phone"],
+            ))
+        except mysql.connector.IntegrityError as e:
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise jobs.JobFailed("A user with this email already exists")
+            raise
+        user_id = cursor.lastrowid
 
-        # update pending host admin_id
-        update_query = """
-        UPDATE pending_hosts
-        SET admin_id = %s
-        WHERE id = %s
-        """
-        cursor.execute(update_query, (admin_id, pending_host_id))
+        cursor.execute("UPDATE pending_hosts SET admin_id = %s WHERE id = %s", (payload["admin_id"], pending_host_id))
         connection.commit()
 
-        return {"message": "Host approved successfully"}
-
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        stats.adjust_user("host", "active")
+        stats.adjust("pending_hosts", "total", -1)
+        return {"user_id": user_id}
     finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+        cursor.close()
 
-@app.delete("/api/admin/reject-host/{pending_host_id}")
+@app.delete("/api/admin/reject-host/{pending_host_id}", dependencies=[Depends(require_admin)])
 async def reject_host(pending_host_id: int):
     """
 
@@ -1680,27 +3328,440 @@ async def reject_host(pending_host_id: int):
     
 
     """
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Approved applications stay in the table, so check before counting
+            cursor.execute("SELECT admin_id FROM pending_hosts WHERE id = %s FOR UPDATE", (pending_host_id,))
+            pending_host = cursor.fetchone()
+            if not pending_host:
+                raise HTTPException(status_code=404, detail="Pending host not found")
+
+            # 3. Delete pending host
+            cursor.execute("DELETE FROM pending_hosts WHERE id = %s", (pending_host_id,))
+            connection.commit()
+            if pending_host[0] is None:
+                stats.adjust("pending_hosts", "total", -1)
+
+            # 4. Return success message
+            return {"message": "Host application rejected"}
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await db.run_db(work)
+
+# Ids per bulk admin call (override with the ADMIN_BULK_LIMIT environment variable)
+ADMIN_BULK_LIMIT = int(os.getenv("ADMIN_BULK_LIMIT", "500"))
+
+def bulk_ids(data, key):
+    """The id list `key` of a bulk request body: integers, deduplicated in order, at most ADMIN_BULK_LIMIT."""
+    ids = data.get(key)
+    if not isinstance(ids, list) or not ids:
+        raise HTTPException(status_code=400, detail=f"{key} must be a non-empty list")
     try:
-        # 1. Connect to MySQL
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        ids = list(dict.fromkeys(int(id_) for id_ in ids))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{key} must contain integers")
+    if len(ids) > ADMIN_BULK_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {ADMIN_BULK_LIMIT} ids per request")
+    return ids
+
+@app.post("/api/admin/users/bulk", dependencies=[Depends(require_admin)])
+async def bulk_user_action(request: Request):
+    """
+    Ban, unban or delete many users in one transaction. Ban and unban are a
+    single UPDATE over every id; delete queues one background job for all
+    of them (see delete_users_job).
 
-        # 2. Delete pending host
-        cursor.execute("DELETE FROM pending_hosts WHERE id = %s", (pending_host_id,))
-        connection.commit()
+    body
+    {
+        "action": "ban",  # 'ban', 'unban' or 'delete'
+        "user_ids": [12, 13, 14]  # at most ADMIN_BULK_LIMIT
+    }
 
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Pending host not found")
+    return
+    {
+        "results": [
+            {"id": 12, "result": "banned"},  # 'banned', 'unbanned', 'queued'
+            {"id": 14, "result": "not_found"}
+        ],
+        "job_id": 42  # delete only
+    }
+    """
+    data = await request.json()
+    action = data.get("action")
+    if action not in ("ban", "unban", "delete"):
+        raise HTTPException(status_code=400, detail="action must be 'ban', 'unban' or 'delete'")
+    user_ids = bulk_ids(data, "user_ids")
+    placeholders = ", ".join(["%s"] * len(user_ids))
+
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Lock the users that exist; role and status are needed for the stats
+            cursor.execute(f"SELECT id, role, status FROM users WHERE id IN ({placeholders}) FOR UPDATE", user_ids)
+            found = {user_id: (role, status) for user_id, role, status in cursor.fetchall()}
+            ids = [user_id for user_id in user_ids if user_id in found]
+            job_id = None
+
+            # 3. One statement for all of them
+            if ids:
+                found_placeholders = ", ".join(["%s"] * len(ids))
+                if action == "delete":
+                    job_id = jobs.enqueue(cursor, "delete_users", {"user_ids": ids})
+                else:
+                    new_status = "banned" if action == "ban" else "active"
+                    cursor.execute(f"UPDATE users SET status = %s WHERE id IN ({found_placeholders})", (new_status, *ids))
+                if action != "unban":
+                    sessions.revoke_in(cursor, ids)
+            connection.commit()
 
-        # 3. Return success message
-        return {"message": "Host application rejected"}
+            # 4. Stats, sessions and the job workers
+            for user_id in ids:
+                role, status = found[user_id]
+                if action != "unban":
+                    sessions.revoke_user(user_id)
+                if action != "delete" and role != "admin":
+                    stats.move("users_by_status", status, "banned" if action == "ban" else "active")
+            if job_id:
+                jobs.wake()
+
+            done = {"ban": "banned", "unban": "unbanned", "delete": "queued"}[action]
+            result = {
+                "results": [
+                    {"id": user_id, "result": done if user_id in found else "not_found"}
+                    for user_id in user_ids
+                ],
+            }
+            if action == "delete":
+                result["job_id"] = job_id
+            return result
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await db.run_db(work)
+
+@jobs.handler("delete_users")
+def delete_users_job(connection, payload):
+    """delete_user_job for each id in turn; a retry skips users already gone."""
+    return [delete_user_job(connection, {"user_id": user_id}) for user_id in payload["user_ids"]]
+
+@app.post("/api/admin/pending-hosts/bulk", dependencies=[Depends(require_admin)])
+async def bulk_pending_host_action(request: Request):
+    """
+    Approve or reject many host applications in one transaction. Approval is
+    one INSERT ... SELECT into users plus one UPDATE; rejection one DELETE.
+    If the approval statements hit a constraint (an account registered with
+    one of the emails meanwhile), the batch is retried one application at a
+    time and only the offending ones are reported.
 
-    except Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+    body
+    {
+        "action": "approve",  # 'approve' or 'reject'
+        "pending_host_ids": [3, 4, 5],  # at most ADMIN_BULK_LIMIT
+        "admin_id": 1  # approve only
+    }
+
+    return
+    {
+        "results": [
+            {"id": 3, "result": "approved"},  # 'approved', 'rejected'
+            {"id": 4, "result": "already_approved"},  # approve only
+            {"id": 5, "result": "email_taken"},  # approve only: a user has this email
+            {"id": 6, "result": "duplicate_email"},  # approve only: an earlier id in this batch has it
+            {"id": 7, "result": "failed"},  # approve only: the database refused this one
+            {"id": 8, "result": "not_found"}
+        ]
+    }
+    """
+    data = await request.json()
+    action = data.get("action")
+    admin_id = data.get("admin_id")
+    if action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="action must be 'approve' or 'reject'")
+    if action == "approve" and not admin_id:
+        raise HTTPException(status_code=400, detail="admin_id is required")
+    pending_host_ids = bulk_ids(data, "pending_host_ids")
+    placeholders = ", ".join(["%s"] * len(pending_host_ids))
+
+    def work():
+        try:
+            # 1. Connect to MySQL
+            connection = get_db_connection()
+            cursor = connection.cursor()
+
+            # 2. Lock the applications that exist
+            cursor.execute(
+                f"SELECT id, email, admin_id FROM pending_hosts WHERE id IN ({placeholders}) FOR UPDATE",
+                pending_host_ids
+            )
+            found = {pending_id: (email, approved_by) for pending_id, email, approved_by in cursor.fetchall()}
+            results = {pending_id: "not_found" for pending_id in pending_host_ids if pending_id not in found}
+
+            if action == "reject":
+                ids = list(found)
+                if ids:
+                    # 3. One DELETE for all of them
+                    cursor.execute(f"DELETE FROM pending_hosts WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+                connection.commit()
+                results.update({pending_id: "rejected" for pending_id in ids})
+                still_pending = sum(1 for pending_id in ids if found[pending_id][1] is None)
+                if still_pending:
+                    stats.adjust("pending_hosts", "total", -still_pending)
+            else:
+                # 3. Skip approved applications, emails repeated in this batch and
+                # emails that already have an account (emails compare case-insensitively)
+                waiting = [pending_id for pending_id, (_, approved_by) in found.items() if approved_by is None]
+                results.update({pending_id: "already_approved" for pending_id in found if pending_id not in waiting})
+                first_with_email = {}
+                for pending_id in waiting:
+                    first_with_email.setdefault(found[pending_id][0].lower(), pending_id)
+                results.update({
+                    pending_id: "duplicate_email" for pending_id in waiting
+                    if first_with_email[found[pending_id][0].lower()] != pending_id
+                })
+                taken = set()
+                if first_with_email:
+                    cursor.execute(
+                        f"SELECT email FROM users WHERE email IN ({', '.join(['%s'] * len(first_with_email))})",
+                        [found[pending_id][0] for pending_id in first_with_email.values()]
+                    )
+                    taken = {email.lower() for (email,) in cursor.fetchall()}
+                ids = [pending_id for email, pending_id in first_with_email.items() if email not in taken]
+                results.update({pending_id: "email_taken" for email, pending_id in first_with_email.items() if email in taken})
+
+                def approve(batch):
+                    # One INSERT ... SELECT for the accounts, one UPDATE for the applications;
+                    # on a constraint error neither is kept
+                    id_placeholders = ", ".join(["%s"] * len(batch))
+                    cursor.execute("SAVEPOINT approve_hosts")
+                    try:
+                        cursor.execute(f"""
+                        INSERT INTO users (username, email, password, role, status, nid, phone)
+                        SELECT username, email, password, 'host', 'active', nid, phone
+                        FROM pending_hosts
+                        WHERE id IN ({id_placeholders})
+                        """, batch)
+                        cursor.execute(
+                            f"UPDATE pending_hosts SET admin_id = %s WHERE id IN ({id_placeholders})",
+                            (admin_id, *batch)
+                        )
+                    except mysql.connector.IntegrityError:
+                        cursor.execute("ROLLBACK TO SAVEPOINT approve_hosts")
+                        raise
+
+                if ids:
+                    # 4. All at once; after a constraint error, one at a time to find the culprits
+                    try:
+                        approve(ids)
+                    except mysql.connector.IntegrityError:
+                        approved = []
+                        for pending_id in ids:
+                            try:
+                                approve([pending_id])
+                                approved.append(pending_id)
+                            except mysql.connector.IntegrityError as e:
+                                results[pending_id] = "email_taken" if e.errno == errorcode.ER_DUP_ENTRY else "failed"
+                        ids = approved
+                connection.commit()
+                results.update({pending_id: "approved" for pending_id in ids})
+                if ids:
+                    stats.adjust_user("host", "active", len(ids))
+                    stats.adjust("pending_hosts", "total", -len(ids))
+
+            return {"results": [{"id": pending_id, "result": results[pending_id]} for pending_id in pending_host_ids]}
+
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return await db.run_db(work)
+
+# Page size for GET /api/admin/jobs
+JOBS_PAGE_SIZE = 50
+JOBS_MAX_PAGE_SIZE = 200
+
+@app.get("/api/admin/jobs", dependencies=[Depends(require_admin)])
+async def get_jobs(status: str = None, kind: str = None, limit: int = JOBS_PAGE_SIZE):
+    """
+    Newest background jobs first.
+
+    receive
+    - status: 'queued', 'running', 'succeeded' or 'failed' (optional)
+    - kind: e.g. 'delete_user', 'approve_host' (optional)
+    - limit: at most JOBS_MAX_PAGE_SIZE
+
+    return
+    [ same as get_job ]
+    """
+    if status is not None and status not in ("queued", "running", "succeeded", "failed"):
+        raise HTTPException(status_code=422, detail="Invalid status")
+    limit = max(1, min(limit, JOBS_MAX_PAGE_SIZE))
+
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+            conditions = []
+            params = []
+            if status:
+                conditions.append("status = %s")
+                params.append(status)
+            if kind:
+                conditions.append("kind = %s")
+                params.append(kind)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(f"SELECT {JOB_ROW.select} FROM jobs {where} ORDER BY id DESC LIMIT %s", (*params, limit))
+            return JOB_ROW.rows(cursor)
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
+
+@app.get("/api/admin/jobs/{job_id}", dependencies=[Depends(require_admin)])
+async def get_job(job_id: int):
+    """
+    Status of a background job queued by delete_user or approve_host.
+
+    return
+    {
+        "id": 42,
+        "kind": "delete_user",
+        "status": "succeeded",  # 'queued', 'running', 'succeeded', 'failed'
+        "attempts": 1,
+        "max_attempts": 5,
+        "payload": {"user_id": 7},
+        "result": {"user_id": 7, "interests": 120, "spaces": 3, "reports": 0},
+        "error": null,  # last error; set while a retry is pending
+        "created_at": "2024-01-15T10:30:00.120Z",
+        "started_at": "2024-01-15T10:30:00.135Z",
+        "finished_at": "2024-01-15T10:30:00.410Z",
+        "wait_seconds": 0.015,  # queued until the first attempt started
+        "run_seconds": 0.275  # last attempt
+    }
+    """
+    def work():
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {JOB_ROW.select} FROM jobs WHERE id = %s", (job_id,))
+            job = JOB_ROW.one(cursor)
+            if not job:
+                raise HTTPException(status_code=404, detail="Job not found")
+            return job
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        finally:
+            if 'connection' in locals() and connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    return FastJSONResponse(await db.run_db(work))
+
+@app.get("/api/admin/stats", dependencies=[Depends(require_admin)])
+async def get_admin_stats():
+    """
+    Dashboard counters, served from memory (see stats.py).
+
+    return
+    {
+        "users": {"total": 120, "by_role": {"guest": 90, "host": 30}, "by_status": {"active": 110, "banned": 10}},
+        "reports": {"total": 7},
+        "pending_hosts": {"total": 3},
+        "spaces": {"total": 45, "by_type": {"room": 30, "parking": 15}, "by_availability": {"available": 40, "on_hold": 5}},
+        "interests": {"total": 200, "by_status": {"pending": 20, "accepted": 150, "rejected": 30}},
+        "reconciled_at": "2024-01-15T10:30:00Z"
+    }
+    """
+    # Only hit the database if the startup recount has not finished (or failed)
+    if stats.reconciled_at is None:
+        try:
+            await db.run_db(reconcile_stats)
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return FastJSONResponse(stats.snapshot())
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text format: request latency and response size per route,
+    statement time and row counts per SQL fingerprint, pool wait and connect time.
+    """
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def get_profiles():
+    """
+    Stored request profiles, newest first (see profiling.py).
+
+    return
+    [
+        {
+            "id": "20240115T103000-1a2b3c4d",
+            "method": "GET",
+            "path": "/api/reports",
+            "created": "20240115T103000",
+            "wall_seconds": 0.412,
+            "db_thread_seconds": 0.35,
+            "mysql_connector_seconds": 0.21,
+            "python_seconds": 0.19
+        }
+    ]
+    """
+    return await asyncio.to_thread(profiling.list_profiles)
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, format_: str = Query("prof", alias="format")):
+    """
+    receive
+    - profile_id: the X-Profile-Id header of the profiled response
+    - format: "prof" (pstats file, e.g. for snakeviz), "json" (summary) or "text" (pstats report)
+    """
+    if format_ == "text":
+        report = await asyncio.to_thread(profiling.text_report, profile_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return PlainTextResponse(report)
+    if format_ not in ("prof", "json"):
+        raise HTTPException(status_code=422, detail="format must be prof, json or text")
+
+    path = profiling.profile_path(profile_id, f".{format_}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format_ == "json":
+        return FileResponse(path, media_type="application/json")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+@app.get("/api/admin/cache-stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """
+    return
+    {"backend": "LocalBackend", "entries": 120, "hits": 950, "misses": 50, "hit_ratio": 0.95}
+    """
+    return cache.stats()
 
 
 
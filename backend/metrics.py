@@ -0,0 +1,298 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+# Statements slower than this many seconds are logged to "jirao.slow_query" (0 disables)
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0"))
+
+slow_query_log = logging.getLogger("jirao.slow_query")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+class Gauge:
+    """Value read at scrape time from a callback returning {label_values: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_, read, labels=()):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self._read = read
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self._read().items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "jirao_http_request_duration_seconds", "Time from request start to the last response byte.",
+    labels=("method", "route", "status"),
+)
+RESPONSE_BYTES = Histogram(
+    "jirao_http_response_size_bytes", "Response body size.",
+    labels=("method", "route"), buckets=SIZE_BUCKETS,
+)
+RENDER_SECONDS = Histogram(
+    "jirao_response_render_seconds", "Time spent encoding JSON response bodies.",
+)
+QUERY_SECONDS = Histogram(
+    "jirao_db_query_duration_seconds", "Statement time on the connection: execute plus fetching its rows.",
+    labels=("statement",),
+)
+QUERY_ROWS = Histogram(
+    "jirao_db_query_rows", "Rows fetched (SELECT) or affected (writes) per statement.",
+    labels=("statement",), buckets=ROW_BUCKETS,
+)
+POOL_WAIT_SECONDS = Histogram(
+    "jirao_db_pool_wait_seconds", "Time waiting for a free slot in the connection pool.",
+)
+CONNECT_SECONDS = Histogram(
+    "jirao_db_connect_seconds", "Time to open a new MySQL connection (handshake and auth).",
+)
+KDF_SECONDS = Histogram(
+    "jirao_password_kdf_seconds", "Time to hash or verify a password, including the wait for a KDF thread.",
+    labels=("op",),
+)
+JOB_SECONDS = Histogram(
+    "jirao_job_duration_seconds", "Run time of one background job attempt.",
+    labels=("kind", "status"),
+)
+JOB_WAIT_SECONDS = Histogram(
+    "jirao_job_wait_seconds", "Time from queueing a background job to its first attempt.",
+    labels=("kind",),
+)
+
+# Distinct statement fingerprints kept; later shapes are all counted as "other"
+# so a runaway query builder cannot grow the metrics without bound
+STATEMENT_MAX = int(os.getenv("METRICS_STATEMENT_MAX", "500"))
+# SQL as sent is memoized up to this many strings; beyond that it is re-normalized each time
+STATEMENT_CACHE_MAX = 4 * STATEMENT_MAX
+# Characters of SQL exported in the jirao_db_statement_info label
+STATEMENT_SQL_LABEL_MAX = 200
+OTHER_STATEMENT = "other"
+
+# SQL as sent -> fingerprint, and fingerprint -> normalized SQL for jirao_db_statement_info
+_fingerprints = {}
+_statement_sql = {}
+_WHITESPACE = re.compile(r"\s+")
+# "(%s, %s, %s)" of any length, then runs of them ("VALUES (?+), (?+)")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_PLACEHOLDER_LISTS = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+
+
+def normalize(sql):
+    """Collapse whitespace and placeholder lists, so `IN (%s, %s)` and `IN (%s)` share a fingerprint."""
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _PLACEHOLDER_LIST.sub("(?+)", sql)
+    return _PLACEHOLDER_LISTS.sub("(?+)", sql)
+
+
+def fingerprint(sql):
+    """Short stable id for a statement; the SQL itself is exported once as an info series."""
+    key = _fingerprints.get(sql)
+    if key is None:
+        normalized = normalize(sql)
+        key = hashlib.sha1(normalized.encode()).hexdigest()[:10]
+        if key not in _statement_sql:
+            if len(_statement_sql) >= STATEMENT_MAX:
+                key = OTHER_STATEMENT
+            else:
+                _statement_sql[key] = normalized
+        if len(_fingerprints) < STATEMENT_CACHE_MAX:
+            _fingerprints[sql] = key
+    return key
+
+
+def _sql_label(sql):
+    if len(sql) <= STATEMENT_SQL_LABEL_MAX:
+        return sql
+    return sql[:STATEMENT_SQL_LABEL_MAX - 3] + "..."
+
+
+STATEMENT_INFO = Gauge(
+    "jirao_db_statement_info", "SQL text for each statement fingerprint.",
+    lambda: {(key, _sql_label(sql)): 1 for key, sql in list(_statement_sql.items())},
+    labels=("statement", "sql"),
+)
+
+REGISTRY = [
+    REQUEST_SECONDS, RESPONSE_BYTES, RENDER_SECONDS, QUERY_SECONDS, QUERY_ROWS,
+    POOL_WAIT_SECONDS, CONNECT_SECONDS, KDF_SECONDS, JOB_SECONDS, JOB_WAIT_SECONDS, STATEMENT_INFO,
+]
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def record_query(sql, seconds, rows):
+    key = fingerprint(sql)
+    QUERY_SECONDS.observe(seconds, key)
+    if rows is not None and rows >= 0:
+        QUERY_ROWS.observe(rows, key)
+    if SLOW_QUERY_SECONDS and seconds >= SLOW_QUERY_SECONDS:
+        # Parameters are left out on purpose: they include passwords
+        slow_query_log.warning("%.3fs rows=%s [%s] %s", seconds, rows, key, _statement_sql.get(key) or normalize(sql))
+
+
+class TimedCursor:
+    """
+    Cursor proxy that times each statement. mysql.connector cursors are
+    unbuffered, so a statement's time is its execute() plus every fetch of its
+    rows; it is recorded when the next statement starts or the cursor (or its
+    connection) closes.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = None
+        self._seconds = 0.0
+        self._rows = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def flush(self):
+        if self._sql is not None:
+            # Writes report affected rows; reads the rows actually fetched
+            rows = self._rows if self._cursor.with_rows else self._cursor.rowcount
+            record_query(self._sql, self._seconds, rows)
+            self._sql = None
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._seconds += time.perf_counter() - start
+
+    def execute(self, operation, params=()):
+        self.flush()
+        self._sql, self._seconds, self._rows = operation, 0.0, 0
+        return self._timed(self._cursor.execute, operation, params)
+
+    def executemany(self, operation, seq_params):
+        self.flush()
+        self._sql, self._seconds, self._rows = operation, 0.0, 0
+        return self._timed(self._cursor.executemany, operation, seq_params)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._timed(self._cursor.fetchmany, size)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def close(self):
+        self.flush()
+        return self._cursor.close()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency (to the last body byte, so streamed
+    exports count in full) and response size per route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method, path, str(status))
+            RESPONSE_BYTES.observe(size, method, path)
@@ -0,0 +1,150 @@
+"""
+Forward-only schema migrations.
+
+Migrations are SQL files in backend/migrations named NNNN_description.sql and
+are applied in version order on top of database/JIRAO.sql. Applied versions
+are recorded in the `schema_migrations` table; there are no down migrations,
+so a change is undone by adding a new file.
+
+    cd backend
+    python migrate.py            # apply everything pending
+    python migrate.py status     # list applied and pending versions
+    python migrate.py up --to 3  # apply up to and including version 3
+
+MySQL commits DDL implicitly, so a file that fails halfway leaves its earlier
+statements applied and its version unrecorded. Fix the schema by hand (or
+edit the file) before running again.
+"""
+import argparse
+import re
+from pathlib import Path
+
+import mysql.connector
+from mysql.connector import Error
+
+import db
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def split_statements(sql):
+    """Split a SQL script into statements; a statement ends with ';' at the end of a line."""
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith("--")):
+            continue
+        current.append(line)
+        if stripped.endswith(";"):
+            statement = "\n".join(current).strip().rstrip(";").strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    if "".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path)] sorted by version."""
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE.match(path.name)
+        if not match:
+            raise ValueError(f"Bad migration file name: {path.name}")
+        migrations.append((int(match.group(1)), match.group(2), path))
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration versions")
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS `schema_migrations` (
+      `version` int(11) NOT NULL PRIMARY KEY,
+      `name` varchar(100) NOT NULL,
+      `applied_at` timestamp NOT NULL DEFAULT current_timestamp()
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {version for (version,) in cursor.fetchall()}
+
+
+def pending_migrations(cursor, target=None):
+    applied = applied_versions(cursor)
+    latest = max(applied, default=0)
+    pending = []
+    for version, name, path in load_migrations():
+        if version in applied:
+            continue
+        if version < latest:
+            # Forward-only: never slot an old version in under newer ones
+            raise ValueError(f"Migration {version:04d}_{name} is older than applied version {latest:04d}")
+        if target is not None and version > target:
+            break
+        pending.append((version, name, path))
+    return pending
+
+
+def migrate(connection, target=None, dry_run=False, log=print):
+    """Apply pending migrations up to `target` (all when None); return the versions applied."""
+    cursor = connection.cursor()
+    try:
+        done = []
+        for version, name, path in pending_migrations(cursor, target):
+            log(f"{'would apply' if dry_run else 'applying'} {version:04d}_{name}")
+            if dry_run:
+                continue
+            for statement in split_statements(path.read_text(encoding="utf-8")):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            connection.commit()
+            done.append(version)
+        return done
+    finally:
+        cursor.close()
+
+
+def status(connection, log=print):
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+        connection.commit()
+    finally:
+        cursor.close()
+    for version, name, _ in load_migrations():
+        log(f"{version:04d}_{name}: {'applied' if version in applied else 'pending'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs="?", choices=("up", "status"), default="up")
+    parser.add_argument("--to", type=int, help="highest version to apply")
+    parser.add_argument("--dry-run", action="store_true", help="list what would run without running it")
+    args = parser.parse_args()
+
+    try:
+        connection = mysql.connector.connect(**db.DB_CONFIG)
+    except Error as e:
+        raise SystemExit(f"Database connection failed: {e}")
+    try:
+        if args.command == "status":
+            status(connection)
+        else:
+            done = migrate(connection, target=args.to, dry_run=args.dry_run)
+            if not done and not args.dry_run:
+                print("schema is up to date")
+    except (Error, ValueError) as e:
+        raise SystemExit(f"Migration failed: {e}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
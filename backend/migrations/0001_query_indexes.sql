@@ -0,0 +1,33 @@
+--
+-- Secondary indexes for the predicates main.py runs.
+--
+-- Already covered, so not added here:
+--   users.email = %s AND password = %s (login)  -> UNIQUE KEY `email` returns at most one row
+--   pending_hosts.admin_id IS NULL              -> KEY `fk_pendinghost_admin`
+--
+
+-- interests: `id` and `id_2` duplicate the primary key and only slow down writes
+ALTER TABLE `interests`
+  DROP INDEX `id`,
+  DROP INDEX `id_2`;
+
+-- users: admin_login and register look up by username (register ORs it with email);
+-- get_users_for_reporting and the admin user list filter on role and status;
+-- the admin user list can also sort by date_joined
+ALTER TABLE `users`
+  ADD KEY `idx_users_username` (`username`),
+  ADD KEY `idx_users_role_status` (`role`, `status`),
+  ADD KEY `idx_users_date_joined` (`date_joined`);
+
+-- spaces: the location prefix LIKE fallback, and the listing filters on availability and type
+ALTER TABLE `spaces`
+  ADD KEY `idx_spaces_location` (`location`),
+  ADD KEY `idx_spaces_availability_type` (`availability`, `type`);
+
+-- reports: get_reports orders by timestamp DESC
+ALTER TABLE `reports`
+  ADD KEY `idx_reports_timestamp` (`timestamp`);
+
+-- pending_hosts: register checks username OR email for an existing application
+ALTER TABLE `pending_hosts`
+  ADD KEY `idx_pending_hosts_username` (`username`);
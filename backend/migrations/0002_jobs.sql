@@ -0,0 +1,28 @@
+--
+-- Background jobs (jobs.py): queued by request handlers inside their own
+-- transaction, claimed and run by the in-process job workers.
+--
+-- Times are UTC with millisecond precision so queue wait and run time can be
+-- reported per job.
+--
+
+CREATE TABLE `jobs` (
+  `id` bigint(20) NOT NULL AUTO_INCREMENT,
+  `kind` varchar(50) NOT NULL,
+  `payload` longtext NOT NULL,
+  `status` enum('queued','running','succeeded','failed') NOT NULL DEFAULT 'queued',
+  `attempts` int(11) NOT NULL DEFAULT 0,
+  `max_attempts` int(11) NOT NULL,
+  `run_after` datetime(3) NOT NULL,
+  `locked_by` varchar(100) DEFAULT NULL,
+  `locked_at` datetime(3) DEFAULT NULL,
+  `result` longtext DEFAULT NULL,
+  `error` text DEFAULT NULL,
+  `created_at` datetime(3) NOT NULL,
+  `started_at` datetime(3) DEFAULT NULL,
+  `finished_at` datetime(3) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  -- Workers claim the oldest due job: WHERE status = 'queued' AND run_after <= now ORDER BY id
+  KEY `idx_jobs_status_run_after` (`status`, `run_after`),
+  KEY `idx_jobs_locked_by` (`locked_by`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
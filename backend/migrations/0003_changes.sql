@@ -0,0 +1,22 @@
+--
+-- Change log (changes.py): one row per write to a space, an interest or a
+-- user, appended in the same transaction as the write and served
+-- incrementally by GET /api/changes. `data` holds only the columns that
+-- changed, as JSON.
+--
+-- `user_id` / `owner_id` are the guest and the space owner an interest row
+-- concerns, so non-admin readers only see their own interests.
+-- Rows older than CHANGES_RETENTION_DAYS are pruned in id order.
+--
+
+CREATE TABLE `changes` (
+  `id` bigint(20) NOT NULL AUTO_INCREMENT,
+  `entity` enum('space','interest','user') NOT NULL,
+  `entity_id` int(11) NOT NULL,
+  `op` enum('create','update','delete') NOT NULL,
+  `data` longtext DEFAULT NULL,
+  `user_id` int(11) DEFAULT NULL,
+  `owner_id` int(11) DEFAULT NULL,
+  `created_at` datetime(3) NOT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,9 @@
+--
+-- FULLTEXT keys for space search: MATCH on `location` alone for the
+-- listing's location filter, and on title, location and description
+-- together for GET /api/spaces/search and relevance sorting.
+--
+
+ALTER TABLE `spaces`
+  ADD FULLTEXT KEY `ft_spaces_location` (`location`),
+  ADD FULLTEXT KEY `ft_spaces_search` (`title`,`location`,`description`);
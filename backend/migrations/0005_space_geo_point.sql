@@ -0,0 +1,17 @@
+--
+-- Spatial point for "spaces near me" (x = longitude, y = latitude).
+-- Kept in sync with latitude/longitude by the API; spaces without
+-- coordinates sit at POINT(0 0) and are filtered out by the query.
+-- A SPATIAL key needs a NOT NULL column, so the column is added nullable,
+-- backfilled from the existing coordinates, then tightened.
+--
+
+ALTER TABLE `spaces`
+  ADD COLUMN `geo_point` point DEFAULT NULL;
+
+UPDATE `spaces`
+  SET `geo_point` = POINT(COALESCE(`longitude`, 0), COALESCE(`latitude`, 0));
+
+ALTER TABLE `spaces`
+  MODIFY `geo_point` point NOT NULL,
+  ADD SPATIAL KEY `sp_spaces_geo_point` (`geo_point`);
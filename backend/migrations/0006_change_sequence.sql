@@ -0,0 +1,22 @@
+--
+-- Commit-ordered change ids (changes.py). Writers take their ids from the
+-- single `change_sequence` row as the last statement before COMMIT; the row
+-- lock is held until the commit, so ids become visible strictly in order
+-- and a reader's cursor can never pass a transaction still in flight. A
+-- rollback also rolls the counter back, so there are no gaps.
+--
+-- `created_at` gets a key for pruning by age.
+--
+
+CREATE TABLE `change_sequence` (
+  `id` tinyint(4) NOT NULL,
+  `last_id` bigint(20) NOT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO `change_sequence` (`id`, `last_id`)
+  SELECT 1, COALESCE(MAX(`id`), 0) FROM `changes`;
+
+ALTER TABLE `changes`
+  MODIFY `id` bigint(20) NOT NULL,
+  ADD KEY `idx_changes_created_at` (`created_at`);
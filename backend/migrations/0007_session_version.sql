@@ -0,0 +1,9 @@
+--
+-- Durable session revocation (sessions.py): tokens carry the user's
+-- session_version from when they were issued, and banning, deleting or
+-- signing a user out everywhere bumps it. Checked through the cache, with
+-- this column as the source of truth.
+--
+
+ALTER TABLE `users`
+  ADD COLUMN `session_version` int(11) NOT NULL DEFAULT 0;
@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# scrypt cost (override with environment variables). Memory per hash is
+# 128 * r * 2**PASSWORD_SCRYPT_LOG_N bytes: 16 MiB with the defaults.
+# Size them with bench/bench_passwords.py against the login throughput target.
+PASSWORD_SCRYPT_LOG_N = int(os.getenv("PASSWORD_SCRYPT_LOG_N", "14"))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# Threads hashing concurrently; bounds both CPU and the KDF's memory use.
+# hashlib.scrypt releases the GIL, so threads run in parallel.
+PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", str(min(4, os.cpu_count() or 1))))
+
+PREFIX = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64encode(raw):
+    return base64.b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, log_n, r, p):
+    n = 1 << log_n
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=129 * r * n * p + 1024 * 1024, dklen=KEY_BYTES,
+    )
+
+
+def hash_password_sync(password, log_n=PASSWORD_SCRYPT_LOG_N, r=PASSWORD_SCRYPT_R,
+                       p=PASSWORD_SCRYPT_P, salt=None):
+    """Encode a password as `scrypt$<log2 N>$<r>$<p>$<salt>$<key>`."""
+    salt = salt or secrets.token_bytes(SALT_BYTES)
+    key = _scrypt(password, salt, log_n, r, p)
+    return f"{PREFIX}${log_n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(PREFIX + "$")
+
+
+def verify_password_sync(password, stored):
+    """
+    Check a password against a stored value. Returns (ok, needs_rehash):
+    needs_rehash is set for legacy plaintext rows and hashes made with
+    other parameters than the current ones.
+    """
+    if not is_hashed(stored):
+        # Legacy plaintext row from before hashing
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    try:
+        _, log_n, r, p, salt, key = stored.split("$")
+        log_n, r, p = int(log_n), int(r), int(p)
+        expected = _b64decode(key)
+        actual = _scrypt(password, _b64decode(salt), log_n, r, p)
+    except ValueError:
+        return False, False
+    current = (log_n, r, p) == (PASSWORD_SCRYPT_LOG_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return hmac.compare_digest(actual, expected), not current
+
+
+# Verified when the account does not exist, so a miss costs as much as a hit
+_DUMMY_HASH = None
+
+executor = None
+
+
+def _executor():
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_THREADS, thread_name_prefix="kdf")
+    return executor
+
+
+def shutdown():
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=True)
+        executor = None
+
+
+async def _run(op, fn, *args):
+    # Its own pool: slow hashes must not hold DB threads (or the event loop)
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_executor(), fn, *args)
+    finally:
+        metrics.KDF_SECONDS.observe(time.perf_counter() - start, op)
+
+
+async def hash_password(password):
+    return await _run("hash", hash_password_sync, password)
+
+
+async def verify_password(password, stored):
+    """
+    Async verify_password_sync. `stored` is None when no account matched;
+    a dummy hash is still checked so response time does not reveal it.
+    """
+    global _DUMMY_HASH
+    if stored is None:
+        if _DUMMY_HASH is None:
+            _DUMMY_HASH = await hash_password(secrets.token_urlsafe(16))
+        await _run("verify", verify_password_sync, password, _DUMMY_HASH)
+        return False, False
+    return await _run("verify", verify_password_sync, password, stored)
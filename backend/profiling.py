@@ -0,0 +1,220 @@
+import asyncio
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import secrets
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Profiling is off unless PROFILING_ENABLED=1. When PROFILING_TOKEN is set, a
+# request must also send it in the X-Profile-Token header.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "/tmp/jirao-profiles"))
+# Only the newest PROFILE_KEEP profiles are kept on disk
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOP = 25
+
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+MYSQL_CONNECTOR = f"{os.sep}mysql{os.sep}connector{os.sep}"
+
+# Profile of the request being handled, if it asked for one
+current = contextvars.ContextVar("current_profile", default=None)
+
+# cProfile hooks one profiler per thread, so only one request per process is
+# profiled at a time; others asking meanwhile are served normally
+_busy = threading.Lock()
+
+
+class RequestProfile:
+    """
+    Deterministic profile of one request: the event-loop side (routing, the
+    async handler, response rendering) plus every function the handler sends
+    to the DB thread pool, merged into one pstats file.
+
+    The event-loop profiler also sees other requests the same worker serves
+    concurrently, so profile on a quiet worker or read the DB-thread part.
+    """
+
+    def __init__(self, method, path):
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+        self.method = method
+        self.path = path
+        self._loop_profile = cProfile.Profile()
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+        self._started = None
+        self.wall_seconds = None
+        self.db_thread_seconds = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._loop_profile.enable()
+
+    def stop(self):
+        self._loop_profile.disable()
+        self.wall_seconds = time.perf_counter() - self._started
+
+    def wrap(self, fn):
+        """Profile fn on whichever DB worker thread runs it."""
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows a single active profiler per process
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self.db_thread_seconds += time.perf_counter() - start
+                    self._thread_profiles.append(profile)
+        return profiled
+
+    def stats(self):
+        stats = pstats.Stats(self._loop_profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        return stats
+
+    def summary(self, stats):
+        # Own time split between the MySQL driver and everything else. Socket
+        # reads and other builtins the driver calls directly count as driver time.
+        connector = python = 0.0
+        for (filename, _, _), (_, _, tottime, _, callers) in stats.stats.items():
+            if MYSQL_CONNECTOR in filename:
+                connector += tottime
+                continue
+            from_driver = sum(
+                caller_stats[2] for (caller_file, _, _), caller_stats in callers.items()
+                if MYSQL_CONNECTOR in caller_file
+            )
+            connector += from_driver
+            python += tottime - from_driver
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "created": self.id.split("-")[0],
+            "wall_seconds": round(self.wall_seconds, 6),
+            "db_thread_seconds": round(self.db_thread_seconds, 6),
+            "mysql_connector_seconds": round(connector, 6),
+            "python_seconds": round(python, 6),
+            "top_cumulative": [
+                {
+                    "function": f"{os.path.basename(filename)}:{line}({name})",
+                    "calls": calls,
+                    "own_seconds": round(tottime, 6),
+                    "cumulative_seconds": round(cumtime, 6),
+                }
+                for (filename, line, name), (_, calls, tottime, cumtime, _) in top
+            ],
+        }
+
+    def save(self):
+        """Write <id>.prof (pstats, e.g. for snakeviz) and <id>.json, then prune old ones."""
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stats = self.stats()
+        stats.dump_stats(PROFILE_DIR / f"{self.id}.prof")
+        summary = self.summary(stats)
+        (PROFILE_DIR / f"{self.id}.json").write_text(json.dumps(summary, indent=2))
+        prune()
+        return summary
+
+
+def requested(headers, query_string):
+    """True when the request asks for a profile and config allows it."""
+    if not PROFILING_ENABLED:
+        return False
+    wants = headers.get(b"x-profile") == b"1" or b"profile=1" in query_string.split(b"&")
+    if not wants:
+        return False
+    if PROFILING_TOKEN:
+        token = headers.get(b"x-profile-token", b"").decode("latin-1")
+        return secrets.compare_digest(token, PROFILING_TOKEN)
+    return True
+
+
+def prune(keep=PROFILE_KEEP):
+    profiles = sorted(PROFILE_DIR.glob("*.prof"))
+    for path in profiles[:max(len(profiles) - keep, 0)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+
+
+def profile_path(profile_id, suffix):
+    """Path of a stored profile file, or None if the id is malformed or unknown."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+def list_profiles():
+    summaries = []
+    for path in sorted(PROFILE_DIR.glob("*.json"), reverse=True):
+        summary = json.loads(path.read_text())
+        summary.pop("top_cumulative", None)
+        summaries.append(summary)
+    return summaries
+
+
+def text_report(profile_id, sort="cumulative", limit=60):
+    path = profile_path(profile_id, ".prof")
+    if path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request sent with `X-Profile: 1` (or `?profile=1`). The response
+    carries `X-Profile-Id`; fetch the result from /api/admin/profiles/{id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not requested(dict(scope["headers"]), scope["query_string"]):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+            current.reset(token)
+            try:
+                # Stats aggregation and two file writes; keep them off the event loop
+                await asyncio.to_thread(profile.save)
+            finally:
+                _busy.release()
@@ -0,0 +1,159 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Rate limiter configuration (override with environment variables)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")  # 'local' or 'redis'
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+RATE_LIMIT_PREFIX = "jirao:rl:"
+
+
+class Rule:
+    """Token bucket: `burst` requests at once, refilled at `count` per `seconds`."""
+
+    def __init__(self, count, seconds, burst=None):
+        self.rate = count / seconds
+        self.burst = burst or count
+
+    @classmethod
+    def parse(cls, text):
+        # "5/60" or "5/60:10" (count/seconds[:burst])
+        spec, _, burst = text.partition(":")
+        count, _, seconds = spec.partition("/")
+        return cls(int(count), float(seconds), int(burst) if burst else None)
+
+
+def _rule(name, default):
+    value = os.getenv(f"RATE_LIMIT_{name.upper()}")
+    return Rule.parse(value or default)
+
+
+# Per route: one bucket per client IP and one per identifier (email/username)
+# Override with e.g. RATE_LIMIT_LOGIN_IP=30/60 or RATE_LIMIT_LOGIN_ID=5/300:5
+RATE_LIMITS = {
+    "login": {"ip": _rule("login_ip", "20/60"), "id": _rule("login_id", "5/60")},
+    "admin_login": {"ip": _rule("admin_login_ip", "10/60"), "id": _rule("admin_login_id", "5/300")},
+    "register": {"ip": _rule("register_ip", "10/600"), "id": _rule("register_id", "3/600")},
+}
+
+
+class LocalBucketStore:
+    """
+    Token buckets in process memory; the least recently used keys are
+    dropped past `max_keys` (a dropped bucket simply starts full again).
+    Each uvicorn worker limits on its own, so the effective limit is
+    multiplied by the worker count; use the redis store to share buckets.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rule, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rule.burst, now))
+            tokens = min(rule.burst, tokens + (now - updated) * rule.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class RedisBucketStore:
+    """Token buckets shared by every worker; each take is one atomic Lua call."""
+
+    blocking = True
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url=RATE_LIMIT_REDIS_URL):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.SCRIPT)
+
+    def take(self, key, rule, now):
+        allowed, tokens = self._take(keys=[RATE_LIMIT_PREFIX + key], args=[rule.rate, rule.burst, now])
+        return bool(allowed), float(tokens)
+
+
+class RateLimiter:
+    """Checks a request against its route's IP and identifier buckets."""
+
+    def __init__(self, store, limits=RATE_LIMITS, enabled=RATE_LIMIT_ENABLED):
+        self.store = store
+        self.limits = limits
+        self.enabled = enabled
+
+    async def _take(self, key, rule):
+        now = time.time()
+        if self.store.blocking:
+            return await asyncio.to_thread(self.store.take, key, rule, now)
+        return self.store.take(key, rule, now)
+
+    async def check(self, route, ip, identifier=None):
+        """
+        Take one token from each bucket of `route`. Returns None when the
+        request may proceed, otherwise the seconds until it may retry.
+        The identifier bucket is only charged once the IP bucket allows it.
+        """
+        if not self.enabled or route not in self.limits:
+            return None
+        buckets = [("ip", ip)]
+        if identifier:
+            buckets.append(("id", str(identifier).strip().lower()))
+        for kind, value in buckets:
+            rule = self.limits[route][kind]
+            allowed, tokens = await self._take(f"{route}:{kind}:{value}", rule)
+            if not allowed:
+                return max(1, math.ceil((1 - tokens) / rule.rate))
+        return None
+
+
+def client_ip(scope_client, headers):
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return scope_client.host if scope_client else "unknown"
+
+
+def _make_store():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisBucketStore()
+    return LocalBucketStore()
+
+
+limiter = RateLimiter(_make_store())
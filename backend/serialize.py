@@ -0,0 +1,74 @@
+import time
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import Response
+
+from metrics import RENDER_SECONDS
+
+# Naive DATETIME/TIMESTAMP values are UTC and rendered as "2024-01-15T10:30:00Z"
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def _default(value):
+    # DECIMAL columns (rate_per_hour) come back from mysql.connector as Decimal
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content):
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response encoded by orjson in one pass. Handlers that return it skip
+    FastAPI's jsonable_encoder walk over every row.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content):
+        start = time.perf_counter()
+        body = dumps(content)
+        RENDER_SECONDS.observe(time.perf_counter() - start)
+        return body
+
+
+class RowSchema:
+    """
+    Fixed column layout for a query read with a plain (tuple) cursor.
+
+    `columns` is a sequence of (name, sql_expression) pairs. `select` renders
+    them for the SELECT list in the same order, and rows() zips each tuple
+    straight onto the names. Columns listed in `json_columns` hold JSON text
+    and are decoded; everything else is passed to the encoder as the driver
+    returned it.
+    """
+
+    def __init__(self, *columns, json_columns=()):
+        self.names = tuple(name for name, _ in columns)
+        self.select = ", ".join(f"{expr} AS {name}" for name, expr in columns)
+        self._json_columns = tuple(self.names.index(name) for name in json_columns)
+
+    def row(self, values):
+        if self._json_columns:
+            values = list(values)
+            for index in self._json_columns:
+                if values[index]:
+                    try:
+                        values[index] = orjson.loads(values[index])
+                    except orjson.JSONDecodeError:
+                        values[index] = None
+        return dict(zip(self.names, values))
+
+    def rows(self, cursor):
+        names = self.names
+        if not self._json_columns:
+            return [dict(zip(names, values)) for values in cursor.fetchall()]
+        return [self.row(values) for values in cursor.fetchall()]
+
+    def one(self, cursor):
+        values = cursor.fetchone()
+        return None if values is None else self.row(values)
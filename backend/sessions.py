@@ -0,0 +1,166 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+import db
+from cache import cache
+
+# Signing key for session tokens. Set it in production: without it every
+# worker makes up its own key and tokens die on restart.
+SESSION_SECRET = os.getenv("SESSION_SECRET") or secrets.token_urlsafe(32)
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "100000"))
+# Seconds a user's session_version is served from the cache. Bounds how late a
+# worker that did not do the revoking notices it (local cache backend only)
+SESSION_CHECK_TTL = float(os.getenv("SESSION_CHECK_TTL", "30"))
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class Session:
+    __slots__ = ("id", "user_id", "role", "status", "expires_at", "version")
+
+    def __init__(self, id, user_id, role, status, expires_at, version):
+        self.id = id
+        self.user_id = user_id
+        self.role = role
+        self.status = status
+        self.expires_at = expires_at
+        self.version = version
+
+
+class SessionStore:
+    """
+    Signed-token sessions with an in-process cache.
+
+    A token is `<payload>.<signature>`: the base64 JSON claims (session id,
+    user id, role, status, expiry, session version) and their HMAC-SHA256.
+
+    Revocation works per user and is stored in the database: revoke_in()
+    bumps `users.session_version` in the caller's transaction, and tokens
+    carrying an older version (or a deleted user's) stop working. Each check
+    compares against the version read through the cache (cache.py), so a
+    valid token costs an HMAC and a cache hit; a miss, a restart or an
+    evicted entry only means one query, never a forgotten revocation.
+    """
+
+    def __init__(self, secret=SESSION_SECRET, ttl=SESSION_TTL, max_entries=SESSION_CACHE_SIZE):
+        self._key = secret.encode()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    @staticmethod
+    def _version_key(user_id):
+        return f"session_version:{user_id}"
+
+    @staticmethod
+    def _load_version(user_id):
+        # None when the user was deleted
+        with db.init_pool().get() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT session_version FROM users WHERE id = %s", (user_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            return row[0] if row else None
+
+    async def _current_version(self, user_id):
+        return await cache.read_through(
+            self._version_key(user_id), lambda: db.run_db(self._load_version, user_id), ttl=SESSION_CHECK_TTL
+        )
+
+    async def issue(self, user, version):
+        """Start a session for a user row (id, role, status) at its session_version and return its token."""
+        session = Session(
+            secrets.token_urlsafe(16), user["id"], user["role"], user["status"],
+            time.time() + self.ttl, version,
+        )
+        payload = _b64encode(orjson.dumps({
+            "sid": session.id, "uid": session.user_id, "role": session.role,
+            "status": session.status, "exp": session.expires_at, "ver": session.version,
+        }))
+        token = f"{payload}.{self._sign(payload)}"
+        self._remember(token, session)
+        return token
+
+    def _decode(self, token):
+        payload, _, signature = token.partition(".")
+        if not payload or not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            claims = orjson.loads(_b64decode(payload))
+            return Session(claims["sid"], claims["uid"], claims["role"], claims["status"],
+                           claims["exp"], claims["ver"])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _remember(self, token, session):
+        with self._lock:
+            self._sessions[token] = session
+            self._sessions.move_to_end(token)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+    def _forget(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    async def authenticate(self, token):
+        """Return the Session for a valid, unexpired, unrevoked token, else None."""
+        # Keyed by the whole token, so a hit is a token whose signature was already checked
+        with self._lock:
+            session = self._sessions.get(token)
+        if session is None:
+            # Issued by another worker or before a restart
+            session = self._decode(token)
+            if session is None:
+                return None
+            self._remember(token, session)
+
+        if session.expires_at < time.time():
+            self._forget(token)
+            return None
+        if session.version != await self._current_version(session.user_id):
+            self._forget(token)
+            return None
+        return session
+
+    @staticmethod
+    def revoke_in(cursor, user_ids):
+        """Bump the users' session_version in the caller's transaction; call revoke_user() for each after the commit."""
+        if user_ids:
+            cursor.execute(
+                f"UPDATE users SET session_version = session_version + 1 WHERE id IN ({', '.join(['%s'] * len(user_ids))})",
+                tuple(user_ids)
+            )
+
+    def revoke_user(self, user_id):
+        """
+        After revoke_in() committed (or the user row was deleted): drop the
+        cached version and this worker's sessions of the user. Safe to call
+        from DB threads.
+        """
+        cache.invalidate(self._version_key(user_id))
+        with self._lock:
+            for token in [token for token, session in self._sessions.items() if session.user_id == user_id]:
+                del self._sessions[token]
+
+
+sessions = SessionStore()
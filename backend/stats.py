@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from mysql.connector import Error
+
+import db
+
+# Seconds between full recounts against the base tables
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "300"))
+
+logger = logging.getLogger("jirao.stats")
+
+# Counter group -> grouped query that recomputes it from scratch.
+# Admin accounts are not counted as users.
+RECOUNT_QUERIES = {
+    "users_by_role": "SELECT role, COUNT(*) FROM users WHERE role != 'admin' GROUP BY role",
+    "users_by_status": "SELECT status, COUNT(*) FROM users WHERE role != 'admin' GROUP BY status",
+    "reports": "SELECT 'total', COUNT(*) FROM reports",
+    "pending_hosts": "SELECT 'total', COUNT(*) FROM pending_hosts WHERE admin_id IS NULL",
+    "spaces_by_type": "SELECT type, COUNT(*) FROM spaces GROUP BY type",
+    "spaces_by_availability": "SELECT availability, COUNT(*) FROM spaces GROUP BY availability",
+    "interests_by_status": "SELECT status, COUNT(*) FROM interests GROUP BY status",
+}
+
+
+class Stats:
+    """
+    In-memory counters behind the admin dashboard.
+
+    Write handlers adjust the counters right after their commit, so reads are
+    a dict copy instead of table scans. reconcile() recounts everything from
+    the base tables; it runs at startup and every STATS_RECONCILE_INTERVAL
+    seconds, which corrects drift from writes made by other worker processes
+    or straight against the database.
+    """
+
+    def __init__(self):
+        self._counts = {group: {} for group in RECOUNT_QUERIES}
+        self._lock = threading.Lock()
+        self.reconciled_at = None
+        self.last_drift = {}
+
+    def adjust(self, group, key, delta=1):
+        with self._lock:
+            counts = self._counts[group]
+            counts[key] = counts.get(key, 0) + delta
+
+    def move(self, group, old, new):
+        """Move one row from bucket `old` to bucket `new` (e.g. a status change)."""
+        if old == new:
+            return
+        with self._lock:
+            counts = self._counts[group]
+            counts[old] = counts.get(old, 0) - 1
+            counts[new] = counts.get(new, 0) + 1
+
+    def adjust_user(self, role, status, delta=1):
+        if role == "admin":
+            return
+        self.adjust("users_by_role", role, delta)
+        self.adjust("users_by_status", status, delta)
+
+    def snapshot(self):
+        with self._lock:
+            counts = {group: dict(values) for group, values in self._counts.items()}
+        return {
+            "users": {
+                "total": sum(counts["users_by_role"].values()),
+                "by_role": counts["users_by_role"],
+                "by_status": counts["users_by_status"],
+            },
+            "reports": {"total": counts["reports"].get("total", 0)},
+            "pending_hosts": {"total": counts["pending_hosts"].get("total", 0)},
+            "spaces": {
+                "total": sum(counts["spaces_by_type"].values()),
+                "by_type": counts["spaces_by_type"],
+                "by_availability": counts["spaces_by_availability"],
+            },
+            "interests": {
+                "total": sum(counts["interests_by_status"].values()),
+                "by_status": counts["interests_by_status"],
+            },
+            "reconciled_at": self.reconciled_at,
+        }
+
+    def reconcile(self, connection):
+        """
+        Recount every group from the base tables and replace the counters.
+        Returns the corrections that were needed ({group: {key: delta}}).
+
+        A write that commits while the recount runs can be missed or counted
+        twice; the next reconcile picks it up.
+        """
+        fresh = {}
+        cursor = connection.cursor()
+        try:
+            for group, query in RECOUNT_QUERIES.items():
+                cursor.execute(query)
+                fresh[group] = {key: count for key, count in cursor.fetchall() if count}
+        finally:
+            cursor.close()
+
+        with self._lock:
+            drift = {}
+            for group, counts in fresh.items():
+                old = self._counts[group]
+                changed = {
+                    key: counts.get(key, 0) - old.get(key, 0)
+                    for key in set(counts) | set(old)
+                    if counts.get(key, 0) != old.get(key, 0)
+                }
+                if changed:
+                    drift[group] = changed
+            self._counts = fresh
+            self.reconciled_at = datetime.now(timezone.utc).replace(tzinfo=None)
+            self.last_drift = drift
+        return drift
+
+
+stats = Stats()
+
+
+def reconcile_stats():
+    """Recount the statistics on a pooled connection (blocking; run it through db.run_db)."""
+    with db.init_pool().get() as connection:
+        drift = stats.reconcile(connection)
+    if drift:
+        logger.info("Admin stats reconciled with corrections: %s", drift)
+    return drift
+
+
+async def reconcile_forever(interval=STATS_RECONCILE_INTERVAL):
+    """Background task: reconcile now, then every `interval` seconds."""
+    while True:
+        try:
+            await db.run_db(reconcile_stats)
+        except Error as e:
+            logger.warning("Admin stats reconciliation failed: %s", e)
+        except Exception:
+            logger.exception("Admin stats reconciliation failed")
+        await asyncio.sleep(interval)
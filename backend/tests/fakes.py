@@ -0,0 +1,85 @@
+"""Scripted stand-ins for mysql.connector connections, for handler tests without a server."""
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.database.statements.append((sql, tuple(params)))
+        rows = self.database.respond(sql, tuple(params))
+        self._rows = list(rows or [])
+        self.rowcount = len(self._rows) if rows is not None else self.database.rowcount
+        self.lastrowid = self.database.lastrowid
+
+    def executemany(self, sql, seq_params):
+        # One statement, as mysql.connector sends a batched INSERT; respond() gets the list
+        sql = " ".join(sql.split())
+        seq_params = [tuple(params) for params in seq_params]
+        self.database.statements.append((sql, seq_params))
+        self.database.respond(sql, seq_params)
+        self._rows = []
+        self.rowcount = len(seq_params)
+        self.lastrowid = self.database.lastrowid
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """
+    One connection whose statements are answered by `respond(sql, params)`:
+    return a list of rows for a result set, or None (and set `rowcount` /
+    `lastrowid`) for a write; raise to simulate a server error. SQL arrives
+    with its whitespace collapsed; executemany() passes its parameter tuples
+    as one list. Every statement is kept in `statements`.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.statements = []
+        self.rowcount = 1
+        self.lastrowid = None
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def executed(self, fragment):
+        """The statements containing `fragment`."""
+        return [(sql, params) for sql, params in self.statements if fragment in sql]
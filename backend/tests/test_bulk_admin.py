@@ -0,0 +1,115 @@
+"""Per-id results of the bulk moderation endpoints."""
+import mysql.connector
+import pytest
+from fastapi.testclient import TestClient
+from mysql.connector import errorcode
+
+import main
+from fakes import FakeDatabase
+
+
+@pytest.fixture
+def api(monkeypatch):
+    main.app.dependency_overrides[main.require_admin] = lambda: None
+    monkeypatch.setattr(main.sessions, "revoke_user", lambda user_id: None)
+    monkeypatch.setattr(main.stats, "adjust", lambda *args: None)
+    monkeypatch.setattr(main.stats, "adjust_user", lambda *args: None)
+    monkeypatch.setattr(main.stats, "move", lambda *args: None)
+
+    def connect(respond):
+        database = FakeDatabase(respond)
+        monkeypatch.setattr(main, "get_db_connection", lambda: database)
+        return database
+
+    yield TestClient(main.app), connect
+    main.app.dependency_overrides.clear()
+
+
+def results(response):
+    assert response.status_code == 200, response.text
+    return {row["id"]: row["result"] for row in response.json()["results"]}
+
+
+def test_ban_reports_each_id(api):
+    client, connect = api
+
+    def respond(sql, params):
+        if sql.startswith("SELECT id, role, status FROM users"):
+            return [(1, "guest", "active"), (3, "host", "active")]
+
+    database = connect(respond)
+    response = client.post("/api/admin/users/bulk", json={"action": "ban", "user_ids": [1, 2, 3, 1]})
+    assert results(response) == {1: "banned", 2: "not_found", 3: "banned"}
+    (_, params), = database.executed("UPDATE users SET status")
+    assert params == ("banned", 1, 3)
+
+
+@pytest.mark.parametrize("body", [
+    {"action": "ban", "user_ids": []},
+    {"action": "ban", "user_ids": ["x"]},
+    {"action": "ban", "user_ids": list(range(main.ADMIN_BULK_LIMIT + 1))},
+    {"action": "explode", "user_ids": [1]},
+])
+def test_invalid_bulk_requests(api, body):
+    client, _ = api
+    assert client.post("/api/admin/users/bulk", json=body).status_code == 400
+
+
+def pending(rows, taken=(), refuse=()):
+    """respond() for the approve flow: `rows` of pending_hosts, `taken` emails in users,
+    `refuse` maps a pending id to the IntegrityError errno its INSERT raises."""
+    def respond(sql, params):
+        if sql.startswith("SELECT id, email, admin_id FROM pending_hosts"):
+            return [row for row in rows if row[0] in params]
+        if sql.startswith("SELECT email FROM users"):
+            return [(email,) for email in taken if email.lower() in {p.lower() for p in params}]
+        if sql.startswith("INSERT INTO users"):
+            for pending_id in params:
+                if pending_id in refuse:
+                    raise mysql.connector.IntegrityError(errno=refuse[pending_id], msg="refused")
+    return respond
+
+
+def approve(client, ids):
+    return client.post("/api/admin/pending-hosts/bulk",
+                       json={"action": "approve", "pending_host_ids": ids, "admin_id": 1})
+
+
+def test_approve_sorts_out_each_application(api):
+    client, connect = api
+    connect(pending(
+        [(3, "new@example.com", None), (4, "done@example.com", 1), (5, "Taken@example.com", None)],
+        taken=["taken@example.com"],
+    ))
+    assert results(approve(client, [3, 4, 5, 6])) == {
+        3: "approved", 4: "already_approved", 5: "email_taken", 6: "not_found",
+    }
+
+
+def test_approve_dedupes_emails_within_the_batch(api):
+    client, connect = api
+    database = connect(pending([(3, "Same@example.com", None), (4, "same@example.com", None)]))
+    assert results(approve(client, [3, 4])) == {3: "approved", 4: "duplicate_email"}
+    (_, params), = database.executed("INSERT INTO users")
+    assert params == (3,)
+
+
+def test_approve_constraint_error_is_reported_per_id(api):
+    # An account took one email between the check and the insert; another row breaks a foreign key
+    client, connect = api
+    database = connect(pending(
+        [(3, "a@example.com", None), (4, "b@example.com", None), (5, "c@example.com", None)],
+        refuse={4: errorcode.ER_DUP_ENTRY, 5: errorcode.ER_NO_REFERENCED_ROW_2},
+    ))
+    assert results(approve(client, [3, 4, 5])) == {3: "approved", 4: "email_taken", 5: "failed"}
+    assert len(database.executed("ROLLBACK TO SAVEPOINT")) == 3  # the batch, then ids 4 and 5
+    assert database.commits == 1
+
+
+def test_reject_deletes_what_exists(api):
+    client, connect = api
+    database = connect(pending([(3, "a@example.com", None)]))
+    response = client.post("/api/admin/pending-hosts/bulk", json={"action": "reject", "pending_host_ids": [3, 9]})
+    assert results(response) == {3: "rejected", 9: "not_found"}
+    (_, params), = database.executed("DELETE FROM pending_hosts")
+    assert params == (3,)
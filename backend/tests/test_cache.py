@@ -0,0 +1,92 @@
+"""Read-through cache on the local backend."""
+import asyncio
+from datetime import datetime
+
+from cache import MISSING, Cache, LocalBackend
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def loader(value, calls):
+    async def load():
+        calls.append(value)
+        return value
+    return load
+
+
+def test_miss_then_hit():
+    cache = Cache(LocalBackend())
+    calls = []
+    assert run(cache.read_through("space:1", loader({"id": 1}, calls))) == {"id": 1}
+    assert run(cache.read_through("space:1", loader({"id": 2}, calls))) == {"id": 1}
+    assert calls == [{"id": 1}]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_forces_a_reload():
+    cache = Cache(LocalBackend())
+    run(cache.read_through("space:1", loader("old", [])))
+    cache.invalidate("space:1")
+    assert run(cache.read_through("space:1", loader("new", []))) == "new"
+
+
+def test_invalidation_during_a_load_is_not_overwritten():
+    async def scenario():
+        cache = Cache(LocalBackend())
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_load():
+            # Read the row, then lose the race against a write and its invalidation
+            started.set()
+            await release.wait()
+            return "before write"
+
+        fill = asyncio.create_task(cache.read_through("space:1", slow_load))
+        await started.wait()
+        cache.invalidate("space:1")
+        release.set()
+        assert await fill == "before write"
+        return await cache.read_through("space:1", loader("after write", []))
+
+    assert run(scenario()) == "after write"
+
+
+def test_generation_bump_changes_listing_keys():
+    cache = Cache(LocalBackend())
+    before = run(cache.generation("spaces"))
+    cache.bump("spaces")
+    assert run(cache.generation("spaces")) == before + 1
+
+
+def test_hits_are_private_copies():
+    cache = Cache(LocalBackend())
+    run(cache.read_through("host_spaces:1", loader([{"id": 1, "title": "Room"}], [])))
+    first = run(cache.read_through("host_spaces:1", loader(None, [])))
+    first[0]["title"] = "changed by a caller"
+    first.append({"id": 2})
+    assert run(cache.read_through("host_spaces:1", loader(None, []))) == [{"id": 1, "title": "Room"}]
+
+
+def test_hits_match_the_redis_encoding():
+    cache = Cache(LocalBackend())
+    run(cache.read_through("space:1", loader({"updated_at": datetime(2024, 1, 15, 10, 30)}, [])))
+    assert run(cache.read_through("space:1", loader(None, []))) == {"updated_at": "2024-01-15T10:30:00Z"}
+
+
+def test_lru_eviction():
+    backend = LocalBackend(max_entries=2)
+    for key in ("a", "b", "c"):
+        backend.set(key, key, 60)
+    assert len(backend) == 2
+    assert backend.get("a") is MISSING
+    assert backend.get("c") == "c"
+
+
+def test_expired_entries_are_misses():
+    cache = Cache(LocalBackend(), ttl=-1)
+    calls = []
+    run(cache.read_through("space:1", loader(1, calls)))
+    run(cache.read_through("space:1", loader(1, calls)))
+    assert len(calls) == 2
@@ -0,0 +1,171 @@
+"""Change log: commit-ordered ids, cursor paging, folding and pruning."""
+import random
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import changes
+from fakes import FakeDatabase
+
+
+class ChangeLog:
+    """respond() serving an in-memory `changes` table to changes.read()."""
+
+    def __init__(self):
+        self.rows = []  # (id, entity, entity_id, op, data, created_at, user_id, owner_id)
+
+    def add(self, entity, entity_id, op="update", data='{"title": "x"}', user_id=None, owner_id=None):
+        change_id = len(self.rows) + 1 if not self.rows else self.rows[-1][0] + 1
+        self.rows.append((change_id, entity, entity_id, op, data, datetime(2024, 1, 1), user_id, owner_id))
+        return change_id
+
+    def __call__(self, sql, params):
+        ids = [row[0] for row in self.rows]
+        if sql == "SELECT MIN(id) FROM changes":
+            return [(min(ids, default=None),)]
+        if sql == "SELECT MAX(id) FROM changes":
+            return [(max(ids, default=None),)]
+        assert sql.startswith("SELECT id, entity, entity_id, op, data, created_at FROM changes")
+        since, top, *rest, limit = params
+        viewer = rest[-1] if "user_id = %s" in sql else None
+        entities = rest[:-2] if viewer is not None else rest
+        matching = [
+            row[:6] for row in self.rows
+            if since < row[0] <= top and row[1] in entities
+            and (viewer is None or row[1] == "space" or viewer in (row[6], row[7]))
+        ]
+        return matching[:limit]
+
+
+def read_all(log, since, limit, **kwargs):
+    """Follow `more` to the end; returns (ids, cursors)."""
+    database = FakeDatabase(log)
+    cursor = database.cursor()
+    ids, cursors = [], []
+    while True:
+        rows, since, more = changes.read(cursor, since, limit, **kwargs)
+        ids += [row[0] for row in rows]
+        cursors.append(since)
+        if not more:
+            return ids, cursors
+
+
+def test_record_many_takes_a_block_of_sequence_ids():
+    def respond(sql, params):
+        if sql.startswith("UPDATE change_sequence"):
+            assert params == (2,)
+            database.lastrowid = 42
+
+    database = FakeDatabase(respond)
+    changes.record_many(database.cursor(), [
+        ("space", 1, "create", {"title": "Room"}, None, None),
+        ("interest", 5, "delete", None, 3, 4),
+    ])
+    (sql, rows), = database.executed("INSERT INTO changes")
+    assert [(row[0], row[1], row[4]) for row in rows] == [(41, "space", '{"title":"Room"}'), (42, "interest", None)]
+
+
+def test_record_many_without_the_sequence_row_fails():
+    database = FakeDatabase(lambda sql, params: None)
+    database.rowcount = 0
+    with pytest.raises(changes.Error):
+        changes.record(database.cursor(), "space", 1, "delete")
+    assert not database.executed("INSERT INTO changes")
+
+
+def test_nothing_recorded_for_no_rows():
+    database = FakeDatabase(lambda sql, params: None)
+    changes.record_many(database.cursor(), [])
+    assert database.statements == []
+
+
+def test_cursor_is_monotonic_and_loses_nothing():
+    rng = random.Random(7)
+    log = ChangeLog()
+    cursor, seen = 0, []
+    for _ in range(20):
+        # Writers commit more changes between polls
+        for _ in range(rng.randint(0, 30)):
+            log.add(rng.choice(changes.ENTITIES), rng.randint(1, 50))
+        ids, cursors = read_all(log, cursor, limit=rng.randint(1, 8))
+        assert cursors == sorted(cursors) and cursors[0] >= cursor
+        cursor = cursors[-1]
+        seen += ids
+    assert seen == [row[0] for row in log.rows]
+    assert cursor == log.rows[-1][0]
+
+
+def test_cursor_advances_past_rows_the_viewer_cannot_see():
+    log = ChangeLog()
+    log.add("interest", 1, user_id=5, owner_id=6)
+    log.add("interest", 2, user_id=7, owner_id=8)
+    log.add("space", 3)
+    log.add("user", 9, op="delete", data=None)
+    ids, cursors = read_all(log, 0, limit=10, viewer_id=5)
+    assert ids == [1, 3]
+    assert cursors[-1] == 4
+    ids, _ = read_all(log, 0, limit=10, viewer_id=8)
+    assert ids == [2, 3]
+
+
+def test_entity_filter():
+    log = ChangeLog()
+    log.add("interest", 1)
+    log.add("space", 3)
+    ids, _ = read_all(log, 0, limit=10, entities=("space",))
+    assert ids == [2]
+
+
+def test_pruned_cursor_expires():
+    log = ChangeLog()
+    for i in range(5):
+        log.add("space", i)
+    del log.rows[:3]  # pruned; the oldest kept id is 4
+    database = FakeDatabase(log)
+    assert read_all(log, 3, limit=10)[0] == [4, 5]
+    with pytest.raises(changes.CursorExpired):
+        changes.read(database.cursor(), 2, 10)
+
+
+def test_empty_log():
+    assert changes.read(FakeDatabase(ChangeLog()).cursor(), 0, 10) == ([], 0, False)
+
+
+def test_compact_folds_changes_per_entity():
+    at = datetime(2024, 1, 1)
+    rows = [
+        (1, "space", 1, "create", '{"title": "Room", "rate_per_hour": 50}', at),
+        (2, "space", 1, "update", '{"rate_per_hour": 80}', at),
+        (3, "interest", 4, "create", '{"status": "pending"}', at),
+        (4, "interest", 4, "delete", None, at),
+        (5, "space", 2, "update", '{"availability": "on_hold"}', at),
+        (6, "space", 2, "delete", None, at),
+    ]
+    assert changes.compact(rows) == [
+        {"entity": "space", "id": 1, "op": "create", "at": at, "data": {"title": "Room", "rate_per_hour": 80}},
+        {"entity": "space", "id": 2, "op": "delete", "at": at},
+    ]
+
+
+def test_diff_compares_decimals_as_floats():
+    assert changes.diff({"rate_per_hour": Decimal("50.00"), "title": "a"}, {"rate_per_hour": 50.0, "title": "b"}) == \
+        {"title": "b"}
+
+
+def test_prune_keeps_the_newest_row_and_deletes_in_batches(monkeypatch):
+    monkeypatch.setattr(changes, "CHANGES_PRUNE_BATCH", 2)
+    deleted = iter([2, 2, 1])
+
+    def respond(sql, params):
+        if sql.startswith("SELECT id FROM changes WHERE created_at"):
+            return []  # everything is past the retention
+        if sql == "SELECT MAX(id) FROM changes":
+            return [(6,)]
+        if sql.startswith("DELETE FROM changes"):
+            assert params == (6, 2)
+            database.rowcount = next(deleted)
+
+    database = FakeDatabase(respond)
+    assert changes.prune(database) == 5
+    assert len(database.executed("DELETE FROM changes")) == 3
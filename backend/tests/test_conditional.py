@@ -0,0 +1,43 @@
+"""ETag / Last-Modified validators on the space reads."""
+from datetime import datetime
+
+from starlette.requests import Request
+
+import main
+
+
+def request(**headers):
+    return Request({
+        "type": "http", "method": "GET", "path": "/api/spaces",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def page(title="Room", next_cursor=None):
+    space = {"id": 1, "title": title, "updated_at": datetime(2026, 1, 1, 12, 0, 0)}
+    return {"spaces": [space], "next_cursor": next_cursor}
+
+
+def etag(body):
+    return main.conditional_response(request(), body, body["spaces"]).headers["etag"]
+
+
+def test_matching_etag_gets_304():
+    tag = etag(page())
+    response = main.conditional_response(request(if_none_match=tag), page(), page()["spaces"])
+    assert response.status_code == 304
+    assert response.headers["etag"] == tag
+
+
+def test_updates_within_the_same_second_change_the_etag():
+    assert etag(page("Room")) != etag(page("Bigger room"))
+
+
+def test_next_cursor_is_part_of_the_etag():
+    assert etag(page(next_cursor=None)) != etag(page(next_cursor=1))
+
+
+def test_stale_etag_gets_the_body():
+    response = main.conditional_response(request(if_none_match=etag(page("Room"))), page("New"), page("New")["spaces"])
+    assert response.status_code == 200
+    assert b'"New"' in response.body
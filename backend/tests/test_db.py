@@ -0,0 +1,127 @@
+"""ConnectionPool and PooledConnection against stand-in connections (no MySQL needed)."""
+import gc
+import warnings
+
+import pytest
+
+import db
+
+
+class FakeConnection:
+    def __init__(self):
+        self.in_transaction = False
+        self.rolled_back = 0
+        self.closed = False
+
+    def rollback(self):
+        self.rolled_back += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor()
+
+    def ping(self, reconnect=False):
+        pass
+
+
+class FakeCursor:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    connections = []
+
+    def connect(**config):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(db.mysql.connector, "connect", connect)
+    return connections
+
+
+def free_slots(pool):
+    return pool._slots._value
+
+
+def test_close_returns_the_slot_and_reuses_the_connection(opened):
+    pool = db.ConnectionPool(size=1, timeout=0.1)
+    first = pool.get()
+    first.close()
+    first.close()  # idempotent
+    second = pool.get()
+    second.close()
+    assert len(opened) == 1
+    assert free_slots(pool) == 1
+
+
+def test_context_manager_releases_on_error(opened):
+    pool = db.ConnectionPool(size=1, timeout=0.1)
+    with pytest.raises(RuntimeError):
+        with pool.get():
+            raise RuntimeError("handler failed")
+    assert free_slots(pool) == 1
+
+
+def test_exhausted_pool_times_out(opened):
+    pool = db.ConnectionPool(size=2, timeout=0.05)
+    held = [pool.get(), pool.get()]
+    with pytest.raises(db.PoolTimeout):
+        pool.get()
+    held[0].close()
+    with pool.get():
+        pass
+    held[1].close()
+    assert free_slots(pool) == 2
+
+
+def test_release_rolls_back_an_open_transaction(opened):
+    pool = db.ConnectionPool(size=1, timeout=0.1)
+    with pool.get():
+        opened[0].in_transaction = True
+    assert opened[0].rolled_back == 1
+
+
+def test_use_after_close_is_an_error(opened):
+    pool = db.ConnectionPool(size=1, timeout=0.1)
+    connection = pool.get()
+    connection.close()
+    assert not connection.is_connected()
+    with pytest.raises(db.Error):
+        connection.cursor()
+
+
+def test_forgotten_connection_is_returned_when_collected(opened):
+    pool = db.ConnectionPool(size=1, timeout=0.1)
+    connection = pool.get()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        del connection
+        gc.collect()
+    assert any(issubclass(w.category, ResourceWarning) for w in caught)
+    assert free_slots(pool) == 1
+
+
+def test_failed_connect_gives_the_slot_back(monkeypatch):
+    def connect(**config):
+        raise db.Error("server down")
+
+    monkeypatch.setattr(db.mysql.connector, "connect", connect)
+    pool = db.ConnectionPool(size=1, timeout=0.1)
+    with pytest.raises(db.Error):
+        pool.get()
+    assert free_slots(pool) == 1
+
+
+def test_closed_pool_discards_released_connections(opened):
+    pool = db.ConnectionPool(size=1, timeout=0.1)
+    connection = pool.get()
+    pool.close()
+    connection.close()
+    assert opened[0].closed
+    with pytest.raises(db.Error):
+        pool.get()
@@ -0,0 +1,67 @@
+"""delete_user_job: every deleted row, including the cascaded ones, reaches the change log."""
+import pytest
+
+import main
+from fakes import FakeDatabase
+
+INTERESTS = "SELECT id, status, user_id, space_id FROM interests"
+
+
+class Account:
+    """respond() for deleting host 1; `batches` answers the scripted SELECTs in order."""
+
+    def __init__(self, **batches):
+        self.batches = {key: list(value) for key, value in batches.items()}
+        self.database = None
+
+    def next(self, name):
+        return self.batches[name].pop(0) if self.batches.get(name) else []
+
+    def __call__(self, sql, params):
+        if sql.startswith(INTERESTS):
+            return self.next("interests")
+        if sql.startswith("SELECT id, owner_id FROM spaces"):
+            return [(space_id, 1) for space_id in params]
+        if sql.startswith("SELECT id, type, availability FROM spaces"):
+            return self.next("spaces")
+        if sql.startswith("SELECT id, status, user_id FROM interests WHERE space_id IN"):
+            return self.next("space_interests")
+        if sql.startswith("SELECT role, status FROM users"):
+            return [("host", "active")]
+        if sql.startswith("SELECT COUNT(*) FROM pending_hosts"):
+            return [(0,)]
+        self.database.rowcount = 0 if sql.startswith("DELETE FROM reports") else 1
+        if sql.startswith("UPDATE change_sequence"):
+            self.database.lastrowid = 100
+        return None
+
+
+@pytest.fixture
+def run_job(monkeypatch):
+    for name in ("adjust", "adjust_user", "move"):
+        monkeypatch.setattr(main.stats, name, lambda *args: None)
+    monkeypatch.setattr(main.sessions, "revoke_user", lambda user_id: None)
+
+    def run_job(account):
+        account.database = FakeDatabase(account)
+        result = main.delete_user_job(account.database, {"user_id": 1})
+        logged = [(entity, entity_id, op) for _, entity, entity_id, op, *_ in
+                  (row for _, rows in account.database.executed("INSERT INTO changes") for row in rows)]
+        return result, logged
+
+    return run_job
+
+
+def test_interests_added_to_a_space_before_its_batch_are_logged(run_job):
+    result, logged = run_job(Account(spaces=[[(5, "room", "available")]], space_interests=[[(9, "pending", 3)]]))
+    assert ("interest", 9, "delete") in logged
+    assert ("space", 5, "delete") in logged
+    assert (result["interests"], result["spaces"]) == (1, 1)
+
+
+def test_rows_the_user_delete_cascades_are_logged(run_job):
+    # Steps 1-2 find nothing; a space and an interest appear before the user row is locked
+    account = Account(interests=[[], [(9, "pending", 3, 5)]], spaces=[[], [(5, "room", "available")]])
+    result, logged = run_job(account)
+    assert logged == [("interest", 9, "delete"), ("space", 5, "delete"), ("user", 1, "delete")]
+    assert (result["interests"], result["spaces"]) == (1, 1)
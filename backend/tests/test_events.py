@@ -0,0 +1,134 @@
+"""Event hub and the Server-Sent Events stream body (local backend)."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+import events
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = events.Hub(events.LocalBackend(), queue_size=3)
+    monkeypatch.setattr(events, "hub", hub)
+    return hub
+
+
+async def still_valid():
+    return True
+
+
+async def next_event(body):
+    return await asyncio.wait_for(body.__anext__(), 1)
+
+
+def test_published_event_reaches_subscribers_of_its_topics(hub):
+    async def scenario():
+        guest, host, other = (hub.subscribe([f"user:{i}"]) for i in (1, 2, 3))
+        # Published from a DB worker thread, right after a commit
+        thread = threading.Thread(target=hub.publish, args=(("user:1", "user:2"), "interest.created", {"id": 5}))
+        thread.start()
+        thread.join()
+        received = [await asyncio.wait_for(s.queue.get(), 1) for s in (guest, host)]
+        await asyncio.sleep(0)
+        return received, other.queue.empty()
+
+    received, other_empty = asyncio.run(scenario())
+    for type_, data in received:
+        assert type_ == b"interest.created"
+        assert json.loads(data) == {"type": "interest.created", "data": {"id": 5}}
+    assert other_empty
+
+
+def test_overflow_replaces_the_backlog_with_resync(hub):
+    async def scenario():
+        subscription = hub.subscribe(["user:1"])
+        for i in range(5):
+            hub.publish(("user:1",), "interest.updated", {"id": i})
+        await asyncio.sleep(0.01)
+        items = []
+        while not subscription.queue.empty():
+            items.append(subscription.queue.get_nowait())
+        return items
+
+    items = asyncio.run(scenario())
+    assert items[0] is events.RESYNC
+    # Events after the overflow still follow the marker
+    assert all(item is not events.RESYNC for item in items[1:])
+
+
+def test_stream_sends_ready_events_and_unsubscribes(hub):
+    async def scenario():
+        body = events.stream(["user:1"], still_valid, keepalive=5)
+        first = await next_event(body)
+        assert hub.streams() == 1
+        hub.publish(("user:1",), "interest.cancelled", {"id": 9})
+        second = await next_event(body)
+        await body.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert b"event: ready" in first
+    assert second.startswith(b"event: interest.cancelled\ndata: ")
+    assert hub.streams() == 0
+
+
+def test_stream_keepalive_and_revocation(hub):
+    checks = []
+
+    async def revoked_after_one():
+        checks.append(1)
+        return len(checks) < 2
+
+    async def scenario():
+        body = events.stream(["user:1"], revoked_after_one, keepalive=0.01)
+        chunks = [chunk async for chunk in body]
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert chunks[1:] == [b": keepalive\n\n"]
+    assert hub.streams() == 0
+
+
+def test_revoked_session_gets_no_further_events(hub):
+    valid = [True]
+
+    async def check():
+        return valid[0]
+
+    async def scenario():
+        body = events.stream(["user:1"], check, keepalive=5)
+        await next_event(body)
+        hub.publish(("user:1",), "interest.created", {"id": 1})
+        delivered = await next_event(body)
+        valid[0] = False
+        hub.publish(("user:1",), "interest.created", {"id": 2})
+        return delivered, [chunk async for chunk in body]
+
+    delivered, rest = asyncio.run(scenario())
+    assert delivered.startswith(b"event: interest.created")
+    assert rest == []
+    assert hub.streams() == 0
+
+
+def test_stream_ends_after_resync(hub):
+    async def scenario():
+        body = events.stream(["user:1"], still_valid, keepalive=5)
+        await next_event(body)
+        for i in range(5):
+            hub.publish(("user:1",), "interest.updated", {"id": i})
+        await asyncio.sleep(0.01)
+        return [chunk async for chunk in body]
+
+    chunks = asyncio.run(scenario())
+    assert chunks == [b"event: resync\ndata: {}\n\n"]
+    assert hub.streams() == 0
+
+
+def test_publish_failures_do_not_raise(hub):
+    def broken(message):
+        raise ConnectionError("redis down")
+
+    hub.backend.publish = broken
+    hub.publish(("user:1",), "interest.created", {})
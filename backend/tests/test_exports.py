@@ -0,0 +1,66 @@
+"""NDJSON exports hand their connection back however the stream ends."""
+import asyncio
+
+import pytest
+
+import main
+from fakes import FakeDatabase
+from serialize import RowSchema
+
+ROW = RowSchema(("id", "id"), ("username", "username"))
+
+
+@pytest.fixture
+def database(monkeypatch):
+    rows = [(i, f"user{i}") for i in range(5)]
+    database = FakeDatabase(lambda sql, params: rows)
+    monkeypatch.setattr(main, "get_db_connection", lambda: database)
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 2)
+    return database
+
+
+async def serve(response, disconnect):
+    sent = []
+
+    async def receive():
+        if not disconnect:
+            await asyncio.Event().wait()  # the client stays until the body is done
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await response({"type": "http"}, receive, send)
+    return b"".join(message.get("body", b"") for message in sent)
+
+
+def test_full_export(database):
+    async def scenario():
+        response = await main.ndjson_response("SELECT id, username FROM users", (), ROW, "users.ndjson")
+        return await serve(response, disconnect=False)
+
+    body = asyncio.run(scenario())
+    assert body.splitlines()[0] == b'{"id":0,"username":"user0"}'
+    assert len(body.splitlines()) == 5
+    assert database.closed
+
+
+def test_client_gone_before_the_first_chunk(database):
+    async def scenario():
+        response = await main.ndjson_response("SELECT id, username FROM users", (), ROW, "users.ndjson")
+        await serve(response, disconnect=True)
+
+    asyncio.run(scenario())
+    assert database.closed
+
+
+def test_query_error_is_a_500_and_releases(monkeypatch):
+    def respond(sql, params):
+        raise main.Error("Unknown column")
+
+    database = FakeDatabase(respond)
+    monkeypatch.setattr(main, "get_db_connection", lambda: database)
+    with pytest.raises(main.HTTPException) as raised:
+        asyncio.run(main.ndjson_response("SELECT nope FROM users", (), ROW, "users.ndjson"))
+    assert raised.value.status_code == 500
+    assert database.closed
@@ -0,0 +1,143 @@
+"""Background job claims, lease recovery and retry outcomes."""
+import asyncio
+
+import pytest
+
+import jobs
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.connection.statements.append((" ".join(sql.split()), params))
+        self.rowcount = self.connection.rowcounts.pop(0) if self.connection.rowcounts else 0
+
+    def fetchone(self):
+        return self.connection.rows.pop(0)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rowcounts=(), rows=()):
+        self.rowcounts, self.rows = list(rowcounts), list(rows)
+        self.statements = []
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed += 1
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    connection = FakeConnection()
+
+    class Pool:
+        def get(self):
+            return connection
+
+    monkeypatch.setattr(jobs.db, "init_pool", Pool)
+    # Lease recovery is throttled; make every test start with it due
+    monkeypatch.setattr(jobs, "_last_recovery", float("-inf"))
+    return connection
+
+
+def test_claim_with_nothing_due(connection):
+    connection.rowcounts = [0, 0, 0]  # lease recovery (fail, requeue), claim
+    assert jobs._claim("worker-1") is None
+    fail, requeue, claim = connection.statements
+    assert fail[0].startswith("UPDATE jobs SET status = 'failed'")
+    assert requeue[0].startswith("UPDATE jobs SET status = 'queued'")
+    assert "WHERE status = 'queued' AND run_after <= UTC_TIMESTAMP(3)" in claim[0]
+
+
+def test_claim_reads_back_by_its_own_token(connection):
+    connection.rowcounts = [0, 0, 1, 1]
+    connection.rows = [(7, "delete_user", '{"user_id": 3}', 1, 5, 0.25)]
+    job = jobs._claim("worker-1")
+    (_, (update_token,)), (_, (select_token,)) = connection.statements[2:]
+    assert update_token == select_token
+    assert update_token.startswith("worker-1:")
+    assert job == (7, "delete_user", '{"user_id": 3}', 1, 5, 0.25, update_token)
+    assert connection.closed == 2
+
+
+def test_lost_lease_recovery_is_throttled(connection):
+    jobs._recover_lost()
+    jobs._recover_lost()
+    assert len(connection.statements) == 2
+    assert all(params == (int(jobs.JOB_LEASE_SECONDS),) for _, params in connection.statements)
+
+
+def test_lost_lease_on_the_last_attempt_fails_the_job(connection):
+    jobs._recover_lost()
+    fail, requeue = (sql for sql, _ in connection.statements)
+    # Failed first, so the requeue no longer sees those jobs as running
+    assert "SET status = 'failed'" in fail and "AND attempts >= max_attempts" in fail
+    assert "SET status = 'queued'" in requeue
+
+
+def test_enqueue_rejects_unknown_kinds():
+    with pytest.raises(ValueError):
+        jobs.enqueue(None, "no_such_kind", {})
+
+
+@pytest.fixture
+def outcome(monkeypatch):
+    finished = []
+
+    async def run_db(fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(jobs.db, "run_db", run_db)
+    monkeypatch.setattr(jobs, "_finish", lambda *args: finished.append(args))
+    return finished
+
+
+def execute(monkeypatch, handler, attempts=1, max_attempts=3):
+    monkeypatch.setattr(jobs, "_run", lambda kind, payload: handler(payload))
+    asyncio.run(jobs._execute((9, "test", '{"n": 1}', attempts, max_attempts, 0.1, "w:token")))
+
+
+def test_success_records_the_result(monkeypatch, outcome):
+    execute(monkeypatch, lambda payload: {"done": payload["n"]})
+    assert outcome == [(9, "w:token", "succeeded", '{"done":1}', None, 0)]
+
+
+def test_errors_are_retried_with_backoff(monkeypatch, outcome):
+    def broken(payload):
+        raise RuntimeError("deadlock")
+
+    execute(monkeypatch, broken, attempts=2)
+    (_, _, status, result, error, retry_in), = outcome
+    assert (status, result, error) == ("queued", None, "RuntimeError: deadlock")
+    assert retry_in == jobs.JOB_RETRY_DELAY * 2
+
+
+def test_last_attempt_fails_the_job(monkeypatch, outcome):
+    def broken(payload):
+        raise RuntimeError("deadlock")
+
+    execute(monkeypatch, broken, attempts=3, max_attempts=3)
+    assert outcome[0][2] == "failed"
+
+
+def test_job_failed_is_not_retried(monkeypatch, outcome):
+    def gone(payload):
+        raise jobs.JobFailed("user not found")
+
+    execute(monkeypatch, gone, attempts=1)
+    assert outcome[0][2:5] == ("failed", None, "user not found")
@@ -0,0 +1,54 @@
+"""Statement fingerprints and the Prometheus text they end up in."""
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_statements(monkeypatch):
+    monkeypatch.setattr(metrics, "_fingerprints", {})
+    monkeypatch.setattr(metrics, "_statement_sql", {})
+
+
+def test_whitespace_does_not_change_the_fingerprint():
+    assert metrics.fingerprint("SELECT id\n  FROM users WHERE id = %s") == \
+        metrics.fingerprint("SELECT id FROM users WHERE id = %s")
+
+
+def test_placeholder_lists_share_a_fingerprint():
+    keys = {
+        metrics.fingerprint(f"SELECT id FROM spaces WHERE id IN ({', '.join(['%s'] * n)})")
+        for n in (1, 2, 50)
+    }
+    assert len(keys) == 1
+    assert metrics.normalize("SELECT id FROM spaces WHERE id IN (%s, %s)") == \
+        "SELECT id FROM spaces WHERE id IN (?+)"
+
+
+def test_multi_row_values_share_a_fingerprint():
+    one = "INSERT INTO changes (entity, op) VALUES (%s, %s)"
+    three = "INSERT INTO changes (entity, op) VALUES (%s, %s), (%s, %s), (%s,%s)"
+    assert metrics.fingerprint(one) == metrics.fingerprint(three)
+
+
+def test_distinct_statements_are_capped(monkeypatch):
+    monkeypatch.setattr(metrics, "STATEMENT_MAX", 3)
+    keys = [metrics.fingerprint(f"SELECT {i} FROM users") for i in range(10)]
+    assert len(set(keys[:3])) == 3
+    assert set(keys[3:]) == {metrics.OTHER_STATEMENT}
+    assert len(metrics._statement_sql) == 3
+
+
+def test_statement_info_label_is_truncated():
+    sql = "SELECT " + ", ".join(f"column_{i}" for i in range(100)) + " FROM users"
+    key = metrics.fingerprint(sql)
+    line = next(line for line in metrics.STATEMENT_INFO.render() if key in line)
+    label = line.split('sql="', 1)[1].split('"', 1)[0]
+    assert len(label) == metrics.STATEMENT_SQL_LABEL_MAX
+    assert label.endswith("...")
+
+
+def test_record_query_labels_by_fingerprint():
+    metrics.record_query("SELECT id FROM interests WHERE id IN (%s, %s, %s)", 0.002, 3)
+    key = metrics.fingerprint("SELECT id FROM interests WHERE id IN (%s)")
+    assert f'jirao_db_query_rows_count{{statement="{key}"}}' in metrics.render()
@@ -0,0 +1,73 @@
+"""Token-bucket rate limiting on the local store."""
+import asyncio
+
+import pytest
+
+import ratelimit
+from ratelimit import LocalBucketStore, RateLimiter, Rule
+
+
+def limiter(**routes):
+    return RateLimiter(LocalBucketStore(), limits=routes, enabled=True)
+
+
+def check(limiter, route, ip, identifier=None):
+    return asyncio.run(limiter.check(route, ip, identifier))
+
+
+def test_rule_parse():
+    rule = Rule.parse("5/60:10")
+    assert (rule.rate, rule.burst) == (5 / 60, 10)
+    assert Rule.parse("3/600").burst == 3
+
+
+def test_burst_then_retry_after():
+    rl = limiter(login={"ip": Rule(3, 60), "id": Rule(100, 60)})
+    assert [check(rl, "login", "1.2.3.4") for _ in range(3)] == [None, None, None]
+    assert check(rl, "login", "1.2.3.4") == 20  # one token per 20 s
+    assert check(rl, "login", "5.6.7.8") is None
+
+
+def test_bucket_refills_over_time():
+    store, rule = LocalBucketStore(), Rule(1, 10)
+    assert store.take("k", rule, now=0)[0]
+    assert not store.take("k", rule, now=5)[0]
+    assert store.take("k", rule, now=16)[0]
+
+
+def test_identifier_is_limited_across_ips_and_normalized():
+    rl = limiter(login={"ip": Rule(100, 60), "id": Rule(2, 60)})
+    assert check(rl, "login", "1.1.1.1", "Guest@Example.com") is None
+    assert check(rl, "login", "2.2.2.2", " guest@example.com") is None
+    assert check(rl, "login", "3.3.3.3", "GUEST@example.com") is not None
+
+
+def test_identifier_not_charged_when_the_ip_is_blocked():
+    rl = limiter(login={"ip": Rule(1, 60), "id": Rule(1, 60)})
+    assert check(rl, "login", "1.1.1.1", "someone") is None
+    assert check(rl, "login", "1.1.1.1", "victim") is not None
+    # The blocked attempt did not use up the identifier's bucket
+    assert check(rl, "login", "2.2.2.2", "victim") is None
+
+
+def test_disabled_and_unknown_routes_pass():
+    rl = RateLimiter(LocalBucketStore(), limits={"login": {"ip": Rule(1, 60)}}, enabled=False)
+    assert check(rl, "login", "1.1.1.1") is None
+    assert check(rl, "login", "1.1.1.1") is None
+    assert check(limiter(), "other", "1.1.1.1") is None
+
+
+def test_least_recently_used_buckets_are_dropped():
+    store = LocalBucketStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.take(key, Rule(1, 60), now=0)
+    assert list(store._buckets) == ["b", "c"]
+
+
+@pytest.mark.parametrize("trust, expected", [(False, "10.0.0.1"), (True, "203.0.113.9")])
+def test_client_ip(monkeypatch, trust, expected):
+    class Client:
+        host = "10.0.0.1"
+
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", trust)
+    assert ratelimit.client_ip(Client(), {"x-forwarded-for": "203.0.113.9, 10.0.0.1"}) == expected
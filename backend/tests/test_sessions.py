@@ -0,0 +1,113 @@
+"""Signed-token sessions: issue, verify, expire and revoke."""
+import asyncio
+
+import pytest
+
+import sessions
+from cache import Cache, LocalBackend
+from sessions import SessionStore
+from fakes import FakeDatabase
+
+USER = {"id": 41, "role": "host", "status": "active"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def versions(monkeypatch):
+    """users.session_version by id, served by a fake database behind a fresh cache."""
+    versions = {41: 0, 42: 0, 43: 0}
+
+    def respond(sql, params):
+        assert sql == "SELECT session_version FROM users WHERE id = %s"
+        return [(versions[params[0]],)] if params[0] in versions else []
+
+    class Pool:
+        def get(self):
+            return FakeDatabase(respond)
+
+    async def run_db(fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(sessions.db, "init_pool", Pool)
+    monkeypatch.setattr(sessions.db, "run_db", run_db)
+    monkeypatch.setattr(sessions, "cache", Cache(LocalBackend()))
+    return versions
+
+
+def revoke(store, versions, user_id):
+    """What a ban does: commit the version bump, then revoke_user()."""
+    versions[user_id] += 1
+    store.revoke_user(user_id)
+
+
+def test_issued_token_authenticates():
+    store = SessionStore(secret="test")
+    token = run(store.issue(USER, 0))
+    session = run(store.authenticate(token))
+    assert (session.user_id, session.role, session.status) == (41, "host", "active")
+
+
+def test_token_from_another_worker_authenticates():
+    token = run(SessionStore(secret="test").issue(USER, 0))
+    assert run(SessionStore(secret="test").authenticate(token)).user_id == 41
+
+
+def test_tampered_or_foreign_tokens_are_rejected():
+    token = run(SessionStore(secret="test").issue(USER, 0))
+    payload, _, signature = token.partition(".")
+    assert run(SessionStore(secret="other").authenticate(token)) is None
+    assert run(SessionStore(secret="test").authenticate(payload[:-2] + "xx." + signature)) is None
+    assert run(SessionStore(secret="test").authenticate("garbage")) is None
+
+
+def test_expired_token_is_rejected():
+    store = SessionStore(secret="test", ttl=-1)
+    assert run(store.authenticate(run(store.issue(USER, 0)))) is None
+
+
+def test_revoke_ends_every_session_of_the_user_everywhere(versions):
+    store, other_worker = SessionStore(secret="test"), SessionStore(secret="test")
+    tokens = [run(store.issue(USER, 0)) for _ in range(2)]
+    bystander = run(store.issue({**USER, "id": 42}, 0))
+    assert run(other_worker.authenticate(tokens[0])) is not None
+
+    revoke(store, versions, 41)
+    for token in tokens:
+        assert run(store.authenticate(token)) is None
+        assert run(other_worker.authenticate(token)) is None
+    assert run(store.authenticate(bystander)) is not None
+
+
+def test_revocation_survives_a_restart_with_an_empty_cache(versions, monkeypatch):
+    token = run(SessionStore(secret="test").issue(USER, 0))
+    versions[41] += 1
+    monkeypatch.setattr(sessions, "cache", Cache(LocalBackend()))
+    assert run(SessionStore(secret="test").authenticate(token)) is None
+
+
+def test_deleted_users_tokens_are_rejected(versions):
+    store = SessionStore(secret="test")
+    token = run(store.issue(USER, 0))
+    del versions[41]
+    store.revoke_user(41)
+    assert run(store.authenticate(token)) is None
+
+
+def test_tokens_issued_after_a_revocation_work(versions):
+    store = SessionStore(secret="test")
+    revoke(store, versions, 43)
+    token = run(store.issue({**USER, "id": 43}, versions[43]))
+    assert run(store.authenticate(token)).user_id == 43
+
+
+def test_revoke_in_bumps_the_version_in_the_callers_transaction():
+    database = FakeDatabase(lambda sql, params: None)
+    SessionStore.revoke_in(database.cursor(), [41, 42])
+    SessionStore.revoke_in(database.cursor(), [])
+    assert database.statements == [
+        ("UPDATE users SET session_version = session_version + 1 WHERE id IN (%s, %s)", (41, 42)),
+    ]
+    assert database.commits == 0
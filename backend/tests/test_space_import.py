@@ -0,0 +1,159 @@
+"""POST /api/spaces/bulk: parsing, validation and per-row outcomes."""
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from mysql.connector import Error
+
+import main
+from fakes import FakeDatabase
+
+ROOM = {"type": "room", "title": "Room", "location": "Dhanmondi, Dhaka",
+        "rate_per_hour": 100, "description": "Quiet room"}
+PARKING = {**ROOM, "type": "parking", "title": "Garage", "dimensions": {"length": 18, "width": 9, "height": 7}}
+
+
+def test_parse_json_ndjson_and_csv():
+    body = json.dumps([ROOM]).encode()
+    assert main.parse_space_rows(body, "application/json") == [ROOM]
+    assert main.parse_space_rows(json.dumps({"spaces": [ROOM]}).encode(), "application/json") == [ROOM]
+    ndjson = (json.dumps(ROOM) + "\n\n{broken\n").encode()
+    assert main.parse_space_rows(ndjson, "application/x-ndjson") == [ROOM, None]
+    csv = b"type,title,location,rate_per_hour,description,length,width,height\n" \
+          b"parking,Garage,Mirpur,50,Covered,18,9,\n"
+    row, = main.parse_space_rows(csv, "text/csv")
+    assert row["dimensions"] == {"length": "18", "width": "9"}
+
+
+def test_body_that_is_not_utf8_is_rejected():
+    for content_type in ("text/csv", "application/x-ndjson", "application/json"):
+        with pytest.raises(main.HTTPException) as raised:
+            main.parse_space_rows(b'{"title": "Caf\xe9"}', content_type)
+        assert raised.value.status_code == 400
+
+
+def test_validate_row():
+    space, errors = main.validate_space_row({**PARKING, "dimensions": {"length": "18", "width": 9.0}})
+    assert errors == []
+    assert space["dimensions"] == {"length": 18, "width": 9}
+    assert space["availability"] == "available"
+
+    _, errors = main.validate_space_row({"type": "boat", "rate_per_hour": "abc", "latitude": 91})
+    assert "type must be 'room' or 'parking'" in errors
+    assert "title is required" in errors
+    assert any(error.startswith("rate_per_hour") for error in errors)
+    assert any(error.startswith("latitude and longitude") for error in errors)
+
+
+def test_update_rows_may_leave_out_type_and_availability():
+    space, errors = main.validate_space_row({**ROOM, "id": "12", "type": None, "availability": None})
+    assert errors == []
+    assert space["id"] == 12
+    assert "type" not in space and "availability" not in space
+
+
+class Spaces:
+    """respond() for the import: owner 1 exists and owns `owned` {id: type}."""
+
+    def __init__(self, owned=None, lock_mode=1, fail_insert=False):
+        self.owned = owned or {}
+        self.lock_mode = lock_mode
+        self.fail_insert = fail_insert
+        self.next_id = 100
+        self.database = None
+
+    def __call__(self, sql, params):
+        if sql.startswith("SELECT id FROM users"):
+            return [(1,)]
+        if sql == "SELECT @@innodb_autoinc_lock_mode":
+            return [(self.lock_mode,)]
+        if sql.startswith("SELECT id, type, availability"):
+            # Stored as ROOM, with the column types mysql.connector returns
+            return [(space_id, self.owned[space_id], "available", None, None, ROOM["title"], ROOM["location"],
+                     ROOM["description"], Decimal("100.00"), None)
+                    for space_id in params[1:] if space_id in self.owned]
+        if sql.startswith("INSERT INTO spaces (owner_id"):
+            if self.fail_insert:
+                raise Error("Lock wait timeout exceeded")
+            count = len(params) if isinstance(params, list) else 1
+            self.database.lastrowid = self.next_id + 1
+            self.next_id += count
+        if sql.startswith("UPDATE change_sequence"):
+            self.database.lastrowid = 1000
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(main.stats, "adjust", lambda *args: None)
+    monkeypatch.setattr(main.stats, "move", lambda *args: None)
+
+    def connect(spaces):
+        spaces.database = FakeDatabase(spaces)
+        monkeypatch.setattr(main, "get_db_connection", lambda: spaces.database)
+        return spaces.database
+
+    return TestClient(main.app), connect
+
+
+def post(client, rows):
+    response = client.post("/api/spaces/bulk", params={"owner_id": 1}, json=rows)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("lock_mode, inserts", [(1, 1), (2, 3)])
+def test_created_ids_follow_the_rows(api, lock_mode, inserts):
+    client, connect = api
+    database = connect(Spaces(lock_mode=lock_mode))
+    result = post(client, [ROOM, PARKING, ROOM])
+    assert [(row["result"], row["id"]) for row in result["rows"]] == \
+        [("created", 101), ("created", 102), ("created", 103)]
+    # Interleaved autoinc mode: no assumption about consecutive ids, one INSERT per row
+    assert len(database.executed("INSERT INTO spaces (owner_id")) == inserts
+    (_, change_rows), = database.executed("INSERT INTO changes")
+    assert [row[2] for row in change_rows] == [101, 102, 103]
+
+
+def test_update_outcomes(api):
+    client, connect = api
+    database = connect(Spaces(owned={7: "room", 8: "room"}))
+    result = post(client, [
+        {**ROOM, "id": 7},
+        {**PARKING, "id": 8},
+        {**ROOM, "id": 9},
+        {**ROOM, "id": 7, "title": "again"},
+        {"title": ""},
+    ])
+    rows = result["rows"]
+    assert (result["created"], result["updated"], result["failed"]) == (0, 1, 4)
+    assert rows[0] == {"row": 0, "result": "updated", "id": 7}
+    assert rows[1]["result"] == "invalid" and rows[1]["errors"][0].startswith("type cannot be changed")
+    assert rows[2] == {"row": 2, "result": "not_found", "id": 9}
+    assert rows[3]["errors"] == ["Space updated more than once in this request"]
+    assert rows[4]["result"] == "invalid"
+    (_, upserted), = database.executed("ON DUPLICATE KEY UPDATE")
+    assert [row[0] for row in upserted] == [7]
+
+
+def test_update_change_rows_hold_only_changed_columns(api):
+    client, connect = api
+    database = connect(Spaces(owned={7: "room"}))
+    post(client, [{**ROOM, "id": 7, "title": "Bigger room"}])
+    (_, change_rows), = database.executed("INSERT INTO changes")
+    assert json.loads(change_rows[0][4]) == {"title": "Bigger room"}
+
+
+def test_failed_chunk_is_rolled_back_and_reported(api):
+    client, connect = api
+    database = connect(Spaces(fail_insert=True))
+    result = post(client, [ROOM, ROOM])
+    assert [row["result"] for row in result["rows"]] == ["failed", "failed"]
+    assert database.rollbacks == 1 and database.commits == 0
+
+
+def test_limits(api):
+    client, _ = api
+    assert client.post("/api/spaces/bulk", params={"owner_id": 1}, json=[]).status_code == 400
+    too_many = [ROOM] * (main.SPACE_IMPORT_LIMIT + 1)
+    assert client.post("/api/spaces/bulk", params={"owner_id": 1}, json=too_many).status_code == 400
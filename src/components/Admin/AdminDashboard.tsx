@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../../contexts/AuthContext';
 import { api } from '../../services/api';
-import { User, Report, PendingHost } from '../../types';
+import { AdminStats, Report, PendingHost } from '../../types';
 import { Users, Shield, AlertTriangle, UserCheck, BarChart3, LogOut } from 'lucide-react';
 import UserManagement from './UserManagement';
 import ReportsManagement from './ReportsManagement';
@@ -10,7 +10,7 @@ import HostApproval from './HostApproval';
 const AdminDashboard: React.FC = () => {
   const { logout } = useAuth();
   const [currentTab, setCurrentTab] = useState('users');
-  const [users, setUsers] = useState<User[]>([]);
+  const [stats, setStats] = useState<AdminStats | null>(null);
   const [reports, setReports] = useState<Report[]>([]);
   const [pendingHosts, setPendingHosts] = useState<PendingHost[]>([]);
   const [loading, setLoading] = useState(true);
@@ -18,13 +18,13 @@ const AdminDashboard: React.FC = () => {
   const loadData = async () => {
     setLoading(true);
     try {
-      const [usersData, reportsData, pendingHostsData] = await Promise.all([
-        api.getAllUsers(),
+      const [statsData, reportsData, pendingHostsData] = await Promise.all([
+        api.getAdminStats(),
         api.getReports(),
         api.getPendingHosts()
       ]);
       
-      setUsers(usersData);
+      setStats(statsData);
       setReports(reportsData);
       setPendingHosts(pendingHostsData);
     } catch (error) {
@@ -51,15 +51,12 @@ const AdminDashboard: React.FC = () => {
   };
 
   const tabs = [
-    { key: 'users', label: 'Users', icon: Users, count: users.length },
+    { key: 'users', label: 'Users', icon: Users, count: stats?.users.total ?? 0 },
     { key: 'reports', label: 'Reports', icon: AlertTriangle, count: reports.length },
     { key: 'hosts', label: 'Host Approval', icon: UserCheck, count: pendingHosts.length }
   ];
 
-  const activeUsers = users.filter(u => u.status === 'active').length;
-  const bannedUsers = users.filter(u => u.status === 'banned').length;
-  const totalGuests = users.filter(u => u.role === 'guest').length;
-  const totalHosts = users.filter(u => u.role === 'host').length;
+  const activeUsers = stats?.users.by_status.active ?? 0;
 
   return (
     <div className="min-h-screen bg-gray-50">
@@ -105,7 +102,7 @@ const AdminDashboard: React.FC = () => {
             <div className="flex items-center justify-between">
               <div>
                 <p className="text-gray-600 text-sm font-medium">Total Users</p>
-                <p className="text-3xl font-bold text-gray-900">{users.length}</p>
+                <p className="text-3xl font-bold text-gray-900">{stats?.users.total ?? 0}</p>
               </div>
               <div className="w-12 h-12 bg-blue-100 rounded-xl flex items-center justify-center">
                 <Users className="w-6 h-6 text-blue-600" />
@@ -189,7 +186,7 @@ const AdminDashboard: React.FC = () => {
             ) : (
               <>
                 {currentTab === 'users' && (
-                  <UserManagement users={users} onUserAction={handleUserAction} />
+                  <UserManagement onUserAction={handleUserAction} />
                 )}
                 {currentTab === 'reports' && (
                   <ReportsManagement reports={reports} onUserAction={handleUserAction} />
@@ -1,23 +1,75 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { api } from '../../services/api';
-import { User } from '../../types';
-import { User as UserIcon, Mail, Calendar, Ban, UserCheck, AlertTriangle, Grid, List } from 'lucide-react';
+import { User, UserFilters } from '../../types';
+import { User as UserIcon, Mail, Calendar, Ban, UserCheck, AlertTriangle, Grid, List, Search } from 'lucide-react';
 
 interface UserManagementProps {
-  users: User[];
   onUserAction: () => void;
 }
 
-const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction }) => {
+const UserManagement: React.FC<UserManagementProps> = ({ onUserAction }) => {
+  const [users, setUsers] = useState<User[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [actionLoading, setActionLoading] = useState<number | null>(null);
   const [filter, setFilter] = useState<'all' | 'guest' | 'host' | 'active' | 'banned'>('all');
+  const [searchTerm, setSearchTerm] = useState('');
   const [viewMode, setViewMode] = useState<'cards' | 'table'>('cards');
 
+  // Filtering happens on the server; each filter button maps to a query param
+  const buildFilters = (): UserFilters => {
+    const filters: UserFilters = { q: searchTerm.trim() };
+    if (filter === 'guest' || filter === 'host') {
+      filters.role = filter;
+    } else if (filter === 'active' || filter === 'banned') {
+      filters.status = filter;
+    }
+    return filters;
+  };
+
+  const loadUsers = async () => {
+    setLoading(true);
+    try {
+      const page = await api.getUsers(buildFilters());
+      setUsers(page.users);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error loading users:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const loadMoreUsers = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await api.getUsers({ ...buildFilters(), after: nextCursor });
+      setUsers(prev => [...prev, ...page.users]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error loading more users:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
+    const timer = setTimeout(loadUsers, 300);
+    return () => clearTimeout(timer);
+  }, [filter, searchTerm]);
+
+  const refreshAfterAction = () => {
+    loadUsers();
+    onUserAction();
+  };
+
   const handleBanUser = async (userId: number) => {
     setActionLoading(userId);
     try {
       await api.banUser(userId);
-      onUserAction();
+      refreshAfterAction();
     } catch (error) {
       console.error('Error banning user:', error);
     } finally {
@@ -29,7 +81,7 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
     setActionLoading(userId);
     try {
       await api.unbanUser(userId);
-      onUserAction();
+      refreshAfterAction();
     } catch (error) {
       console.error('Error unbanning user:', error);
     } finally {
@@ -45,7 +97,7 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
     setActionLoading(userId);
     try {
       await api.deleteUser(userId);
-      onUserAction();
+      refreshAfterAction();
     } catch (error) {
       console.error('Error deleting user:', error);
     } finally {
@@ -53,21 +105,6 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
     }
   };
 
-  const filteredUsers = users.filter(user => {
-    switch (filter) {
-      case 'guest':
-        return user.role === 'guest';
-      case 'host':
-        return user.role === 'host';
-      case 'active':
-        return user.status === 'active';
-      case 'banned':
-        return user.status === 'banned';
-      default:
-        return true;
-    }
-  });
-
   const getStatusColor = (status: User['status']) => {
     switch (status) {
       case 'active':
@@ -111,6 +148,18 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
             </button>
           ))}
         </div>
+
+        {/* Search */}
+        <div className="relative flex-1 sm:max-w-xs">
+          <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 w-4 h-4 text-gray-400" />
+          <input
+            type="text"
+            value={searchTerm}
+            onChange={(e) => setSearchTerm(e.target.value)}
+            placeholder="Search username or email"
+            className="w-full pl-9 pr-3 py-2 border border-gray-300 rounded-lg text-sm focus:ring-2 focus:ring-cyan-500 focus:border-transparent"
+          />
+        </div>
         
         {/* View Mode Toggle */}
         <div className="flex bg-gray-100 rounded-lg p-1">
@@ -140,7 +189,11 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
       </div>
 
       {/* Users List */}
-      {filteredUsers.length === 0 ? (
+      {loading ? (
+        <div className="flex items-center justify-center py-12">
+          <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-cyan-600"></div>
+        </div>
+      ) : users.length === 0 ? (
         <div className="text-center py-12">
           <div className="w-16 h-16 bg-gray-100 rounded-full flex items-center justify-center mx-auto mb-4">
             <UserIcon className="w-6 h-6 text-gray-400" />
@@ -152,7 +205,7 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
         <>
           {viewMode === 'cards' ? (
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-              {filteredUsers.map((user) => (
+              {users.map((user) => (
                 <div key={user.id} className="bg-gray-50 rounded-xl p-6 space-y-4">
                   {/* User Header */}
                   <div className="flex items-start justify-between">
@@ -274,7 +327,7 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
                     </tr>
                   </thead>
                   <tbody className="bg-white divide-y divide-gray-200">
-                    {filteredUsers.map((user) => (
+                    {users.map((user) => (
                       <tr key={user.id} className="hover:bg-gray-50">
                         <td className="px-6 py-4 whitespace-nowrap">
                           <div className="flex items-center">
@@ -357,6 +410,18 @@ const UserManagement: React.FC<UserManagementProps> = ({ users, onUserAction })
               </div>
             </div>
           )}
+
+          {nextCursor && (
+            <div className="flex justify-center">
+              <button
+                onClick={loadMoreUsers}
+                disabled={loadingMore}
+                className="px-6 py-2 bg-gray-100 text-gray-700 rounded-lg font-medium hover:bg-gray-200 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+              >
+                {loadingMore ? 'Loading...' : 'Load more users'}
+              </button>
+            </div>
+          )}
         </>
       )}
     </div>
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { api } from '../../services/api';
-import { Space } from '../../types';
+import { Space, SpaceFilters } from '../../types';
 import { Search, MapPin, Clock, Filter, Home, Car } from 'lucide-react';
 import SpaceCard from '../Common/SpaceCard';
 import SpaceModal from '../Common/SpaceModal';
@@ -12,12 +12,20 @@ const Dashboard: React.FC = () => {
   const [searchLocation, setSearchLocation] = useState('');
   const [selectedSpace, setSelectedSpace] = useState<Space | null>(null);
   const [typeFilter, setTypeFilter] = useState<'all' | 'room' | 'parking'>('all');
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const buildFilters = (location?: string): SpaceFilters => ({
+    location: location || undefined,
+    type: typeFilter === 'all' ? undefined : typeFilter
+  });
 
   const loadSpaces = async (location?: string) => {
     setLoading(true);
     try {
-      const data = await api.getSpaces(location);
-      setSpaces(data);
+      const page = await api.getSpaces(buildFilters(location));
+      setSpaces(page.spaces);
+      setNextCursor(page.next_cursor);
     } catch (error) {
       console.error('Error loading spaces:', error);
     } finally {
@@ -25,18 +33,30 @@ const Dashboard: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (nextCursor === null) return;
+    setLoadingMore(true);
+    try {
+      const page = await api.getSpaces({ ...buildFilters(searchLocation), after: nextCursor });
+      setSpaces(prev => [...prev, ...page.spaces]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Error loading more spaces:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Type filtering happens on the server, so reload whenever it changes
   useEffect(() => {
-    loadSpaces();
-  }, []);
+    loadSpaces(searchLocation);
+  }, [typeFilter]);
 
   const handleSearch = (e: React.FormEvent) => {
     e.preventDefault();
     loadSpaces(searchLocation);
   };
 
-  const filteredSpaces = typeFilter === 'all' 
-    ? spaces 
-    : spaces.filter(space => space.type === typeFilter);
   return (
     <div className="min-h-screen bg-gray-50">
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">
@@ -131,11 +151,11 @@ const Dashboard: React.FC = () => {
                 )}
               </h2>
               <p className="text-gray-600">
-                {filteredSpaces.length} space{filteredSpaces.length !== 1 ? 's' : ''} found
+                {spaces.length} space{spaces.length !== 1 ? 's' : ''} {nextCursor !== null ? 'shown' : 'found'}
               </p>
             </div>
 
-            {filteredSpaces.length === 0 ? (
+            {spaces.length === 0 ? (
               <div className="text-center py-12">
                 <div className="w-16 h-16 bg-gray-100 rounded-full flex items-center justify-center mx-auto mb-4">
                   <Search className="w-6 h-6 text-gray-400" />
@@ -161,7 +181,7 @@ const Dashboard: React.FC = () => {
               </div>
             ) : (
               <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 max-h-[70vh] overflow-y-auto scrollbar-thin scrollbar-thumb-blue-300 scrollbar-track-gray-100 pr-2">
-                {filteredSpaces.map((space) => (
+                {spaces.map((space) => (
                   <SpaceCard
                     key={space.id}
                     space={space}
@@ -170,6 +190,18 @@ const Dashboard: React.FC = () => {
                 ))}
               </div>
             )}
+
+            {nextCursor !== null && (
+              <div className="flex justify-center mt-6">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="bg-white border border-gray-300 text-gray-700 px-6 py-2 rounded-xl hover:bg-gray-50 transition-colors font-medium disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more spaces'}
+                </button>
+              </div>
+            )}
           </>
         )}
       </div>
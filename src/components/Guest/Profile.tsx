@@ -28,11 +28,25 @@ const Profile: React.FC = () => {
     loadInterests();
   }, [user]);
 
+  // Host responses arrive as they happen instead of on the next reload
+  useEffect(() => {
+    if (!user || user.role !== 'guest') return;
+    return api.subscribeToEvents(event => {
+      if (event.type === 'interest.cancelled') {
+        setInterests(prev => prev.filter(interest => interest.id !== event.data.id));
+      } else {
+        setInterests(prev => prev.some(interest => interest.id === event.data.id)
+          ? prev.map(interest => interest.id === event.data.id ? { ...interest, ...event.data } : interest)
+          : [event.data, ...prev]);
+      }
+    }, loadInterests);
+  }, [user]);
+
   const handleCancelInterest = async (interestId: number) => {
     setCancellingId(interestId);
     try {
       await api.cancelInterest(interestId);
-      setInterests(interests.filter(interest => interest.id !== interestId));
+      setInterests(prev => prev.filter(interest => interest.id !== interestId));
     } catch (error) {
       console.error('Error cancelling interest:', error);
     } finally {
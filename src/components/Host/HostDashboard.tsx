@@ -20,18 +20,16 @@ const HostDashboard: React.FC = () => {
     
     setLoading(true);
     try {
-      const data = await api.getHostSpaces(user.id);
+      const [data, summary] = await Promise.all([
+        api.getHostSpaces(user.id),
+        api.getHostInterestSummary(user.id)
+      ]);
       setSpaces(data);
-      
-      // Load interest counts for each space
+
+      // Interest counts for every space come from a single summary call
       const counts: { [key: number]: number } = {};
-      for (const space of data) {
-        try {
-          const interests = await api.getSpaceInterests(space.id);
-          counts[space.id] = interests.length;
-        } catch (error) {
-          counts[space.id] = 0;
-        }
+      for (const row of summary) {
+        counts[row.space_id] = row.total;
       }
       setInterestCounts(counts);
     } catch (error) {
@@ -45,6 +43,19 @@ const HostDashboard: React.FC = () => {
     loadSpaces();
   }, [user]);
 
+  // Keep the interest counts current as guests come and go
+  useEffect(() => {
+    if (!user) return;
+    return api.subscribeToEvents(event => {
+      if (event.type === 'interest.responded') return;
+      const delta = event.type === 'interest.created' ? 1 : -1;
+      setInterestCounts(prev => ({
+        ...prev,
+        [event.data.space_id]: Math.max(0, (prev[event.data.space_id] || 0) + delta)
+      }));
+    }, loadSpaces);
+  }, [user]);
+
   const handleSpaceCreated = () => {
     setShowCreateModal(false);
     loadSpaces();
@@ -59,6 +59,19 @@ const ManageSpaceModal: React.FC<ManageSpaceModalProps> = ({ space, onClose, onS
     loadInterests();
   }, [space.id]);
 
+  useEffect(() => {
+    return api.subscribeToEvents(event => {
+      if (event.data.space_id !== space.id) return;
+      if (event.type === 'interest.cancelled') {
+        setInterests(prev => prev.filter(interest => interest.id !== event.data.id));
+      } else {
+        setInterests(prev => prev.some(interest => interest.id === event.data.id)
+          ? prev.map(interest => interest.id === event.data.id ? { ...interest, ...event.data } : interest)
+          : [...prev, event.data]);
+      }
+    }, loadInterests);
+  }, [space.id]);
+
   const handleUpdateAvailability = async (newAvailability: Space['availability']) => {
     setUpdatingAvailability(true);
     try {
@@ -178,8 +191,8 @@ const ManageSpaceModal: React.FC<ManageSpaceModalProps> = ({ space, onClose, onS
   const handleRespondToInterest = async (interestId: number, status: 'accepted' | 'rejected') => {
     setRespondingToId(interestId);
     try {
-      await api.respondToInterest(interestId, status);
-      loadInterests(); // Reload interests to show updated status
+      const updated = await api.respondToInterest(interestId, status);
+      setInterests(prev => prev.map(interest => interest.id === updated.id ? { ...interest, ...updated } : interest));
     } catch (error) {
       console.error('Error responding to interest:', error);
     } finally {
@@ -110,6 +110,10 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
   };
 
   const logout = () => {
+    // End the session server-side too; the local sign-out does not wait for it
+    if (localStorage.getItem('jirao_token')) {
+      api.logout().catch((error) => console.error('Error logging out:', error));
+    }
     localStorage.removeItem('jirao_token');
     localStorage.removeItem('jirao_user');
     dispatch({ type: 'LOGOUT' });
@@ -1,12 +1,14 @@
-import { User, Space, Interest, LoginCredentials, RegisterData, CreateSpaceData, UpdateSpaceData, Report, CreateReportData, AdminLoginCredentials, PendingHost } from '../types';
+import { User, UserFilters, UserPage, UserCounts, AdminStats, BulkResult, Job, QueuedJob, Space, SpaceFilters, SpacePage, SpaceImportResult, Interest, InterestEvent, ChangePage, BulkInterestResult, SpaceInterestSummary, LoginCredentials, RegisterData, CreateSpaceData, UpdateSpaceData, Report, CreateReportData, AdminLoginCredentials, PendingHost } from '../types';
 
 const API_BASE_URL = 'http://localhost:8000/api';
 // const API_BASE_URL = 'http://192.168.0.101:8000/api';
 
 // Helper function to get auth headers
-const getAuthHeaders = () => {
+const getAuthHeaders = (): Record<string, string> => {
+  const token = localStorage.getItem('jirao_token');
   return {
     'Content-Type': 'application/json',
+    ...(token ? { Authorization: `Bearer ${token}` } : {}),
   };
 };
 
@@ -74,6 +76,14 @@ export const api = {
     return handleResponse(response);
   },
 
+  async logout(): Promise<void> {
+    const response = await fetch(`${API_BASE_URL}/auth/logout`, {
+      method: 'POST',
+      headers: getAuthHeaders()
+    });
+    await handleResponse(response);
+  },
+
   async adminLogin(credentials: AdminLoginCredentials): Promise<{ user: User; token: string }> {
     const response = await fetch(`${API_BASE_URL}/auth/admin-login`, {
       method: 'POST',
@@ -84,12 +94,14 @@ export const api = {
   },
 
   // Space endpoints
-  async getSpaces(location?: string): Promise<Space[]> {
+  async getSpaces(filters: SpaceFilters = {}): Promise<SpacePage> {
     const url = new URL(`${API_BASE_URL}/spaces`);
-    if (location) {
-      url.searchParams.append('location', location);
-    }
-    
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') {
+        url.searchParams.append(key, String(value));
+      }
+    });
+
     const response = await fetch(url.toString(), {
       headers: getAuthHeaders()
     });
@@ -131,6 +143,17 @@ export const api = {
   return handleResponse(response);
   },
 
+  // Rows with an id update that space; pass CSV text to upload a spreadsheet export
+  async importSpaces(spaces: (Partial<CreateSpaceData> & { id?: number })[] | string, ownerId: number): Promise<SpaceImportResult> {
+    const csv = typeof spaces === 'string';
+    const response = await fetch(`${API_BASE_URL}/spaces/bulk?owner_id=${ownerId}`, {
+      method: 'POST',
+      headers: { ...getAuthHeaders(), ...(csv ? { 'Content-Type': 'text/csv' } : {}) },
+      body: csv ? spaces : JSON.stringify(spaces)
+    });
+    return handleResponse(response);
+  },
+
   async updateSpace(spaceId: number, data: UpdateSpaceData): Promise<Space> {
     const response = await fetch(`${API_BASE_URL}/spaces/${spaceId}`, {
       method: 'PUT',
@@ -163,6 +186,19 @@ export const api = {
       return handleResponse(response);
   },
 
+  async expressInterestsBulk(spaceIds: number[], userId: number, hoursRequested?: number): Promise<BulkInterestResult> {
+    const response = await fetch(`${API_BASE_URL}/interests/bulk`, {
+      method: 'POST',
+      headers: getAuthHeaders(),
+      body: JSON.stringify({
+        user_id: userId,
+        space_ids: spaceIds,
+        hours_requested: hoursRequested
+      })
+    });
+    return handleResponse(response);
+  },
+
   async getUserInterests(userId: number): Promise<Interest[]> {
     const response = await fetch(`${API_BASE_URL}/interests/user/${userId}`, {
       headers: getAuthHeaders()
@@ -177,6 +213,17 @@ export const api = {
     return handleResponse(response);
   },
 
+  async getHostInterestSummary(ownerId: number, latest = 0): Promise<SpaceInterestSummary[]> {
+    const url = new URL(`${API_BASE_URL}/interests/host/${ownerId}/summary`);
+    if (latest > 0) {
+      url.searchParams.append('latest', String(latest));
+    }
+
+    const response = await fetch(url.toString(), {
+      headers: getAuthHeaders()
+    });
+    return handleResponse(response);
+  },
 
   async respondToInterest(interestId: number, status: 'accepted' | 'rejected'): Promise<Interest> {
     const response = await fetch(`${API_BASE_URL}/interests/${interestId}/respond`, {
@@ -203,6 +250,40 @@ export const api = {
     return result.has_interest;
   },
 
+  // Live interest changes for the signed-in user. onResync runs when events may
+  // have been missed (after a reconnect, or when the server dropped a backlog):
+  // refetch then. Returns a function that closes the stream.
+  subscribeToEvents(onEvent: (event: InterestEvent) => void, onResync: () => void): () => void {
+    const token = localStorage.getItem('jirao_token');
+    if (!token) return () => {};
+    // EventSource cannot send an Authorization header
+    const source = new EventSource(`${API_BASE_URL}/events?token=${encodeURIComponent(token)}`);
+    let connected = false;
+    source.addEventListener('ready', () => {
+      if (connected) onResync();
+      connected = true;
+    });
+    source.addEventListener('resync', onResync);
+    for (const type of ['interest.created', 'interest.responded', 'interest.cancelled']) {
+      source.addEventListener(type, (e) => onEvent(JSON.parse((e as MessageEvent).data)));
+    }
+    return () => source.close();
+  },
+
+  // Incremental sync: call without `since` before loading the full lists, then pass
+  // back `cursor` each time. Rejects ("Cursor expired ...") once the cursor is too
+  // old; reload the lists and start over then.
+  async getChanges(since?: number, entities?: Array<'space' | 'interest' | 'user'>): Promise<ChangePage> {
+    const url = new URL(`${API_BASE_URL}/changes`);
+    if (since !== undefined) url.searchParams.append('since', String(since));
+    if (entities?.length) url.searchParams.append('entities', entities.join(','));
+
+    const response = await fetch(url.toString(), {
+      headers: getAuthHeaders()
+    });
+    return handleResponse(response);
+  },
+
   // Report endpoints
   async createReport(data: CreateReportData, reporterId: number): Promise<Report> {
     const response = await fetch(`${API_BASE_URL}/reports`, {
@@ -231,8 +312,29 @@ export const api = {
   },
 
   // Admin endpoints
-  async getAllUsers(): Promise<User[]> {
-    const response = await fetch(`${API_BASE_URL}/admin/users`, {
+  async getUsers(filters: UserFilters = {}): Promise<UserPage> {
+    const url = new URL(`${API_BASE_URL}/admin/users`);
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') {
+        url.searchParams.append(key, String(value));
+      }
+    });
+
+    const response = await fetch(url.toString(), {
+      headers: getAuthHeaders()
+    });
+    return handleResponse(response);
+  },
+
+  async getUserCounts(): Promise<UserCounts> {
+    const response = await fetch(`${API_BASE_URL}/admin/users/counts`, {
+      headers: getAuthHeaders()
+    });
+    return handleResponse(response);
+  },
+
+  async getAdminStats(): Promise<AdminStats> {
+    const response = await fetch(`${API_BASE_URL}/admin/stats`, {
       headers: getAuthHeaders()
     });
     return handleResponse(response);
@@ -259,7 +361,49 @@ export const api = {
       method: 'DELETE',
       headers: getAuthHeaders()
     });
-    await handleResponse(response);
+    const queued: QueuedJob = await handleResponse(response);
+    await api.waitForJob(queued.job_id);
+  },
+
+  async bulkUserAction(action: 'ban' | 'unban' | 'delete', userIds: number[]): Promise<BulkResult> {
+    const response = await fetch(`${API_BASE_URL}/admin/users/bulk`, {
+      method: 'POST',
+      headers: getAuthHeaders(),
+      body: JSON.stringify({ action, user_ids: userIds })
+    });
+    const result: BulkResult = await handleResponse(response);
+    if (result.job_id) {
+      await api.waitForJob(result.job_id);
+    }
+    return result;
+  },
+
+  async bulkPendingHostAction(action: 'approve' | 'reject', pendingHostIds: number[], adminId?: number): Promise<BulkResult> {
+    const response = await fetch(`${API_BASE_URL}/admin/pending-hosts/bulk`, {
+      method: 'POST',
+      headers: getAuthHeaders(),
+      body: JSON.stringify({ action, pending_host_ids: pendingHostIds, admin_id: adminId })
+    });
+    return handleResponse(response);
+  },
+
+  async getJob(jobId: number): Promise<Job> {
+    const response = await fetch(`${API_BASE_URL}/admin/jobs/${jobId}`, {
+      headers: getAuthHeaders()
+    });
+    return handleResponse(response);
+  },
+
+  // Poll a background job until it finishes; rejects if it failed
+  async waitForJob(jobId: number, intervalMs = 250, timeoutMs = 30000): Promise<Job> {
+    const deadline = Date.now() + timeoutMs;
+    for (;;) {
+      const job = await api.getJob(jobId);
+      if (job.status === 'succeeded') return job;
+      if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+      if (Date.now() > deadline) return job;
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
   },
 
   async getPendingHosts(): Promise<PendingHost[]> {
@@ -275,7 +419,8 @@ export const api = {
       headers: getAuthHeaders(),
       body: JSON.stringify({ admin_id: adminId })
     });
-    await handleResponse(response);
+    const queued: QueuedJob = await handleResponse(response);
+    await api.waitForJob(queued.job_id);
   },
 
   async rejectHost(pendingHostId: number): Promise<void> {
@@ -28,6 +28,76 @@ export interface Space {
   };
 }
 
+export interface SpaceFilters {
+  location?: string;
+  type?: Space['type'];
+  availability?: Space['availability'];
+  min_rate?: number;
+  max_rate?: number;
+  limit?: number;
+  after?: number;
+}
+
+export interface UserFilters {
+  role?: 'guest' | 'host';
+  status?: User['status'];
+  q?: string;
+  sort?: 'id' | 'username' | 'email' | 'date_joined' | '-id' | '-username' | '-email' | '-date_joined';
+  limit?: number;
+  after?: string;
+}
+
+export interface UserPage {
+  users: User[];
+  next_cursor: string | null;
+}
+
+export interface UserCounts {
+  total: number;
+  by_role: { guest: number; host: number };
+  by_status: { active: number; banned: number; pending: number };
+}
+
+export interface AdminStats {
+  users: { total: number; by_role: Partial<Record<User['role'], number>>; by_status: Partial<Record<User['status'], number>> };
+  reports: { total: number };
+  pending_hosts: { total: number };
+  spaces: { total: number; by_type: Partial<Record<Space['type'], number>>; by_availability: Partial<Record<Space['availability'], number>> };
+  interests: { total: number; by_status: Partial<Record<Interest['status'], number>> };
+  reconciled_at: string | null;
+}
+
+export interface Job {
+  id: number;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  attempts: number;
+  max_attempts: number;
+  payload: Record<string, unknown>;
+  result: Record<string, unknown> | null;
+  error: string | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  wait_seconds: number | null;
+  run_seconds: number | null;
+}
+
+export interface QueuedJob {
+  message: string;
+  job_id: number;
+}
+
+export interface BulkResult {
+  results: { id: number; result: string }[];
+  job_id?: number | null;
+}
+
+export interface SpacePage {
+  spaces: Space[];
+  next_cursor: number | null;
+}
+
 export interface Interest {
   id: number;
   user_id: number;
@@ -43,6 +113,54 @@ export interface Interest {
   space_rate?: number;
 }
 
+// Pushed over GET /api/events (api.subscribeToEvents)
+export type InterestEvent =
+  | { type: 'interest.created'; data: Interest }
+  | { type: 'interest.responded'; data: Interest }
+  | { type: 'interest.cancelled'; data: { id: number; user_id: number; space_id: number } };
+
+// GET /api/changes (api.getChanges): data holds only the changed columns
+export interface Change {
+  entity: 'space' | 'interest' | 'user';
+  id: number;
+  op: 'create' | 'update' | 'delete';
+  at: string;
+  data?: Record<string, unknown>;
+}
+
+export interface ChangePage {
+  changes: Change[];
+  cursor: number;
+  more: boolean;
+}
+
+export interface BulkInterestResult {
+  created: Interest[];
+  already_interested: number[];
+  not_found: number[];
+}
+
+export interface SpaceImportResult {
+  created: number;
+  updated: number;
+  failed: number;
+  rows: {
+    row: number;
+    result: 'created' | 'updated' | 'invalid' | 'not_found' | 'failed';
+    id?: number;
+    errors?: string[];
+  }[];
+}
+
+export interface SpaceInterestSummary {
+  space_id: number;
+  total: number;
+  pending: number;
+  accepted: number;
+  rejected: number;
+  latest?: Interest[];
+}
+
 export interface Report {
   id: number;
   reporter_id: number;